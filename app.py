@@ -1,27 +1,261 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, jsonify
+from flask import Flask, Request, render_template, request, redirect, url_for, flash, send_from_directory, jsonify, g
 import os
+import atexit
+import tempfile
+from functools import partial
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import config
-from deepfake import DeepfakeGenerator
+from deepfake import IMAGE_EXTENSIONS, DeepfakeGenerator
+from effects import parse_effect_chain
+from encoders import HLS_PLAYLIST, hls_directory
+from generator_pool import GeneratorPool
+from history_store import SORT_ORDERS, HistoryStore
+from media import send_media
+from metrics import PROMETHEUS_CONTENT_TYPE, PipelineMetrics
+from jobs import JobQueue, QueueFullError, DONE, FAILED
+from result_cache import ResultCache, hash_file, result_key
+from uploads import ChunkedUploadStore, UploadNotFoundError, UploadOffsetError, UploadTooLargeError
+
+class UploadRequest(Request):
+    """Spools uploaded files into the upload folder, so saving one is a rename rather than a copy"""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        stream = tempfile.NamedTemporaryFile('wb+', dir=config.UPLOAD_FOLDER, prefix='.incoming_', delete=False)
+        g.setdefault('incoming_files', []).append(stream)
+        return stream
 
 app = Flask(__name__)
 app.config.from_object(config)
+app.request_class = UploadRequest
+
+# Constructor options shared by every generator the app creates
+generator_options = {
+    'face_mesh_stride': config.FACE_MESH_STRIDE,
+    'face_mesh_motion_threshold': config.FACE_MESH_MOTION_THRESHOLD,
+    'face_mesh_drift': config.FACE_MESH_DRIFT,
+    'face_mesh_resolution': config.FACE_MESH_RESOLUTION,
+    'face_mesh_overlays': config.FACE_MESH_OVERLAYS,
+    'max_num_faces': config.FACE_MESH_MAX_FACES,
+    'encoder': config.ENCODER,
+    'frame_queue_depth': config.FRAME_QUEUE_DEPTH,
+}
+if config.ENCODER in ('ffmpeg', 'hls'):
+    generator_options['encoder_options'] = {
+        'preset': config.ENCODER_PRESET,
+        'crf': config.ENCODER_CRF,
+        'threads': config.ENCODER_THREADS,
+        'binary': config.FFMPEG_BINARY,
+    }
+if config.ENCODER == 'hls':
+    generator_options['encoder_options']['segment_seconds'] = config.HLS_SEGMENT_SECONDS
+
+# Pool of generators for threaded jobs, one per concurrently running job (FaceMesh is not thread-safe);
+# worker processes create their own generators instead
+generator_pool = None
+if config.JOB_EXECUTOR == 'thread':
+    generator_pool = GeneratorPool(
+        size=config.JOB_CONCURRENCY,
+        factory=partial(DeepfakeGenerator, **generator_options),
+        warm_up=config.FACE_MESH_WARM_UP
+    )
+
+# Index of generated outputs for the history page
+history_store = HistoryStore(config.DATABASE_PATH)
+
+# Outputs of earlier jobs by input content and settings
+result_cache = ResultCache(
+    config.DATABASE_PATH,
+    max_bytes=config.RESULT_CACHE_MAX_BYTES,
+    max_age=config.RESULT_CACHE_MAX_AGE,
+    on_evict=history_store.forget_output
+)
+
+# Stage timings and latency of finished jobs, exposed on /metrics
+pipeline_metrics = PipelineMetrics(window=config.METRICS_LATENCY_WINDOW)
+
+# Background job queue; generation runs in workers, not in requests
+job_queue = JobQueue(
+    config.DATABASE_PATH,
+    concurrency=config.JOB_CONCURRENCY,
+    max_depth=config.JOB_QUEUE_LIMIT,
+    generator_pool=generator_pool,
+    generator_options=generator_options,
+    result_cache=result_cache,
+    history_store=history_store,
+    metrics=pipeline_metrics,
+    warm_up=config.FACE_MESH_WARM_UP
+)
 
-# Initialize the DeepfakeGenerator
-deepfake_generator = DeepfakeGenerator()
+# Resumable chunked uploads for files larger than MAX_CONTENT_LENGTH
+upload_store = ChunkedUploadStore(config.UPLOAD_FOLDER, config.MAX_UPLOAD_SIZE, expiry=config.UPLOAD_EXPIRY)
+
+@atexit.register
+def shutdown_workers():
+    """Stop the job workers and release the pooled generators"""
+    job_queue.shutdown()
+    if generator_pool is not None:
+        generator_pool.close()
 
 def get_unique_filename(filename):
     """Generate a unique filename using timestamp"""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     name, ext = os.path.splitext(filename)
-    return f"{name}_{timestamp}{ext}"
+    unique_filename = f"{name}_{timestamp}{ext}"
+    # Same-named uploads within one second must not overwrite each other
+    counter = 1
+    while os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)):
+        unique_filename = f"{name}_{timestamp}_{counter}{ext}"
+        counter += 1
+    return unique_filename
+
+def wants_json():
+    """Whether the client asked for a JSON response instead of HTML"""
+    return request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+
+def job_status(job):
+    """Public JSON representation of a job"""
+    return {
+        'id': job['id'],
+        'state': job['state'],
+        'progress': job['progress'],
+        'frames_done': job['frames_done'],
+        'total_frames': job['total_frames'],
+        'fps': job['fps'],
+        'error': job['error'],
+        'filename': job['output_filename'],
+        'ready': job['state'] == DONE,
+        'result_url': url_for('result', filename=job['output_filename']),
+        'video_url': url_for('video', filename=job['output_filename']) if job['state'] == DONE else None,
+        'stream_url': stream_url(job),
+    }
+
+def stream_url(job):
+    """URL of the live HLS playlist of a job using the 'hls' encoder, once its first segment exists"""
+    if job['state'] == FAILED:
+        return None
+    if not os.path.exists(os.path.join(hls_directory(job['output_path']), HLS_PLAYLIST)):
+        return None
+    return url_for('stream', filename=job['output_filename'], name=HLS_PLAYLIST)
+
+def upload_status(status):
+    """Public JSON representation of a chunked upload"""
+    return dict(status, chunk_size=config.UPLOAD_CHUNK_SIZE,
+                upload_url=url_for('upload_chunk', upload_id=status['id']))
+
+def read_job_params(form):
+    """
+    Validate the generation fields of an upload form.
+    Returns the job params; raises ValueError with a user-facing message.
+    """
+    # One or more effect fields, applied in order (each may also be a comma-separated chain)
+    effect_fields = form.getlist('effect') or ['original']
+    try:
+        brightness = int(form.get('brightness', 0))
+        contrast = float(form.get('contrast', 1.0))
+        workers = int(form.get('workers', 1))
+    except ValueError:
+        raise ValueError('Brightness, contrast and workers must be numbers.')
+    
+    try:
+        effect = ','.join(parse_effect_chain(','.join(effect_fields)))
+    except ValueError:
+        raise ValueError('Invalid effect selected.')
+    
+    if not (-100 <= brightness <= 100):
+        raise ValueError('Brightness must be between -100 and 100.')
+    
+    if not (0.0 <= contrast <= 3.0):
+        raise ValueError('Contrast must be between 0.0 and 3.0.')
+    
+    if not (1 <= workers <= config.MAX_WORKERS):
+        raise ValueError(f'Workers must be between 1 and {config.MAX_WORKERS}.')
+    
+    return {
+        'effect': effect,
+        'brightness': brightness,
+        'contrast': contrast,
+        'workers': workers,
+    }
+
+def queue_job(input_path, params):
+    """
+    Queue generation for a saved input and respond: 202 with the job as JSON,
+    a redirect to the result page, or 429 when the queue is full.
+    A cached result, or a job already producing it, is returned instead of queueing new work.
+    """
+    unique_filename = os.path.basename(input_path)
+    output_filename = f"deepfake_{unique_filename.rsplit('.', 1)[0]}.mp4"
+    output_path = os.path.join(app.config['GENERATED_FOLDER'], output_filename)
+    
+    if input_path.lower().endswith(IMAGE_EXTENSIONS):
+        params = dict(params, still_duration=config.STILL_DURATION, still_fps=config.STILL_FPS)
+    
+    source_hash = hash_file(input_path)
+    cache_key = result_key(source_hash, params, generator_options)
+    cached_path = result_cache.lookup(cache_key)
+    if cached_path is not None:
+        os.remove(input_path)
+        filename = os.path.basename(cached_path)
+        if wants_json():
+            return jsonify({'filename': filename, 'state': DONE, 'ready': True, 'cached': True,
+                            'result_url': url_for('result', filename=filename),
+                            'video_url': url_for('video', filename=filename)})
+        return redirect(url_for('result', filename=filename))
+    
+    active_job = job_queue.get_active_by_cache_key(cache_key)
+    if active_job is not None:
+        os.remove(input_path)
+        if wants_json():
+            return jsonify(job_status(active_job)), 202
+        return redirect(url_for('result', filename=active_job['output_filename']))
+    
+    # Queue the generation job; it runs in a worker process
+    try:
+        job_id = job_queue.submit(input_path, output_path, output_filename, params,
+                                  cache_key=cache_key, source_hash=source_hash)
+    except QueueFullError:
+        os.remove(input_path)
+        message = 'The server is busy. Please try again in a moment.'
+        if wants_json():
+            response = jsonify({'error': message})
+        else:
+            flash(message)
+            response = app.make_response(render_template(
+                'index.html', effects=list(DeepfakeGenerator.EFFECT_NAMES),
+                max_workers=config.MAX_WORKERS, chunk_size=config.UPLOAD_CHUNK_SIZE
+            ))
+        response.status_code = 429
+        response.headers['Retry-After'] = '30'
+        return response
+    
+    if wants_json():
+        return jsonify(job_status(job_queue.get(job_id))), 202
+    
+    # Redirect to result page, which polls the job until it is ready
+    return redirect(url_for('result', filename=output_filename))
+
+@app.before_request
+def start_job_queue():
+    """Start the job workers in the serving process (resumes persisted jobs)"""
+    job_queue.start()
+
+@app.teardown_request
+def remove_incoming_files(exc):
+    """Delete spooled upload files that were not moved into place"""
+    for stream in g.get('incoming_files', ()):
+        stream.close()
+        try:
+            os.remove(stream.name)
+        except FileNotFoundError:
+            pass
 
 @app.route('/')
 def index():
     """Render the main page"""
-    effects = list(deepfake_generator.effects.keys())
-    return render_template('index.html', effects=effects)
+    effects = list(DeepfakeGenerator.EFFECT_NAMES)
+    return render_template('index.html', effects=effects, max_workers=config.MAX_WORKERS,
+                           chunk_size=config.UPLOAD_CHUNK_SIZE)
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
@@ -37,45 +271,23 @@ def upload_file():
     
     if file and config.allowed_file(file.filename):
         try:
-            # Get effect and adjustment parameters
-            effect = request.form.get('effect', 'original')
-            brightness = int(request.form.get('brightness', 0))
-            contrast = float(request.form.get('contrast', 1.0))
-            
-            # Validate parameters
-            if effect not in deepfake_generator.effects:
-                flash('Invalid effect selected.')
-                return redirect(url_for('index'))
-            
-            if not (-100 <= brightness <= 100):
-                flash('Brightness must be between -100 and 100.')
-                return redirect(url_for('index'))
-                
-            if not (0.0 <= contrast <= 3.0):
-                flash('Contrast must be between 0.0 and 3.0.')
+            try:
+                params = read_job_params(request.form)
+            except ValueError as e:
+                flash(str(e))
                 return redirect(url_for('index'))
             
-            # Save uploaded file
+            # Save uploaded file; a spooled upload is moved into place rather than copied
             filename = secure_filename(file.filename)
             unique_filename = get_unique_filename(filename)
             input_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(input_path)
+            if file.stream in g.get('incoming_files', ()):
+                file.stream.close()
+                os.replace(file.stream.name, input_path)
+            else:
+                file.save(input_path)
             
-            # Generate output filename
-            output_filename = f"deepfake_{unique_filename.rsplit('.', 1)[0]}.mp4"
-            output_path = os.path.join(app.config['GENERATED_FOLDER'], output_filename)
-            
-            # Generate deepfake with effects
-            deepfake_generator.generate_deepfake(
-                input_path, 
-                output_path,
-                effect=effect,
-                brightness=brightness,
-                contrast=contrast
-            )
-            
-            # Redirect to result page
-            return redirect(url_for('result', filename=output_filename))
+            return queue_job(input_path, params)
             
         except Exception as e:
             flash(f'Error processing file: {str(e)}. Please try again or check the file format.')
@@ -84,37 +296,199 @@ def upload_file():
         flash('Invalid file type. Please upload a file with one of the allowed extensions: png, jpg, jpeg, mp4, avi, mov.')
         return redirect(url_for('index'))
 
+@app.route('/uploads', methods=['POST'])
+def create_upload():
+    """Start a resumable chunked upload: JSON {"filename", "size"}"""
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(str(data.get('filename', '')))
+    if not filename or not config.allowed_file(filename):
+        return jsonify({'error': 'Invalid file type.'}), 400
+    try:
+        size = int(data.get('size'))
+        status = upload_store.create(filename, size)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid upload size.'}), 400
+    except UploadTooLargeError as e:
+        return jsonify({'error': str(e)}), 413
+    return jsonify(upload_status(status)), 201
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def upload_progress(upload_id):
+    """Report how many bytes of an upload have been received"""
+    try:
+        return jsonify(upload_status(upload_store.status(upload_id)))
+    except UploadNotFoundError:
+        return jsonify({'error': 'Unknown upload'}), 404
+
+@app.route('/uploads/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """Append the request body at the Upload-Offset header"""
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'error': 'Missing Upload-Offset header'}), 400
+    try:
+        upload_store.append(upload_id, offset, request.stream)
+        return jsonify(upload_status(upload_store.status(upload_id)))
+    except UploadNotFoundError:
+        return jsonify({'error': 'Unknown upload'}), 404
+    except UploadOffsetError as e:
+        return jsonify({'error': str(e), 'offset': e.offset}), 409
+    except UploadTooLargeError as e:
+        return jsonify({'error': str(e)}), 413
+
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+def cancel_upload(upload_id):
+    """Abandon an upload and remove its partial data"""
+    try:
+        upload_store.discard(upload_id)
+    except UploadNotFoundError:
+        return jsonify({'error': 'Unknown upload'}), 404
+    return '', 204
+
+@app.route('/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """Queue generation for a fully received upload, with the same fields as /upload"""
+    try:
+        params = read_job_params(request.form)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        status = upload_store.status(upload_id)
+        input_path = os.path.join(app.config['UPLOAD_FOLDER'], get_unique_filename(status['filename']))
+        upload_store.complete(upload_id, input_path)
+    except UploadNotFoundError:
+        return jsonify({'error': 'Unknown upload'}), 404
+    except UploadOffsetError as e:
+        return jsonify({'error': 'Upload is incomplete', 'offset': e.offset}), 409
+    return queue_job(input_path, params)
+
 @app.route('/result/<filename>')
 def result(filename):
-    """Display the result page with the generated video"""
-    return render_template('result.html', filename=filename)
+    """Display the result page, or report readiness as JSON"""
+    job = job_queue.get_by_output(filename)
+    if job is None and not os.path.exists(os.path.join(app.config['GENERATED_FOLDER'], filename)):
+        if wants_json():
+            return jsonify({'error': 'Unknown result'}), 404
+        flash('Result not found.')
+        return redirect(url_for('index'))
+    
+    if wants_json():
+        if job is None:
+            return jsonify({'filename': filename, 'state': DONE, 'ready': True,
+                            'video_url': url_for('video', filename=filename)})
+        return jsonify(job_status(job))
+    return render_template('result.html', filename=filename, job=job_status(job) if job else None)
+
+@app.route('/jobs/<job_id>')
+def job_detail(job_id):
+    """Report job state, progress and throughput as JSON"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job_status(job))
 
 @app.route('/history')
 def history():
-    """Display history of generated videos"""
-    generated_files = []
-    for filename in os.listdir(app.config['GENERATED_FOLDER']):
-        if filename.startswith('deepfake_'):
-            file_path = os.path.join(app.config['GENERATED_FOLDER'], filename)
-            timestamp = os.path.getmtime(file_path)
-            generated_files.append({
-                'filename': filename,
-                'timestamp': datetime.fromtimestamp(timestamp)
-            })
+    """Display generated videos from the history index, paginated, filtered and sorted"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    effect = request.args.get('effect') or None
+    search = request.args.get('q', '').strip() or None
+    sort = request.args.get('sort', 'newest')
+    if sort not in SORT_ORDERS:
+        sort = 'newest'
     
-    # Sort by timestamp, newest first
-    generated_files.sort(key=lambda x: x['timestamp'], reverse=True)
-    return render_template('history.html', files=generated_files)
+    per_page = config.HISTORY_PAGE_SIZE
+    files, total = history_store.page(page, per_page, effect=effect, search=search, sort=sort)
+    for file in files:
+        file['timestamp'] = datetime.fromtimestamp(file['created_at'])
+    pages = max((total + per_page - 1) // per_page, 1)
+    return render_template('history.html', files=files, total=total, page=page, pages=pages,
+                           effect=effect, effects=history_store.effects(), q=search or '',
+                           sort=sort, sorts=list(SORT_ORDERS))
+
+@app.route('/stream/<filename>/<name>')
+def stream(filename, name):
+    """Serve the live HLS playlist and segments of a result, available while it is still encoding"""
+    output_path = safe_join(app.config['GENERATED_FOLDER'], filename)
+    if output_path is None:
+        return jsonify({'error': 'Unknown result'}), 404
+    directory = hls_directory(output_path)
+    if name == HLS_PLAYLIST:
+        # The playlist grows until the encode finishes; segments never change
+        response = send_from_directory(directory, name, max_age=0)
+        response.cache_control.no_cache = True
+        return response
+    return send_media(directory, name, max_age=config.MEDIA_MAX_AGE)
+
+@app.route('/pool')
+def pool_stats():
+    """Report generator pool utilisation and checkout wait time as JSON"""
+    if generator_pool is None:
+        return jsonify({'error': "No generator pool, jobs run in worker processes (JOB_EXECUTOR = 'process')"}), 404
+    return jsonify(generator_pool.stats())
+
+@app.route('/cache')
+def cache_stats():
+    """Report result cache hits, misses and size as JSON"""
+    return jsonify(result_cache.stats())
+
+@app.route('/metrics')
+def metrics():
+    """Report queue depth, throughput, job latency and stage timings in the Prometheus text format"""
+    running = job_queue.running()
+    gauges = {
+        'deepfake_jobs_queued': ('Jobs waiting for a worker', job_queue.depth() - len(running)),
+        'deepfake_jobs_running': ('Jobs being processed', len(running)),
+        'deepfake_running_fps': ('Frames per second of the jobs being processed, summed',
+                                 sum(job['fps'] for job in running)),
+    }
+    return app.response_class(pipeline_metrics.render(gauges), content_type=PROMETHEUS_CONTENT_TYPE)
+
+def media_max_age(filename):
+    """
+    Cache lifetime for a generated file: MEDIA_MAX_AGE once its job is done,
+    None (no-cache) while the job is queued, running or failed and the file may
+    be missing, partial or still being written
+    """
+    job = job_queue.get_by_output(filename)
+    if job is not None and job['state'] != DONE:
+        return None
+    return config.MEDIA_MAX_AGE
 
 @app.route('/download/<filename>')
 def download(filename):
     """Download a generated video"""
-    return send_from_directory(app.config['GENERATED_FOLDER'], filename)
+    return send_media(app.config['GENERATED_FOLDER'], filename, as_attachment=True, max_age=media_max_age(filename),
+                      offload=config.MEDIA_OFFLOAD, accel_prefix=config.MEDIA_ACCEL_PREFIX)
 
 @app.route('/video/<filename>')
 def video(filename):
-    """Stream a generated video"""
-    return send_from_directory(app.config['GENERATED_FOLDER'], filename)
+    """Stream a generated video with byte ranges, so the player can seek"""
+    return send_media(app.config['GENERATED_FOLDER'], filename, max_age=media_max_age(filename),
+                      offload=config.MEDIA_OFFLOAD, accel_prefix=config.MEDIA_ACCEL_PREFIX)
+
+@app.cli.command('backfill-history')
+def backfill_history():
+    """Index generated videos that predate the history store"""
+    added = 0
+    for entry in os.scandir(app.config['GENERATED_FOLDER']):
+        if not entry.name.startswith('deepfake_') or not entry.is_file() or history_store.contains(entry.name):
+            continue
+        job = job_queue.get_by_output(entry.name)
+        if job is not None and job['state'] == DONE:
+            history_store.record(
+                entry.path,
+                source_hash=job['source_hash'],
+                params=job['params'],
+                processing_seconds=job['finished_at'] - job['started_at'],
+                created_at=job['finished_at'],
+                job_id=job['id']
+            )
+        else:
+            history_store.record(entry.path, created_at=entry.stat().st_mtime)
+        added += 1
+    print(f"Indexed {added} generated file(s)")
 
 if __name__ == '__main__':
     # Create required directories if they don't exist
@@ -0,0 +1,202 @@
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from deepfake import IMAGE_EXTENSIONS
+from effects import parse_effect_chain
+from result_cache import result_key
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov')
+BATCH_EXTENSIONS = IMAGE_EXTENSIONS + VIDEO_EXTENSIONS
+
+# Per-item settings a manifest line may override
+ITEM_PARAMS = ('effect', 'brightness', 'contrast')
+
+
+def is_batch_source(source):
+    """
+    Whether a CLI input names a batch (directory, glob pattern or .jsonl manifest) rather than one file
+    """
+    return os.path.isdir(source) or source.lower().endswith('.jsonl') or glob.has_magic(source)
+
+
+def load_batch(source, defaults):
+    """
+    Batch items for a directory (its media files, not recursive), a glob pattern
+    or a JSONL manifest with one {"input": ..., "effect": ..., "brightness": ...,
+    "contrast": ...} object per line. Settings missing from a manifest line are
+    taken from defaults; relative inputs are resolved against the manifest.
+    Raises ValueError for an unreadable manifest line or an invalid effect.
+    """
+    if source.lower().endswith('.jsonl') and not glob.has_magic(source):
+        items = _load_manifest(source, defaults)
+    else:
+        if os.path.isdir(source):
+            paths = [os.path.join(source, name) for name in os.listdir(source)]
+        else:
+            paths = glob.glob(source, recursive=True)
+        items = [dict(defaults, input=path) for path in sorted(paths)
+                 if os.path.isfile(path) and path.lower().endswith(BATCH_EXTENSIONS)]
+    for item in items:
+        item['effect'] = ','.join(parse_effect_chain(item['effect']))
+    return items
+
+
+def _load_manifest(path, defaults):
+    base = os.path.dirname(os.path.abspath(path))
+    items = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                entry = json.loads(line)
+                input_path = entry['input']
+            except (ValueError, TypeError, KeyError) as e:
+                raise ValueError(f"{path}:{line_number}: expected a JSON object with an input ({e})")
+            item = dict(defaults, input=os.path.join(base, os.path.expanduser(input_path)))
+            item.update((name, entry[name]) for name in ITEM_PARAMS if name in entry)
+            items.append(item)
+    return items
+
+
+def batch_output_path(item, output_dir, generator_options=None, image_output=False):
+    """
+    Output path for a batch item, derived from the input's path, size and
+    modification time and the settings, so a rerun finds the outputs it
+    already produced without hashing the inputs
+    """
+    stat = os.stat(item['input'])
+    name, extension = os.path.splitext(os.path.basename(item['input']))
+    if not (image_output and extension.lower() in IMAGE_EXTENSIONS):
+        extension = '.mp4'
+    fingerprint = f"{os.path.abspath(item['input'])}:{stat.st_size}:{stat.st_mtime_ns}"
+    params = {name: value for name, value in item.items() if name != 'input'}
+    key = result_key(fingerprint, params, generator_options, extension)
+    return os.path.join(output_dir, f"deepfake_{name}_{key[:12]}{extension}")
+
+
+def _partial_path(output_path):
+    # Keep the extension last, the encoders pick the container from it
+    stem, extension = os.path.splitext(output_path)
+    return f"{stem}.partial{extension}"
+
+
+# Generator owned by each batch worker process, created when the worker starts
+_batch_generator = None
+
+
+def _init_worker(generator_options, warm_up=False):
+    global _batch_generator
+    from deepfake import DeepfakeGenerator
+
+    _batch_generator = DeepfakeGenerator(**generator_options)
+    if warm_up:
+        # Load the face mesh before the first item, so its stage timings do not include the load
+        _batch_generator.warm_up()
+
+
+def _run_item(item, output_path):
+    """
+    Executed in a worker process: generate one item into a partial file and
+    move it into place, so an interrupted run never leaves an output that
+    looks complete. Returns the generator's job summary.
+    """
+    partial_path = _partial_path(output_path)
+    params = {name: value for name, value in item.items() if name != 'input'}
+    try:
+        # One line per item is reported instead of interleaved per-worker progress bars
+        summary = _batch_generator.generate_deepfake(item['input'], partial_path, show_progress=False, **params)
+        os.replace(partial_path, output_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return summary
+
+
+def run_batch(items, output_dir, jobs=None, generator_options=None, image_output=False, force=False,
+              report=print):
+    """
+    Generate every batch item on a pool of jobs worker processes, each with one
+    generator created when it starts and reused for all of its items (with its
+    face mesh loaded up front when any item uses face_mesh). Items
+    whose output already exists are skipped unless force is set. Larger inputs
+    are scheduled first, so a long video does not start last and hold up the end
+    of the run. Returns a summary dict of counts, throughput and the seconds
+    spent in each pipeline stage over all items.
+    """
+    generator_options = generator_options or {}
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    os.makedirs(output_dir, exist_ok=True)
+
+    pending = []
+    skipped = missing = 0
+    for item in items:
+        try:
+            output_path = batch_output_path(item, output_dir, generator_options, image_output)
+        except OSError as e:
+            missing += 1
+            report(f"Failed {item['input']}: {e.strerror}")
+            continue
+        if not force and os.path.exists(output_path):
+            skipped += 1
+            report(f"Skipped {item['input']} (done: {output_path})")
+        else:
+            pending.append((item, output_path))
+    pending.sort(key=lambda entry: os.path.getsize(entry[0]['input']), reverse=True)
+
+    summary = {
+        'items': len(items),
+        'processed': 0,
+        'skipped': skipped,
+        'failed': missing,
+        'frames': 0,
+        'jobs': jobs,
+        'stage_seconds': {},
+    }
+    start = time.perf_counter()
+    busy = 0.0
+    if pending:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(pending)),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(generator_options, any('face_mesh' in parse_effect_chain(item['effect'])
+                                             for item, _ in pending))
+        ) as executor:
+            futures = {executor.submit(_run_item, item, output_path): (item, output_path)
+                       for item, output_path in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                item, output_path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    summary['failed'] += 1
+                    report(f"[{done}/{len(pending)}] Failed {item['input']}: {str(e) or e.__class__.__name__}")
+                    continue
+                frames, seconds = result['frames'], result['seconds']
+                summary['processed'] += 1
+                summary['frames'] += frames
+                busy += seconds
+                for name, stage in result['stages'].items():
+                    summary['stage_seconds'][name] = round(summary['stage_seconds'].get(name, 0) + stage['seconds'], 3)
+                report(f"[{done}/{len(pending)}] {item['input']} -> {output_path} "
+                       f"({frames} frames in {seconds:.1f}s, {frames / seconds if seconds else 0:.1f} fps)")
+
+    elapsed = time.perf_counter() - start
+    summary.update(
+        elapsed_seconds=round(elapsed, 2),
+        items_per_minute=round(summary['processed'] * 60 / elapsed, 2) if elapsed > 0 else 0.0,
+        frames_per_second=round(summary['frames'] / elapsed, 2) if elapsed > 0 else 0.0,
+        # Share of the pool's capacity spent generating, lower when workers wait on stragglers
+        utilisation=round(busy / (elapsed * min(jobs, len(pending))), 3) if pending and elapsed > 0 else 0.0,
+    )
+    return summary
@@ -0,0 +1,89 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Make the application modules importable when running `python benchmarks/<script>.py`
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+
+def make_test_video(path, width=1280, height=720, frames=120, fps=30):
+    """
+    Write a deterministic synthetic clip (moving shapes on a gradient) to path
+    """
+    gradient = np.tile(np.linspace(0, 255, width, dtype=np.uint8), (height, 1))
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for i in range(frames):
+        frame = cv2.merge([gradient, np.roll(gradient, i * 4, axis=1), gradient[::-1]])
+        cx = int((i * 7) % width)
+        cv2.circle(frame, (cx, height // 2), height // 6, (0, 0, 255), -1)
+        cv2.rectangle(frame, (width // 8, (i * 5) % height), (width // 4, (i * 5) % height + height // 8),
+                      (255, 255, 0), -1)
+        out.write(frame)
+    out.release()
+    return path
+
+
+def draw_synthetic_face(frame, center, height):
+    """
+    Draw a frontal face-like pattern (skin oval, eyes, brows, nose, mouth) of the given height, centered at center
+    """
+    cx, cy = center
+    half_width, half_height = int(height * 0.375), height // 2
+    stroke = max(2, height // 60)
+    cv2.ellipse(frame, (cx, cy), (half_width, half_height), 0, 0, 360, (150, 175, 225), -1)
+    eye_y = cy - height // 10
+    for side in (-1, 1):
+        eye_x = cx + side * half_width * 2 // 5
+        cv2.ellipse(frame, (eye_x, eye_y), (half_width // 5, height // 24), 0, 0, 360, (245, 245, 245), -1)
+        cv2.circle(frame, (eye_x, eye_y), height // 30, (50, 40, 30), -1)
+        brow_y = eye_y - height // 12
+        cv2.line(frame, (eye_x - half_width // 4, brow_y), (eye_x + half_width // 4, brow_y - height // 120),
+                 (40, 50, 70), stroke * 2)
+    cv2.line(frame, (cx, eye_y + height // 20), (cx - half_width // 10, cy + height // 10), (110, 130, 180), stroke)
+    cv2.ellipse(frame, (cx, cy + height // 4), (half_width // 3, height // 20), 0, 0, 180, (70, 70, 160), stroke * 2)
+    return frame
+
+
+def make_face_frame(width, height, index):
+    """
+    Deterministic frame index of a synthetic clip: moving shapes on a gradient and a slowly drifting face-like pattern
+    """
+    gradient = np.tile(np.linspace(0, 255, width, dtype=np.uint8), (height, 1))
+    frame = cv2.merge([gradient, np.roll(gradient, index * 4, axis=1), gradient[::-1]])
+    cv2.circle(frame, (int((index * 7) % width), height // 6), height // 10, (0, 0, 255), -1)
+    cv2.rectangle(frame, (width // 16, (index * 5) % height), (width // 8, (index * 5) % height + height // 8),
+                  (255, 255, 0), -1)
+    center = (width // 2 + int(width * 0.05 * np.sin(index / 15)),
+              height // 2 + int(height * 0.03 * np.cos(index / 15)))
+    return draw_synthetic_face(frame, center, height * 3 // 5)
+
+
+def make_face_video(path, width=1280, height=720, frames=120, fps=30):
+    """
+    Write a deterministic synthetic clip with a face-like pattern (see make_face_frame) to path
+    """
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for i in range(frames):
+        out.write(make_face_frame(width, height, i))
+    out.release()
+    return path
+
+
+class Timer:
+    """
+    Context manager measuring wall time in seconds
+    """
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,103 @@
+"""
+Microbenchmark of the per-frame adjust+effect step: the original
+adjust_image -> effect -> GRAY2BGR sequence against the compiled EffectChain.
+
+Reports ms/frame and bytes allocated per frame (tracemalloc peak above the
+steady state, also expressed in full-frame equivalents).
+
+Usage: python benchmarks/bench_effect_kernels.py [--width 1920 --height 1080 --frames 50]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from _common import APP_DIR  # noqa: F401  (puts the application on sys.path)
+from deepfake import DeepfakeGenerator
+
+
+# The effect implementations as they were before effect chains existed
+LEGACY_EFFECTS = {
+    'original': lambda generator, frame: frame,
+    'grayscale': lambda generator, frame: cv2.cvtColor(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), cv2.COLOR_GRAY2BGR),
+    'edge': lambda generator, frame: cv2.Canny(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), 100, 200),
+    'blur': lambda generator, frame: cv2.GaussianBlur(frame, (15, 15), 0),
+    'face_mesh': lambda generator, frame: generator.apply_face_mesh(frame),
+}
+
+
+def legacy_step(generator, frame, effect, brightness, contrast):
+    """
+    The per-frame work as done before compiled effect chains existed
+    """
+    frame = generator.adjust_image(frame, brightness, contrast)
+    processed = LEGACY_EFFECTS[effect](generator, frame)
+    if len(processed.shape) == 2:
+        processed = cv2.cvtColor(processed, cv2.COLOR_GRAY2BGR)
+    return processed
+
+
+def measure(step, frames):
+    # Warm-up call allocates any reusable buffers
+    step(frames[0].copy())
+
+    tracemalloc.start()
+    peak_bytes = 0
+    for frame in frames:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        step(frame)
+        peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for frame in frames:
+        step(frame)
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000 / len(frames), peak_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Effect kernel microbenchmark')
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--frames', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    source = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(args.frames)]
+    frame_bytes = source[0].nbytes
+
+    generator = DeepfakeGenerator()
+    results = []
+    for effect in LEGACY_EFFECTS:
+        for brightness, contrast in ((0, 1.0), (20, 1.3)):
+            # Fresh copies so in-place processing does not compound across runs
+            frames = [frame.copy() for frame in source]
+            legacy_ms, legacy_bytes = measure(
+                lambda f: legacy_step(generator, f, effect, brightness, contrast), frames)
+
+            kernel = generator.compile_effect(effect, brightness, contrast)
+            frames = [frame.copy() for frame in source]
+            kernel_ms, kernel_bytes = measure(lambda f: kernel(f, out=f), frames)
+
+            results.append({
+                'effect': effect,
+                'brightness': brightness,
+                'contrast': contrast,
+                'before_ms_per_frame': round(legacy_ms, 3),
+                'after_ms_per_frame': round(kernel_ms, 3),
+                'before_alloc_bytes_per_frame': legacy_bytes,
+                'after_alloc_bytes_per_frame': kernel_bytes,
+                'before_alloc_frames': round(legacy_bytes / frame_bytes, 2),
+                'after_alloc_frames': round(kernel_bytes / frame_bytes, 2),
+            })
+    generator.cleanup()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark of the output encoder backends: OpenCV mp4v against ffmpeg/x264
+at several presets and CRF values.
+
+Encodes the same synthetic clip with every configuration and reports
+encode fps and output bytes per second of video. ffmpeg configurations
+are skipped when no ffmpeg executable is found.
+
+Usage: python benchmarks/bench_encoders.py [--width 1280 --height 720 --frames 150 --ffmpeg ffmpeg]
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+import cv2
+
+from _common import Timer, make_test_video
+from encoders import create_encoder
+
+FFMPEG_CONFIGS = [
+    {'preset': preset, 'crf': crf}
+    for preset in ('ultrafast', 'veryfast', 'medium')
+    for crf in (23, 28)
+]
+
+
+def load_frames(path):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def encode(frames, path, fps, backend, options):
+    height, width = frames[0].shape[:2]
+    with Timer() as timer:
+        with create_encoder(backend, path, fps, (width, height), options) as out:
+            for frame in frames:
+                out.write(frame)
+    return timer.elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Encoder backend benchmark')
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--frames', type=int, default=150)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--ffmpeg', default='ffmpeg', help='ffmpeg executable')
+    args = parser.parse_args()
+
+    configs = [('opencv', {})]
+    if shutil.which(args.ffmpeg):
+        configs += [('ffmpeg', dict(config, binary=args.ffmpeg)) for config in FFMPEG_CONFIGS]
+    else:
+        print(f"{args.ffmpeg} not found, benchmarking the OpenCV encoder only")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_test_video(os.path.join(tmp, 'source.mp4'), args.width, args.height, args.frames, args.fps)
+        frames = load_frames(source)
+        seconds = len(frames) / args.fps
+
+        results = []
+        for backend, options in configs:
+            output = os.path.join(tmp, f'{backend}.mp4')
+            elapsed = encode(frames, output, args.fps, backend, options)
+            size = os.path.getsize(output)
+            results.append({
+                'encoder': backend,
+                'preset': options.get('preset'),
+                'crf': options.get('crf'),
+                'encode_fps': round(len(frames) / elapsed, 1),
+                'bytes_per_second': round(size / seconds),
+            })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
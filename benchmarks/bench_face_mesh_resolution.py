@@ -0,0 +1,96 @@
+"""
+Benchmark of face mesh inference at full resolution against the downscaled
+inference path (face_mesh_resolution) for 720p, 1080p and 4K frames.
+
+Reports ms/frame for detect_face_landmarks and the mean landmark distance
+in full-resolution pixels between the two paths. Without --face-image the
+frames contain no face, which still times detection but reports no error.
+
+Usage: python benchmarks/bench_face_mesh_resolution.py [--face-image face.png --resolution 640 --frames 30]
+"""
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from _common import APP_DIR  # noqa: F401  (puts the application on sys.path)
+from deepfake import DeepfakeGenerator
+
+SIZES = {
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+    '4k': (3840, 2160),
+}
+
+
+def make_frame(size, face):
+    """
+    Gray frame with the face image scaled to the frame height in the middle
+    (MediaPipe's short-range detector misses faces much smaller than that in
+    a 16:9 frame)
+    """
+    width, height = size
+    frame = np.full((height, width, 3), 96, dtype=np.uint8)
+    if face is not None:
+        face = cv2.resize(face, (height, height), interpolation=cv2.INTER_AREA)
+        left = (width - height) // 2
+        frame[:, left:left + height] = face
+    return frame
+
+
+def time_detection(generator, frame, frames):
+    # Static images: a fresh generator per path keeps FaceMesh tracking state comparable
+    landmarks = generator.detect_face_landmarks(frame)
+    start = time.perf_counter()
+    for _ in range(frames):
+        generator.detect_face_landmarks(frame)
+    return (time.perf_counter() - start) * 1000 / frames, landmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Face mesh inference resolution benchmark')
+    parser.add_argument('--face-image', help='Image containing a face, pasted into every frame')
+    parser.add_argument('--resolution', type=int, default=640,
+                        help='face_mesh_resolution for the downscaled path')
+    parser.add_argument('--frames', type=int, default=30)
+    args = parser.parse_args()
+
+    face = None
+    if args.face_image:
+        face = cv2.imread(args.face_image)
+        if face is None:
+            parser.error(f"Could not read {args.face_image}")
+
+    results = []
+    for label, size in SIZES.items():
+        frame = make_frame(size, face)
+
+        generator = DeepfakeGenerator()
+        full_ms, full_landmarks = time_detection(generator, frame, args.frames)
+        generator.cleanup()
+
+        generator = DeepfakeGenerator(face_mesh_resolution=args.resolution)
+        small_ms, small_landmarks = time_detection(generator, frame, args.frames)
+        generator.cleanup()
+
+        result = {
+            'size': label,
+            'resolution': args.resolution,
+            'full_ms_per_frame': round(full_ms, 2),
+            'downscaled_ms_per_frame': round(small_ms, 2),
+            'speedup': round(full_ms / small_ms, 2),
+            'faces_full': len(full_landmarks),
+            'faces_downscaled': len(small_landmarks),
+        }
+        if full_landmarks and len(full_landmarks) == len(small_landmarks):
+            error = np.linalg.norm(full_landmarks[0] - small_landmarks[0], axis=1)
+            result['landmark_error_mean_px'] = round(float(error.mean()), 2)
+            result['landmark_error_max_px'] = round(float(error.max()), 2)
+        results.append(result)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
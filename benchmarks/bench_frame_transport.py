@@ -0,0 +1,169 @@
+"""
+Compare per-frame copies and allocations of the serial generate_deepfake loop,
+a process pool fed pickled frames and the shared-memory ring buffer pipeline.
+
+Usage: python benchmarks/bench_frame_transport.py [--width 1920 --height 1080 --frames 120 --workers 4]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+
+import cv2
+
+from _common import Timer, make_test_video
+from deepfake import DeepfakeGenerator
+from frame_pipeline import ParallelFramePipeline
+
+
+def _data_pointer(array):
+    return array.__array_interface__['data'][0]
+
+
+class CountingWriter:
+    """
+    VideoWriter wrapper recording which frame buffers reach the encoder
+    """
+    def __init__(self, writer):
+        self.writer = writer
+        self.buffers = set()
+        self.frames = 0
+
+    def write(self, frame):
+        self.buffers.add(_data_pointer(frame))
+        self.frames += 1
+        self.writer.write(frame)
+
+
+# Per-process generator of the pickled-queue workers
+_worker_generator = None
+
+
+def _init_pickled_worker():
+    global _worker_generator
+    _worker_generator = DeepfakeGenerator()
+
+
+def _process_pickled(task):
+    frame, effect, brightness, contrast = task
+    return _worker_generator.process_frame(frame, effect, brightness, contrast)
+
+
+def bench_serial(generator, input_path, output_path, effect, brightness, contrast):
+    cap = cv2.VideoCapture(input_path)
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    allocations = 0
+    with Timer() as timer:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            # cap.read() returns a freshly allocated frame every call
+            allocations += 1
+            processed = generator.process_frame(frame, effect, brightness, contrast)
+            if _data_pointer(processed) != _data_pointer(frame):
+                allocations += 1
+            out.write(processed)
+    cap.release()
+    out.release()
+    frames = int(cv2.VideoCapture(output_path).get(cv2.CAP_PROP_FRAME_COUNT))
+    return {
+        'mode': 'serial',
+        'ms_per_frame': timer.elapsed * 1000 / max(frames, 1),
+        # Lower bound: intermediate arrays inside the effect are not counted
+        'frame_allocations_per_frame': allocations / max(frames, 1),
+        # A single process: frames never cross a process boundary
+        'ipc_copies_per_frame': None,
+    }
+
+
+def bench_pickled(input_path, output_path, effect, brightness, contrast, workers):
+    cap = cv2.VideoCapture(input_path)
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    writer = CountingWriter(cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size))
+    stats = {'decoded': 0, 'ipc_copies': 0}
+
+    def tasks():
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            stats['decoded'] += 1
+            # Pickled onto the task queue, then unpickled into a new array in the worker
+            stats['ipc_copies'] += 1
+            yield frame, effect, brightness, contrast
+
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(workers, initializer=_init_pickled_worker) as pool:
+        # Warm the workers up so start-up is not timed
+        pool.map(_process_pickled, [(cap.read()[1], effect, brightness, contrast)] * workers)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        with Timer() as timer:
+            for processed in pool.imap(_process_pickled, tasks(), chunksize=1):
+                # And the result comes back the same way
+                stats['ipc_copies'] += 1
+                writer.write(processed)
+    cap.release()
+    writer.writer.release()
+    frames = writer.frames
+    return {
+        'mode': f'pickled_queue x{workers}',
+        'ms_per_frame': timer.elapsed * 1000 / max(frames, 1),
+        # Parent side only: each decoded frame and each result unpickled from a worker is a new array
+        'frame_allocations_per_frame': (stats['decoded'] + frames) / max(frames, 1),
+        'ipc_copies_per_frame': stats['ipc_copies'] / max(frames, 1),
+    }
+
+
+def bench_ring(input_path, output_path, effect, brightness, contrast, workers):
+    cap = cv2.VideoCapture(input_path)
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    writer = CountingWriter(cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size))
+    pipeline = ParallelFramePipeline(workers, effect, brightness, contrast)
+    with Timer() as timer:
+        frames = pipeline.run(cap, writer)
+    cap.release()
+    writer.writer.release()
+    stats = pipeline.stats
+    return {
+        'mode': f'shared_ring x{workers}',
+        'ms_per_frame': timer.elapsed * 1000 / max(frames, 1),
+        # Slots are allocated once for the whole run
+        'frame_allocations_per_frame': len(writer.buffers) / max(frames, 1),
+        # Only slot indices are queued; frame data crosses a process boundary only when an
+        # effect returns a new array that the worker copies back into its slot
+        'ipc_copies_per_frame': stats['worker_copies'] / max(frames, 1),
+        'decode_copies_per_frame': stats['decode_copies'] / max(frames, 1),
+        'worker_copies_per_frame': stats['worker_copies'] / max(frames, 1),
+        'backpressure_waits': stats['backpressure_waits'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Frame transport benchmark')
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--effect', default='blur')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = make_test_video(os.path.join(tmp, 'input.mp4'), args.width, args.height, args.frames)
+        generator = DeepfakeGenerator()
+        results = [
+            bench_serial(generator, input_path, os.path.join(tmp, 'serial.mp4'), args.effect, 10, 1.2),
+            bench_pickled(input_path, os.path.join(tmp, 'pickled.mp4'), args.effect, 10, 1.2, args.workers),
+            bench_ring(input_path, os.path.join(tmp, 'ring.mp4'), args.effect, 10, 1.2, args.workers),
+        ]
+        generator.cleanup()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Microbenchmark of face mesh landmark rendering: the original per-point
+cv2.circle loop against the vectorized draw_points, plus the cost of the
+tessellation and contour overlays.
+
+Synthetic landmarks are used so the numbers measure drawing only. Reports
+ms/frame and Python-level drawing calls per frame for 1-4 faces; the
+vectorized path should stay flat while the loop grows with the point count.
+
+Usage: python benchmarks/bench_landmark_drawing.py [--width 1920 --height 1080 --frames 200]
+"""
+import argparse
+import json
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from _common import APP_DIR  # noqa: F401  (puts the application on sys.path)
+from face_tracking import draw_connections, draw_points
+
+LANDMARKS_PER_FACE = 468
+
+
+def legacy_draw(frame, faces):
+    """
+    The per-point loop apply_face_mesh used before vectorized drawing
+    """
+    calls = 0
+    for points in faces:
+        for x, y in points.astype(int):
+            cv2.circle(frame, (int(x), int(y)), 1, (0, 255, 0), -1)
+            calls += 1
+    return calls
+
+
+def vectorized_draw(frame, faces, overlays=()):
+    """
+    The drawing done by apply_face_mesh: all faces in one call per layer
+    """
+    faces = np.stack(faces)
+    for connections, color in overlays:
+        draw_connections(frame, faces, connections, color)
+    draw_points(frame, faces, (0, 255, 0))
+    return len(overlays) + 1
+
+
+def measure(draw, frame, frames):
+    calls = draw(frame)
+    start = time.perf_counter()
+    for _ in range(frames):
+        draw(frame)
+    return (time.perf_counter() - start) * 1000 / frames, calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Landmark drawing microbenchmark')
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--frames', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = np.zeros((args.height, args.width, 3), dtype=np.uint8)
+    face_mesh = mp.solutions.face_mesh
+    tessellation = (np.array(sorted(face_mesh.FACEMESH_TESSELATION), dtype=np.intp), (192, 192, 192))
+    contours = (np.array(sorted(face_mesh.FACEMESH_CONTOURS), dtype=np.intp), (255, 255, 255))
+
+    results = []
+    for face_count in (1, 2, 4):
+        # Faces a third of the frame height across at random positions
+        side = args.height / 3
+        faces = [rng.uniform(0, side, (LANDMARKS_PER_FACE, 2)) + rng.uniform(0, 1, 2) * (args.width - side,
+                                                                                       args.height - side)
+                 for _ in range(face_count)]
+
+        # Both paths must produce the same pixels
+        expected, actual = frame.copy(), frame.copy()
+        legacy_draw(expected, faces)
+        vectorized_draw(actual, faces)
+        assert np.array_equal(expected, actual), "vectorized drawing differs from cv2.circle"
+
+        legacy_ms, legacy_calls = measure(lambda f: legacy_draw(f, faces), frame, args.frames)
+        vector_ms, vector_calls = measure(lambda f: vectorized_draw(f, faces), frame, args.frames)
+        overlay_ms, overlay_calls = measure(
+            lambda f: vectorized_draw(f, faces, (tessellation, contours)), frame, args.frames)
+        results.append({
+            'faces': face_count,
+            'points': face_count * LANDMARKS_PER_FACE,
+            'loop_ms_per_frame': round(legacy_ms, 3),
+            'loop_draw_calls': legacy_calls,
+            'vectorized_ms_per_frame': round(vector_ms, 3),
+            'vectorized_draw_calls': vector_calls,
+            'speedup': round(legacy_ms / vector_ms, 1),
+            'with_overlays_ms_per_frame': round(overlay_ms, 3),
+            'with_overlays_draw_calls': overlay_calls,
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
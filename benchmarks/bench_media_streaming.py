@@ -0,0 +1,126 @@
+"""
+Load test of concurrent video streaming: the Flask /video route and the
+standalone media server used by the CLI and desktop app.
+
+Each client plays the clip the way a browser player does, fetching it in
+byte ranges of --range-size, and some clients seek to random offsets.
+Reports aggregate throughput, per-request latency and how many responses
+were served as 206 Partial Content. A final request with the ETag checks
+that revalidation is answered with 304 Not Modified.
+
+Usage: python benchmarks/bench_media_streaming.py [--clients 16 --size-mb 64 --range-size 1048576 --seeks 4]
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from _common import Timer
+from media import create_media_server
+
+
+def start_flask_server(folder):
+    from werkzeug.serving import make_server
+
+    import app as web_app
+    web_app.app.config['GENERATED_FOLDER'] = folder
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, web_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.port, '/video/'
+
+
+def start_media_server(folder):
+    server = create_media_server(folder, 0, '127.0.0.1')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1], '/'
+
+
+def stream(port, path, size, range_size, seeks, seed):
+    """
+    Fetch the whole file in consecutive ranges, plus `seeks` random ranges; return per-request timings
+    """
+    rng = random.Random(seed)
+    starts = list(range(0, size, range_size)) + [rng.randrange(size) for _ in range(seeks)]
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    latencies, received, partial = [], 0, 0
+    for start in starts:
+        end = min(start + range_size, size) - 1
+        with Timer() as timer:
+            connection.request('GET', path, headers={'Range': f'bytes={start}-{end}'})
+            response = connection.getresponse()
+            body = response.read()
+        latencies.append(timer.elapsed)
+        received += len(body)
+        partial += response.status == 206
+    connection.close()
+    return latencies, received, partial
+
+
+def revalidates(port, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    connection.request('HEAD', path)
+    response = connection.getresponse()
+    response.read()
+    etag = response.getheader('ETag')
+    connection.request('GET', path, headers={'If-None-Match': etag})
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response.status == 304
+
+
+def run(name, start, folder, filename, size, args):
+    server, port, prefix = start(folder)
+    path = prefix + filename
+    try:
+        with Timer() as timer:
+            with ThreadPoolExecutor(max_workers=args.clients) as executor:
+                results = list(executor.map(
+                    lambda seed: stream(port, path, size, args.range_size, args.seeks, seed),
+                    range(args.clients)
+                ))
+        latencies = sorted(latency for result in results for latency in result[0])
+        received = sum(result[1] for result in results)
+        return {
+            'server': name,
+            'clients': args.clients,
+            'requests': len(latencies),
+            'partial_responses': sum(result[2] for result in results),
+            'throughput_mb_s': round(received / timer.elapsed / 1024 ** 2, 1),
+            'latency_ms_median': round(statistics.median(latencies) * 1000, 2),
+            'latency_ms_p95': round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+            'revalidates_304': revalidates(port, path),
+        }
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent media streaming load test')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--size-mb', type=int, default=64)
+    parser.add_argument('--range-size', type=int, default=1024 * 1024)
+    parser.add_argument('--seeks', type=int, default=4, help='random seeks per client')
+    parser.add_argument('--server', choices=['flask', 'media', 'both'], default='both')
+    args = parser.parse_args()
+
+    servers = {'flask': start_flask_server, 'media': start_media_server}
+    names = list(servers) if args.server == 'both' else [args.server]
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = 'deepfake_bench.mp4'
+        size = args.size_mb * 1024 * 1024
+        with open(os.path.join(tmp, filename), 'wb') as f:
+            f.write(os.urandom(size))
+        results = [run(name, servers[name], tmp, filename, size, args) for name in names]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark of the face_mesh effect as the number of faces grows.
+
+Builds clips with a grid of 1, 2, 4 or 6 copies of a face image drifting
+slowly across the frame and times apply_face_mesh per frame with full
+inference (stride 1) and with landmark tracking (stride 4). Reports
+ms/frame, ms per face and the face-count histogram from the run stats.
+
+A tightly cropped face image works best: MediaPipe's short-range detector
+misses faces that end up small once the grid is letterboxed.
+
+Usage: python benchmarks/bench_multi_face.py --face-image face.png [--cell 360 --frames 60]
+"""
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from _common import APP_DIR  # noqa: F401  (puts the application on sys.path)
+from deepfake import DeepfakeGenerator
+
+GRIDS = {1: (1, 1), 2: (2, 1), 4: (2, 2), 6: (3, 2)}
+
+
+def make_frames(face, faces, cell, frames):
+    """
+    Frames with a columns x rows grid of the face, shifted a little every frame
+    """
+    columns, rows = GRIDS[faces]
+    tile = cv2.resize(face, (cell, cell), interpolation=cv2.INTER_AREA)
+    grid = np.full((rows * cell, columns * cell, 3), 96, dtype=np.uint8)
+    for row in range(rows):
+        for column in range(columns):
+            grid[row * cell:(row + 1) * cell, column * cell:(column + 1) * cell] = tile
+    result = []
+    for i in range(frames):
+        shift = np.float32([[1, 0, 8 * np.sin(i / 10)], [0, 1, 4 * np.cos(i / 10)]])
+        result.append(cv2.warpAffine(grid, shift, (grid.shape[1], grid.shape[0]), borderValue=(96, 96, 96)))
+    return result
+
+
+def run(frames, faces, stride):
+    generator = DeepfakeGenerator(max_num_faces=faces, face_mesh_stride=stride)
+    generator.apply_face_mesh(frames[0].copy())
+    generator.face_tracker.reset()
+    start = time.perf_counter()
+    for frame in frames:
+        generator.apply_face_mesh(frame.copy())
+    elapsed = time.perf_counter() - start
+    summary = generator.face_tracker.summary()
+    generator.cleanup()
+    return elapsed * 1000 / len(frames), summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-face face mesh benchmark')
+    parser.add_argument('--face-image', required=True, help='Image containing one face, tiled into the grid')
+    parser.add_argument('--cell', type=int, default=360, help='Size of each grid cell in pixels')
+    parser.add_argument('--frames', type=int, default=60)
+    args = parser.parse_args()
+
+    face = cv2.imread(args.face_image)
+    if face is None:
+        parser.error(f"Could not read {args.face_image}")
+
+    results = []
+    for faces in GRIDS:
+        frames = make_frames(face, faces, args.cell, args.frames)
+        for stride in (1, 4):
+            ms, summary = run(frames, faces, stride)
+            detected = sum(faces_seen * count for faces_seen, count in summary['face_counts'].items())
+            results.append({
+                'faces': faces,
+                'stride': stride,
+                'frame_size': f"{frames[0].shape[1]}x{frames[0].shape[0]}",
+                'ms_per_frame': round(ms, 2),
+                'ms_per_face': round(ms * summary['frames'] / detected, 2) if detected else None,
+                'face_counts': summary['face_counts'],
+                'inference_frames': summary['inference_frames'],
+                'roi_redetections': summary['roi_redetections'],
+            })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark of the desktop live preview on a 4K source: rendering the
+settings on downscaled proxy frames against full-resolution frames, and
+how PreviewRenderer coalesces a burst of slider moves.
+
+The burst sends --moves brightness changes --interval ms apart, as a
+dragged slider does, and reports how many previews were shown (moves that
+arrive during a render are coalesced) and the latency from a move to the
+preview that shows it.
+
+Usage: python benchmarks/bench_preview.py [--width 3840 --height 2160 --effect blur,edge --moves 60 --interval 16]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from _common import Timer, make_test_video
+from deepfake import DeepfakeGenerator
+from preview import PreviewRenderer, sample_proxy_frames
+
+
+def render_ms(generator, frames, effect):
+    generator.process_frame(frames[0], effect, 10, 1.2)
+    with Timer() as timer:
+        for brightness in range(5):
+            for frame in frames:
+                generator.process_frame(frame, effect, brightness, 1.2)
+    return timer.elapsed * 1000 / 5
+
+
+def burst(renderer, effect, moves, interval):
+    """
+    Drag brightness through `moves` values; returns the renders run and the latency of each shown preview
+    """
+    requested = {}
+    latencies = []
+    shown = [None]
+
+    def collect():
+        result = renderer.poll()
+        if result is not None:
+            shown[0] = result[1][1]
+            latencies.append(time.perf_counter() - requested[shown[0]])
+
+    for move in range(moves):
+        requested[move] = time.perf_counter()
+        renderer.request(effect, move, 1.2)
+        time.sleep(interval / 1000)
+        collect()
+    while shown[0] != moves - 1:
+        time.sleep(0.001)
+        collect()
+    return len(latencies), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Desktop live preview benchmark')
+    parser.add_argument('--width', type=int, default=3840)
+    parser.add_argument('--height', type=int, default=2160)
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--effect', default='blur,edge')
+    parser.add_argument('--samples', type=int, default=4)
+    parser.add_argument('--max-side', type=int, default=240)
+    parser.add_argument('--moves', type=int, default=60)
+    parser.add_argument('--interval', type=float, default=16, help='ms between slider moves')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_test_video(os.path.join(tmp, 'clip.mp4'), args.width, args.height, args.frames)
+        generator = DeepfakeGenerator()
+        with Timer() as sampling:
+            proxies = sample_proxy_frames(path, args.samples, args.max_side)
+        full = sample_proxy_frames(path, args.samples, max(args.width, args.height))
+        full_ms = render_ms(generator, full, args.effect)
+        proxy_ms = render_ms(generator, proxies, args.effect)
+        generator.cleanup()
+
+        renderer = PreviewRenderer(DeepfakeGenerator, args.samples, args.max_side)
+        renderer.set_source(path)
+        renderer.request(args.effect, 0, 1.0)
+        while renderer.poll() is None:
+            time.sleep(0.001)
+        renders, latencies = burst(renderer, args.effect, args.moves, args.interval)
+        renderer.close()
+
+    print(json.dumps({
+        'source': f'{args.width}x{args.height}',
+        'effect': args.effect,
+        'sampled_frames': len(proxies),
+        'proxy_size': f'{proxies[0].shape[1]}x{proxies[0].shape[0]}',
+        'sampling_ms': round(sampling.elapsed * 1000, 1),
+        'full_resolution_render_ms': round(full_ms, 2),
+        'proxy_render_ms': round(proxy_ms, 2),
+        'speedup': round(full_ms / proxy_ms, 1),
+        'slider_moves': args.moves,
+        'previews_shown': renders,
+        'move_to_preview_ms_median': round(statistics.median(latencies) * 1000, 1),
+        'move_to_preview_ms_max': round(max(latencies) * 1000, 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
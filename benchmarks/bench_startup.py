@@ -0,0 +1,93 @@
+"""
+Benchmark of start-up time: importing the generator, creating one, CLI
+invocations (--help, and a short clip with a non-face effect and with
+face_mesh), the Flask app up to its first response, and the PyInstaller
+CLI built by build_exe.py when it exists (dist/DeepfakeGenerator-CLI).
+
+Every measurement runs in a fresh interpreter and reports the median wall
+time in seconds over --runs runs.
+
+Usage: python benchmarks/bench_startup.py [--runs 5 --exe dist/DeepfakeGenerator-CLI]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import APP_DIR, make_test_video
+
+FLASK_FIRST_RESPONSE = """
+import app
+response = app.app.test_client().get('/')
+assert response.status_code == 200, response.status_code
+"""
+
+
+def default_exe():
+    name = 'DeepfakeGenerator-CLI.exe' if sys.platform == 'win32' else 'DeepfakeGenerator-CLI'
+    return os.path.join(APP_DIR, 'dist', name)
+
+
+def measure(command, runs, cwd):
+    """
+    Median wall time of running command to completion; outputs the CLI reports are deleted after each run
+    """
+    env = dict(os.environ, PYTHONPATH=APP_DIR)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True)
+        times.append(time.perf_counter() - start)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{' '.join(command)} failed:\n{completed.stderr[-2000:]}")
+        match = re.search(r'Output saved to: (.+)', completed.stdout)
+        if match and os.path.exists(match.group(1).strip()):
+            os.remove(match.group(1).strip())
+    return round(statistics.median(times), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Start-up time benchmark')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--exe', default=default_exe(), help='PyInstaller CLI executable to time, if built')
+    args = parser.parse_args()
+
+    python = sys.executable
+    cli = os.path.join(APP_DIR, 'cli_app.py')
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = make_test_video(os.path.join(tmp, 'clip.mp4'), 320, 240, frames=10)
+        commands = {
+            'import_deepfake': [python, '-c', 'import deepfake'],
+            'create_generator': [python, '-c', 'import deepfake; deepfake.DeepfakeGenerator()'],
+            'create_generator_warmed': [python, '-c', 'import deepfake; deepfake.DeepfakeGenerator().warm_up()'],
+            'cli_help': [python, cli, '--help'],
+            'cli_blur_clip': [python, cli, clip, '--effect', 'blur', '--no-cache'],
+            'cli_face_mesh_clip': [python, cli, clip, '--effect', 'face_mesh', '--no-cache'],
+            'flask_first_response': [python, '-c', FLASK_FIRST_RESPONSE],
+        }
+        if os.path.exists(args.exe):
+            commands['exe_help'] = [args.exe, '--help']
+            commands['exe_blur_clip'] = [args.exe, clip, '--effect', 'blur', '--no-cache']
+
+        results = {}
+        for name, command in commands.items():
+            try:
+                results[name] = measure(command, args.runs, tmp)
+            except RuntimeError as e:
+                results[name] = None
+                print(e, file=sys.stderr)
+
+    print(json.dumps({
+        'runs': args.runs,
+        'seconds': results,
+        'exe': args.exe if os.path.exists(args.exe) else 'not built (run build_exe.py)',
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark of frame access in the result viewer: seeking with
+cap.set(CAP_PROP_POS_FRAMES) for every frame against FramePrefetcher
+(keyframe-aware seeks, LRU cache of display frames, background read-ahead).
+
+Uses a long-GOP H.264 clip when ffmpeg is available (the case where seeks
+decode from a distant keyframe), otherwise OpenCV's mp4v. Measures
+sequential playback, random seeks and back-and-forth scrubbing, in
+milliseconds per displayed frame.
+
+Usage: python benchmarks/bench_viewer_seeking.py [--frames 600 --gop 120 --seeks 100]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+
+import cv2
+
+from _common import Timer, make_test_video
+from frame_cache import FramePrefetcher, keyframe_index
+
+DISPLAY_SIZE = (800, 450)
+
+
+def prepare(frame):
+    return cv2.cvtColor(cv2.resize(frame, DISPLAY_SIZE), cv2.COLOR_BGR2RGB)
+
+
+class SeekingReader:
+    """
+    The viewer's previous access pattern: seek and decode on every request
+    """
+    def __init__(self, path):
+        self.cap = cv2.VideoCapture(path)
+
+    def get(self, frame_number):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        ret, frame = self.cap.read()
+        return prepare(frame) if ret else None
+
+    def close(self):
+        self.cap.release()
+
+
+def make_long_gop_video(path, frames, gop, ffmpeg):
+    source = make_test_video(path + '.src.mp4', frames=frames)
+    if not shutil.which(ffmpeg):
+        return source
+    subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-i', source, '-c:v', 'libx264', '-preset', 'veryfast',
+                    '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0', path], check=True)
+    return path
+
+
+def playback(reader, frames, fps):
+    """
+    Play frames in order at fps, as the viewer does; returns ms spent per frame
+    """
+    interval = 1.0 / fps
+    with Timer() as timer:
+        for frame_number in frames:
+            start = time.perf_counter()
+            reader.get(frame_number)
+            # The viewer is idle between frames, which is when the prefetcher decodes ahead
+            time.sleep(max(interval - (time.perf_counter() - start), 0))
+    return timer.elapsed
+
+
+def access(reader, frames):
+    with Timer() as timer:
+        for frame_number in frames:
+            reader.get(frame_number)
+    return timer.elapsed * 1000 / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Result viewer frame access benchmark')
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--gop', type=int, default=120, help='keyframe interval of the H.264 clip')
+    parser.add_argument('--seeks', type=int, default=100)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--ffmpeg', default='ffmpeg')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    seeks = [rng.randrange(args.frames) for _ in range(args.seeks)]
+    # Drag the slider back and forth over a stretch of the clip, as when scrubbing for a moment
+    stretch = list(range(args.frames // 3, args.frames // 3 + 60))
+    scrub = (stretch + stretch[::-1]) * 3
+    playback_frames = list(range(min(args.frames, int(args.fps * 5))))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_long_gop_video(os.path.join(tmp, 'clip.mp4'), args.frames, args.gop, args.ffmpeg)
+        keyframes = keyframe_index(path)
+        results = []
+        for name, factory in (('seek_per_frame', lambda: SeekingReader(path)),
+                              ('prefetcher', lambda: FramePrefetcher(path, prepare))):
+            reader = factory()
+            try:
+                elapsed = playback(reader, playback_frames, args.fps)
+                results.append({
+                    'reader': name,
+                    'playback_realtime_ratio': round(len(playback_frames) / args.fps / elapsed, 3),
+                    'random_seek_ms': round(access(reader, seeks), 2),
+                    'scrub_ms': round(access(reader, scrub), 2),
+                })
+            finally:
+                reader.close()
+
+    print(json.dumps({
+        'codec': 'h264' if shutil.which(args.ffmpeg) else 'mp4v',
+        'keyframes': len(keyframes) if keyframes else None,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
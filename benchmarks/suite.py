@@ -0,0 +1,226 @@
+"""
+Reproducible benchmark suite for the whole generation pipeline.
+
+Synthesizes deterministic inputs (moving shapes plus a face-like pattern
+that MediaPipe detects) at each resolution and length, as an mp4 clip and
+as a still image, and runs generate_deepfake() on every registered effect
+with several brightness/contrast settings. Each case runs in a fresh
+process, so its peak RSS is its own. Reports fps, ms/frame, peak RSS,
+output size and the per-stage timings of the job summary as JSON.
+
+With --baseline, cases are matched by id against an earlier report and
+ms/frame or peak RSS growth beyond the thresholds is flagged as a
+regression (exit status 1). Timings only compare on the same machine.
+
+Usage: python benchmarks/suite.py [--resolutions 640x360,1280x720 --lengths 60 --output report.json]
+       python benchmarks/suite.py --baseline report.json [--time-threshold 0.10 --rss-threshold 0.20]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+from _common import APP_DIR, make_face_frame, make_face_video
+
+# (brightness, contrast) combinations run for every effect
+SETTINGS = ((0, 1.0), (30, 1.5), (-20, 0.8))
+
+INPUT_TYPES = ('video', 'image')
+
+# Frame rate of the synthetic clips and of the clips made from still images
+FPS = 30
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MB, None where the resource module is unavailable (Windows)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def case_id(case):
+    return (f"{case['input_type']}/{case['width']}x{case['height']}/{case['frames']}f/{case['effect']}"
+            f"/b{case['brightness']}c{case['contrast']}")
+
+
+def make_input(directory, input_type, width, height, frames):
+    """
+    Synthesize (once per run) the input for a case
+    """
+    if input_type == 'image':
+        path = os.path.join(directory, f'still_{width}x{height}.png')
+        if not os.path.exists(path):
+            cv2.imwrite(path, make_face_frame(width, height, 0))
+        return path
+    path = os.path.join(directory, f'clip_{width}x{height}_{frames}.mp4')
+    if not os.path.exists(path):
+        make_face_video(path, width, height, frames, FPS)
+    return path
+
+
+def run_case(case, input_path, output_path, repeat):
+    """
+    Executed in a fresh worker process: generate the case repeat times and report the median run
+    """
+    sys.path.insert(0, APP_DIR)
+    from deepfake import DeepfakeGenerator
+
+    generator = DeepfakeGenerator()
+    # First calls pay for lazy initialisation (MediaPipe graph, OpenCV kernels), which is not what is measured
+    generator.process_frame(make_face_frame(case['width'], case['height'], 0), case['effect'],
+                            case['brightness'], case['contrast'])
+    params = {'effect': case['effect'], 'brightness': case['brightness'], 'contrast': case['contrast'],
+              'still_duration': case['frames'] / FPS, 'still_fps': FPS, 'show_progress': False}
+    summaries = [generator.generate_deepfake(input_path, output_path, **params) for _ in range(repeat)]
+    faces = generator.face_tracker.summary().get('face_counts', {})
+    generator.cleanup()
+
+    summary = sorted(summaries, key=lambda item: item['seconds'])[len(summaries) // 2]
+    return dict(
+        case,
+        id=case_id(case),
+        fps=summary['fps'],
+        ms_per_frame=round(1000 / summary['fps'], 3) if summary['fps'] else None,
+        peak_rss_mb=peak_rss_mb(),
+        output_bytes=os.path.getsize(output_path),
+        frames_with_face=sum(count for faces_found, count in faces.items() if faces_found) or None,
+        stages={name: stage['mean_ms'] for name, stage in summary['stages'].items()},
+    )
+
+
+def compare(results, baseline, time_threshold, rss_threshold):
+    """
+    Cases of results that got slower or bigger than in baseline beyond the thresholds (fractions),
+    plus improvements and cases missing on either side
+    """
+    previous = {result['id']: result for result in baseline['results']}
+    current = {result['id']: result for result in results}
+    regressions, improvements = [], []
+    for result in results:
+        before = previous.get(result['id'])
+        if before is None:
+            continue
+        for metric, threshold in (('ms_per_frame', time_threshold), ('peak_rss_mb', rss_threshold)):
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            entry = {'id': result['id'], 'metric': metric, 'baseline': old, 'current': new,
+                     'change': round(change, 3)}
+            if change > threshold:
+                regressions.append(entry)
+            elif change < -threshold:
+                improvements.append(entry)
+    return {
+        'baseline_environment': baseline.get('environment'),
+        'time_threshold': time_threshold,
+        'rss_threshold': rss_threshold,
+        'regressions': regressions,
+        'improvements': improvements,
+        'new_cases': sorted(set(current) - set(previous)),
+        'missing_cases': sorted(set(previous) - set(current)),
+    }
+
+
+def environment():
+    import mediapipe
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'mediapipe': mediapipe.__version__,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pipeline benchmark suite')
+    parser.add_argument('--resolutions', default='640x360,1280x720,1920x1080',
+                        help='comma-separated WIDTHxHEIGHT list')
+    parser.add_argument('--lengths', default='30,120', help='comma-separated clip lengths in frames')
+    parser.add_argument('--effects', default=None, help='comma-separated effects (default: every registered effect)')
+    parser.add_argument('--input-types', default=','.join(INPUT_TYPES), help='video, image or both')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, the median is reported')
+    parser.add_argument('--output', default=None, help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', default=None, help='earlier report to compare against')
+    parser.add_argument('--time-threshold', type=float, default=0.10,
+                        help='ms/frame increase over the baseline flagged as a regression (fraction)')
+    parser.add_argument('--rss-threshold', type=float, default=0.20,
+                        help='peak RSS increase over the baseline flagged as a regression (fraction)')
+    args = parser.parse_args()
+
+    from deepfake import DeepfakeGenerator
+
+    resolutions = [tuple(int(side) for side in size.split('x')) for size in args.resolutions.split(',')]
+    lengths = [int(length) for length in args.lengths.split(',')]
+    effects = args.effects.split(',') if args.effects else list(DeepfakeGenerator.EFFECT_NAMES)
+    input_types = args.input_types.split(',')
+    cases = [
+        {'input_type': input_type, 'width': width, 'height': height, 'frames': frames, 'effect': effect,
+         'brightness': brightness, 'contrast': contrast}
+        for input_type in input_types
+        for width, height in resolutions
+        for frames in lengths
+        for effect in effects
+        for brightness, contrast in SETTINGS
+    ]
+
+    results = []
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        # One process per case, so peak RSS and lazily initialised state never carry over
+        with ctx.Pool(1, maxtasksperchild=1) as pool:
+            for number, case in enumerate(cases, 1):
+                input_path = make_input(tmp, case['input_type'], case['width'], case['height'], case['frames'])
+                output_path = os.path.join(tmp, 'output.mp4')
+                result = pool.apply(run_case, (case, input_path, output_path, args.repeat))
+                results.append(result)
+                print(f"[{number}/{len(cases)}] {result['id']}: {result['ms_per_frame']} ms/frame, "
+                      f"{result['peak_rss_mb']} MB", file=sys.stderr)
+
+    report = {
+        'environment': environment(),
+        'settings': {'repeat': args.repeat, 'fps': FPS},
+        'summary': {
+            'cases': len(results),
+            'median_ms_per_frame': statistics.median(result['ms_per_frame'] for result in results),
+            'max_peak_rss_mb': max((result['peak_rss_mb'] or 0) for result in results),
+        },
+        'results': results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['comparison'] = compare(results, json.load(f), args.time_threshold, args.rss_threshold)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        regressions = report['comparison']['regressions']
+        for entry in regressions:
+            print(f"REGRESSION {entry['id']} {entry['metric']}: {entry['baseline']} -> {entry['current']} "
+                  f"({entry['change']:+.0%})", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,47 +1,147 @@
 import argparse
+import json
+import multiprocessing
 import os
-from deepfake import DeepfakeGenerator
+from batch import is_batch_source, load_batch, run_batch
+from deepfake import FACE_MESH_OVERLAYS, IMAGE_EXTENSIONS, DeepfakeGenerator
+from encoders import ENCODER_REGISTRY
+from effects import parse_effect_chain
+from history_store import HistoryStore
 from datetime import datetime
-from desktop_app_config import UPLOAD_FOLDER, GENERATED_FOLDER, allowed_file
-import shutil
+from desktop_app_config import (UPLOAD_FOLDER, GENERATED_FOLDER, DATABASE_PATH, RESULT_CACHE_MAX_BYTES,
+                                RESULT_CACHE_MAX_AGE, MEDIA_SERVER_PORT, allowed_file)
+from media import create_media_server
+from metrics import format_stages
+from result_cache import ResultCache, hash_file, result_key
 from tqdm import tqdm
 
 def main():
     parser = argparse.ArgumentParser(description='Deepfake Generator CLI')
-    parser.add_argument('input', help='Input file path (image or video)')
-    parser.add_argument('--effect', default='original', 
-                       choices=['original', 'grayscale', 'edge', 'blur', 'face_mesh'],
-                       help='Effect to apply')
+    parser.add_argument('input', help='Input file path (image or video), or for batch mode a directory, a quoted '
+                                      'glob pattern or a JSONL manifest of {"input", "effect", "brightness", '
+                                      '"contrast"} objects')
+    parser.add_argument('--effect', default='original',
+                       help='Effect to apply, or a comma-separated chain applied in one pass '
+                            f'(e.g. blur,edge). Available: {", ".join(DeepfakeGenerator.EFFECT_NAMES)}')
     parser.add_argument('--brightness', type=int, default=0,
                        help='Brightness adjustment (-100 to 100)')
     parser.add_argument('--contrast', type=float, default=1.0,
                        help='Contrast adjustment (0.0 to 3.0)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Number of frame worker processes for a single video input (default: 1, serial)')
+    parser.add_argument('--frame-queue-depth', type=int, default=4,
+                       help='Frames buffered between the decode thread, the effects and the encode thread when '
+                            'processing serially (default: 4, 0 = no threads)')
+    parser.add_argument('--encoder', default='opencv', choices=list(ENCODER_REGISTRY),
+                       help='Output encoder: opencv (mp4v), ffmpeg (H.264, needs ffmpeg on PATH) or hls '
+                            '(ffmpeg plus an HLS stream playable while encoding) (default: opencv)')
+    parser.add_argument('--preset', default='veryfast',
+                       help='x264 preset for --encoder ffmpeg, ultrafast to veryslow (default: veryfast)')
+    parser.add_argument('--crf', type=int, default=23,
+                       help='x264 constant rate factor for --encoder ffmpeg, 0-51, lower is better (default: 23)')
+    parser.add_argument('--encoder-threads', type=int, default=0,
+                       help='x264 threads for --encoder ffmpeg (default: 0, automatic)')
+    parser.add_argument('--still-duration', type=float, default=3.0,
+                       help='Length in seconds of the video made from an image input (default: 3.0)')
+    parser.add_argument('--still-fps', type=float, default=30.0,
+                       help='Frame rate of the video made from an image input (default: 30)')
+    parser.add_argument('--image-output', action='store_true',
+                       help='For an image input, save the processed image instead of a video')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Regenerate even if the same input was already processed with the same settings')
+    parser.add_argument('--face-mesh-stride', type=int, default=1,
+                       help='Run full face mesh inference every K frames and track landmarks in between (default: 1)')
+    parser.add_argument('--face-mesh-motion-threshold', type=float, default=None,
+                       help='Also re-run face mesh inference when mean frame difference (0-255) exceeds this')
+    parser.add_argument('--face-mesh-drift', action='store_true',
+                       help='Report tracked vs. inferred landmark drift (runs inference on every frame)')
+    parser.add_argument('--face-mesh-resolution', type=int, default=None,
+                       help='Downscale frames so the longest side is at most this many pixels for face mesh '
+                            'inference (default: full resolution)')
+    parser.add_argument('--face-mesh-overlay', action='append', default=[], choices=list(FACE_MESH_OVERLAYS),
+                       help='Also draw face mesh lines (repeatable)')
+    parser.add_argument('--max-faces', type=int, default=1,
+                       help='Maximum number of faces annotated per frame by face_mesh (default: 1)')
+    parser.add_argument('--jobs', type=int, default=None,
+                       help='Batch mode: number of worker processes, each processing whole files with its own '
+                            'generator (default: CPU count)')
+    parser.add_argument('--output-dir', default=GENERATED_FOLDER,
+                       help='Batch mode: directory for the outputs (default: the generated folder)')
+    parser.add_argument('--force', action='store_true',
+                       help='Batch mode: regenerate outputs that already exist from an earlier run')
+    parser.add_argument('--summary-json', default=None,
+                       help='Batch mode: also write the throughput summary to this JSON file')
+    parser.add_argument('--serve', action='store_true',
+                       help=f'Serve the output over HTTP on port {MEDIA_SERVER_PORT} until interrupted')
     
     args = parser.parse_args()
     
+    batch = is_batch_source(args.input)
+    
     # Validate input file
-    if not os.path.exists(args.input):
+    if not batch and not os.path.exists(args.input):
         print(f"Error: Input file '{args.input}' does not exist")
         return
     
-    if not allowed_file(args.input):
+    try:
+        args.effect = ','.join(parse_effect_chain(args.effect))
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    
+    if args.workers < 1:
+        print("Error: --workers must be at least 1")
+        return
+    
+    if args.frame_queue_depth < 0:
+        print("Error: --frame-queue-depth must not be negative")
+        return
+    
+    if args.still_duration <= 0 or args.still_fps <= 0:
+        print("Error: --still-duration and --still-fps must be positive")
+        return
+    
+    if args.max_faces < 1:
+        print("Error: --max-faces must be at least 1")
+        return
+    
+    if args.jobs is not None and args.jobs < 1:
+        print("Error: --jobs must be at least 1")
+        return
+    
+    if not batch and not allowed_file(args.input):
         print("Error: Invalid file type. Supported types: .png, .jpg, .jpeg, .mp4, .avi, .mov")
         return
     
     try:
-        # Initialize generator
-        generator = DeepfakeGenerator()
+        encoder_options = {}
+        if args.encoder in ('ffmpeg', 'hls'):
+            encoder_options = {'preset': args.preset, 'crf': args.crf, 'threads': args.encoder_threads}
+        
+        generator_options = {
+            'face_mesh_stride': args.face_mesh_stride,
+            'face_mesh_motion_threshold': args.face_mesh_motion_threshold,
+            'face_mesh_drift': args.face_mesh_drift,
+            'face_mesh_resolution': args.face_mesh_resolution,
+            'face_mesh_overlays': args.face_mesh_overlay,
+            'max_num_faces': args.max_faces,
+            'encoder': args.encoder,
+            'encoder_options': encoder_options,
+            'frame_queue_depth': args.frame_queue_depth,
+        }
+        
+        if batch:
+            run_batch_mode(args, generator_options)
+            return
         
         # Create unique filename
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = os.path.basename(args.input)
-        name, _ = os.path.splitext(filename)
-        output_filename = f"deepfake_{name}_{timestamp}.mp4"
-        
-        # Copy input file to uploads folder
-        upload_path = os.path.join(UPLOAD_FOLDER, filename)
-        print(f"\nCopying input file to: {upload_path}")
-        shutil.copy2(args.input, upload_path)
+        name, extension = os.path.splitext(filename)
+        if args.image_output and extension.lower() in IMAGE_EXTENSIONS:
+            output_filename = f"deepfake_{name}_{timestamp}{extension}"
+        else:
+            output_filename = f"deepfake_{name}_{timestamp}.mp4"
         
         # Generate output path
         output_path = os.path.join(GENERATED_FOLDER, output_filename)
@@ -51,29 +151,87 @@ def main():
         print(f"Effect: {args.effect}")
         print(f"Brightness: {args.brightness}")
         print(f"Contrast: {args.contrast}")
+        print(f"Workers: {args.workers}")
         
-        # Generate deepfake with progress bar
-        print("\nGenerating deepfake...")
-        generator.generate_deepfake(
-            upload_path,
-            output_path,
-            effect=args.effect,
-            brightness=args.brightness,
-            contrast=args.contrast
-        )
+        # Look for an earlier output of the same input and settings
+        params = {'effect': args.effect, 'brightness': args.brightness, 'contrast': args.contrast}
+        if extension.lower() in IMAGE_EXTENSIONS:
+            params.update(still_duration=args.still_duration, still_fps=args.still_fps)
+        cache = ResultCache(DATABASE_PATH, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_MAX_AGE,
+                            on_evict=HistoryStore(DATABASE_PATH).forget_output)
+        cache_key = result_key(hash_file(args.input), params, generator_options,
+                               os.path.splitext(output_filename)[1])
+        cached_path = None if args.no_cache else cache.lookup(cache_key)
         
-        print(f"\nDeepfake generated successfully!")
+        if cached_path is not None:
+            output_path = cached_path
+            output_filename = os.path.basename(cached_path)
+            print("\nFound a cached result for this input and settings (use --no-cache to regenerate)")
+        else:
+            # Generate deepfake with progress bar; the input is read in place, not copied
+            print("\nGenerating deepfake...")
+            generator = DeepfakeGenerator(**generator_options)
+            summary = generator.generate_deepfake(
+                args.input,
+                output_path,
+                workers=args.workers,
+                **params
+            )
+            cache.store(cache_key, output_path)
+            print(f"\nDeepfake generated successfully!")
+            print(f"{summary['frames']} frames in {summary['seconds']}s ({summary['fps']} fps); "
+                  f"per frame: {format_stages(summary)}")
         print(f"Output saved to: {output_path}")
         
-        # Start HTTP server to serve the file
-        print(f"\nStarting HTTP server to serve the generated file...")
-        print(f"Please open http://localhost:8000/{output_filename} in your web browser")
-        os.system(f'python3 -m http.server 8000 -d {GENERATED_FOLDER}')
+        if args.serve:
+            # Serve the file with range requests, so browsers can seek in it
+            print(f"\nStarting HTTP server to serve the generated file...")
+            print(f"Please open http://localhost:{MEDIA_SERVER_PORT}/{output_filename} in your web browser")
+            server = create_media_server(GENERATED_FOLDER, MEDIA_SERVER_PORT)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
         
     except Exception as e:
         print(f"\nError: {str(e)}")
 
+def run_batch_mode(args, generator_options):
+    """
+    Process every file of a directory, glob or manifest and print the throughput summary
+    """
+    defaults = {'effect': args.effect, 'brightness': args.brightness, 'contrast': args.contrast,
+                'still_duration': args.still_duration, 'still_fps': args.still_fps}
+    try:
+        items = load_batch(args.input, defaults)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return
+    if not items:
+        print(f"Error: No input files found in '{args.input}'")
+        return
+    
+    print(f"\nBatch of {len(items)} file(s) into {args.output_dir}")
+    summary = run_batch(items, args.output_dir, args.jobs, generator_options, args.image_output, args.force)
+    
+    print("\nBatch summary:")
+    print(f"Processed: {summary['processed']}, skipped: {summary['skipped']}, failed: {summary['failed']}")
+    print(f"Elapsed: {summary['elapsed_seconds']}s with {summary['jobs']} worker(s), "
+          f"{summary['utilisation']:.0%} busy")
+    print(f"Throughput: {summary['items_per_minute']} files/min, {summary['frames_per_second']} frames/s "
+          f"({summary['frames']} frames)")
+    if summary['stage_seconds']:
+        print("Time per stage: " + ', '.join(f"{name} {seconds:.1f}s"
+                                             for name, seconds in summary['stage_seconds'].items()))
+    if args.summary_json:
+        with open(args.summary_json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
 if __name__ == "__main__":
+    # In the PyInstaller build, spawned batch and frame workers must run their entry point, not main()
+    multiprocessing.freeze_support()
     # Create required directories
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
     os.makedirs(GENERATED_FOLDER, exist_ok=True)
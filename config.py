@@ -4,7 +4,56 @@ import os
 UPLOAD_FOLDER = 'static/uploads'
 GENERATED_FOLDER = 'static/generated'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'mp4', 'avi', 'mov'}
-MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max request size (single-request uploads and each upload chunk)
+MAX_UPLOAD_SIZE = 2 * 1024 * 1024 * 1024  # 2GB max file size for chunked uploads
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # Chunk size suggested to chunked upload clients
+UPLOAD_EXPIRY = 24 * 3600  # Seconds before an unfinished chunked upload is removed
+
+# Processing configurations
+MAX_WORKERS = os.cpu_count() or 1  # Upper bound for frame worker processes per job
+FRAME_QUEUE_DEPTH = 4  # Frames buffered around the decode and encode threads of a single-worker job (0 = no threads)
+
+# Output encoder configurations
+ENCODER = 'opencv'  # 'opencv' (mp4v, no external tools), 'ffmpeg' (H.264 via ffmpeg) or 'hls' (ffmpeg plus a live stream)
+ENCODER_PRESET = 'veryfast'  # x264 preset for the ffmpeg encoder: ultrafast ... veryslow
+ENCODER_CRF = 23  # x264 constant rate factor (0-51, lower = better quality, larger files)
+ENCODER_THREADS = 0  # x264 threads (0 = automatic)
+FFMPEG_BINARY = 'ffmpeg'  # ffmpeg executable name or path
+HLS_SEGMENT_SECONDS = 2  # Segment length of the 'hls' encoder's live stream; playback starts after the first segment
+
+# Still image configurations
+STILL_DURATION = 3.0  # Seconds of video generated from an uploaded image
+STILL_FPS = 30.0  # Frame rate of video generated from an uploaded image
+
+# Job queue configurations
+DATABASE_PATH = 'deepfake.db'  # SQLite file holding persistent job state
+JOB_CONCURRENCY = 2  # Jobs processed at the same time
+JOB_QUEUE_LIMIT = 16  # Queued plus running jobs before /upload answers 429
+JOB_EXECUTOR = 'process'  # 'process' (worker processes) or 'thread' (threads, one pooled generator per concurrent job)
+
+# Result cache configurations
+RESULT_CACHE_MAX_BYTES = 5 * 1024 * 1024 * 1024  # Cached outputs kept in GENERATED_FOLDER before LRU eviction
+RESULT_CACHE_MAX_AGE = 7 * 24 * 3600  # Seconds an unused cached output is kept
+
+# History page configurations
+HISTORY_PAGE_SIZE = 25  # Outputs listed per history page
+
+# Metrics configurations
+METRICS_LATENCY_WINDOW = 1000  # Most recent jobs the /metrics job latency quantiles are computed over
+
+# Media serving configurations
+MEDIA_MAX_AGE = 365 * 24 * 3600  # Cache lifetime of /video and /download responses (outputs never change)
+MEDIA_OFFLOAD = None  # None (stream from Flask), 'x-sendfile' (Apache/lighttpd) or 'x-accel' (nginx)
+MEDIA_ACCEL_PREFIX = '/protected/generated/'  # nginx internal location aliased to GENERATED_FOLDER for 'x-accel'
+
+# Face mesh configurations
+FACE_MESH_STRIDE = 1  # Run full inference every K frames and track landmarks in between
+FACE_MESH_MOTION_THRESHOLD = None  # Also re-run inference when mean frame difference (0-255) exceeds this
+FACE_MESH_DRIFT = False  # Log tracked vs. inferred landmark drift (costs inference on every frame)
+FACE_MESH_RESOLUTION = None  # Longest side frames are downscaled to for face mesh inference, e.g. 640 (None = full size)
+FACE_MESH_MAX_FACES = 1  # Faces annotated per frame by the face_mesh effect
+FACE_MESH_OVERLAYS = ()  # Extra mesh lines for the face_mesh effect: 'tessellation' and/or 'contours'
+FACE_MESH_WARM_UP = False  # Load MediaPipe's face mesh when job workers start, not on the first face_mesh job
 
 # Flask configurations
 SECRET_KEY = 'your-secret-key-here'  # Change this in production
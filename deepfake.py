@@ -2,37 +2,145 @@ import cv2
 import numpy as np
 import logging
 import os
+import time
 from datetime import datetime
-import mediapipe as mp
 from tqdm import tqdm
+from effects import EFFECT_REGISTRY, EffectChain, parse_effect_chain
+from encoders import ENCODER_REGISTRY, create_encoder
+from face_tracking import LandmarkTracker, draw_connections, draw_points, landmarks_to_arrays
+from frame_pipeline import ParallelFramePipeline, ThreadedFramePipeline
+from metrics import StageTimer, format_stages
+from still_video import write_still_video
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Optional face mesh overlays drawn under the landmark points, with their colors (BGR)
+FACE_MESH_OVERLAYS = {
+    'tessellation': (192, 192, 192),
+    'contours': (255, 255, 255),
+}
+
 class DeepfakeGenerator:
-    def __init__(self):
+    # Names of the registered effects, usable without creating a generator
+    EFFECT_NAMES = tuple(EFFECT_REGISTRY)
+    
+    def __init__(self, face_mesh_stride=1, face_mesh_motion_threshold=None, face_mesh_drift=False,
+                 face_mesh_resolution=None, face_mesh_overlays=(), max_num_faces=1,
+                 encoder='opencv', encoder_options=None, frame_queue_depth=4):
+        """
+        face_mesh_stride: run full face mesh inference every K frames and track landmarks in between
+        face_mesh_motion_threshold: also re-run inference when the mean frame difference (0-255) exceeds this
+        face_mesh_drift: measure tracked vs. inferred landmark drift (runs inference on every frame)
+        face_mesh_resolution: longest side in pixels frames are downscaled to for face mesh inference
+            (None = full resolution); landmarks are still drawn at full resolution
+        face_mesh_overlays: extra mesh lines drawn by the face_mesh effect ('tessellation', 'contours')
+        max_num_faces: maximum number of faces the face_mesh effect annotates per frame
+        encoder: output encoder backend, 'opencv' (mp4v) or 'ffmpeg' (x264 over a pipe)
+        encoder_options: backend options, e.g. {'preset': 'veryfast', 'crf': 23, 'threads': 0} for ffmpeg
+        frame_queue_depth: frames buffered between the decode thread, the effects and the encode thread of
+            serial video processing (0 = decode, process and encode one frame at a time on one thread)
+        """
         self.logger = logger
         self.logger.info("DeepfakeGenerator initialized")
         
-        # Initialize MediaPipe Face Mesh
+        # Constructor options, reused to build identical generators in worker processes
+        self.options = {
+            'face_mesh_stride': face_mesh_stride,
+            'face_mesh_motion_threshold': face_mesh_motion_threshold,
+            'face_mesh_drift': face_mesh_drift,
+            'face_mesh_resolution': face_mesh_resolution,
+            'face_mesh_overlays': tuple(face_mesh_overlays),
+            'max_num_faces': max_num_faces,
+            'encoder': encoder,
+            'encoder_options': dict(encoder_options or {}),
+            'frame_queue_depth': frame_queue_depth,
+        }
+        if encoder not in ENCODER_REGISTRY:
+            raise ValueError(f"Unknown encoder: {encoder}. Available: {', '.join(ENCODER_REGISTRY)}")
+        self.encoder = encoder
+        self.encoder_options = self.options['encoder_options']
+        self.frame_queue_depth = frame_queue_depth
+        self.face_mesh_resolution = face_mesh_resolution
+        self.max_num_faces = max_num_faces
+        # Reused downscale and RGB buffers for face mesh inference
+        self._inference_buffers = {}
+        
+        # MediaPipe is imported and the Face Mesh graph built on first use (see load_face_mesh),
+        # so generators that never run face_mesh do not pay for them
+        self.mp_face_mesh = None
+        self._face_mesh = None
+        unknown = [name for name in face_mesh_overlays if name not in FACE_MESH_OVERLAYS]
+        if unknown:
+            raise ValueError(f"Unknown face mesh overlay(s): {', '.join(unknown)}")
+        # (E, 2) landmark index pairs per requested overlay, filled in by load_face_mesh
+        self._overlay_names = tuple(face_mesh_overlays)
+        self.face_mesh_overlays = []
+        self.face_tracker = LandmarkTracker(
+            self.detect_face_landmarks,
+            stride=face_mesh_stride,
+            motion_threshold=face_mesh_motion_threshold,
+            measure_drift=face_mesh_drift,
+            redetect=self.detect_face_in_roi
+        )
+        # Single-face FaceMesh for re-detecting a lost face in its region, created on first use
+        self._roi_face_mesh = None
+        
+        # Initialize video effects (see effects.py for the registry)
+        self.effects = {name: effect_class(self) for name, effect_class in EFFECT_REGISTRY.items()}
+        
+        # Compiled effect chains keyed by (effect names, brightness, contrast)
+        self._chains = {}
+        
+        # StageTimer of the generate_deepfake() call in progress, if any
+        self.timer = None
+        
+    @property
+    def face_mesh(self):
+        """
+        The MediaPipe Face Mesh, built on first access
+        """
+        if self._face_mesh is None:
+            self.load_face_mesh()
+        return self._face_mesh
+    
+    def load_face_mesh(self):
+        """
+        Import MediaPipe and build the Face Mesh graph and overlay connections (idempotent)
+        """
+        if self._face_mesh is not None:
+            return
+        start = time.perf_counter()
+        import mediapipe as mp
+        
         self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
+        self._face_mesh = self.mp_face_mesh.FaceMesh(
             static_image_mode=False,
-            max_num_faces=1,
+            max_num_faces=self.max_num_faces,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
-        
-        # Initialize video effects
-        self.effects = {
-            'original': lambda frame: frame,
-            'grayscale': lambda frame: cv2.cvtColor(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), cv2.COLOR_GRAY2BGR),
-            'edge': lambda frame: cv2.Canny(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), 100, 200),
-            'blur': lambda frame: cv2.GaussianBlur(frame, (15, 15), 0),
-            'face_mesh': self.apply_face_mesh
+        connections = {
+            'tessellation': self.mp_face_mesh.FACEMESH_TESSELATION,
+            'contours': self.mp_face_mesh.FACEMESH_CONTOURS,
         }
-        
+        self.face_mesh_overlays = [
+            (np.array(sorted(connections[name]), dtype=np.intp), FACE_MESH_OVERLAYS[name])
+            for name in self._overlay_names
+        ]
+        self.logger.info(f"Face mesh loaded in {time.perf_counter() - start:.2f}s")
+    
+    def warm_up(self):
+        """
+        Load the face mesh and run one inference, so the first face_mesh job does not pay
+        for the import, graph construction and first-inference setup. For servers; optional.
+        """
+        self.load_face_mesh()
+        self.face_mesh.process(np.zeros((64, 64, 3), dtype=np.uint8))
+    
     def adjust_image(self, image, brightness=0, contrast=1):
         """
         Adjust image brightness and contrast
@@ -42,68 +150,170 @@ class DeepfakeGenerator:
         adjusted = cv2.convertScaleAbs(image, alpha=contrast, beta=brightness)
         return adjusted
     
+    def detect_face_landmarks(self, frame):
+        """
+        Run full face mesh inference on a BGR frame.
+        Returns one (468, 2) array of pixel coordinates per detected face.
+        """
+        height, width = frame.shape[:2]
+        small = frame
+        if self.face_mesh_resolution and max(height, width) > self.face_mesh_resolution:
+            # Landmarks are normalized, so detecting on a downscaled copy only
+            # changes the scale they are mapped back with
+            scale = self.face_mesh_resolution / max(height, width)
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            small = cv2.resize(frame, size, dst=self._inference_buffer('small', size),
+                               interpolation=cv2.INTER_LINEAR)
+        size = (small.shape[1], small.shape[0])
+        frame_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self._inference_buffer('rgb', size))
+        start = time.perf_counter()
+        results = self.face_mesh.process(frame_rgb)
+        if self.timer is not None:
+            self.timer.add('face_mesh_inference', time.perf_counter() - start)
+        return landmarks_to_arrays(results.multi_face_landmarks, width, height)
+    
+    def detect_face_in_roi(self, frame, box):
+        """
+        Run face mesh inference on the (x0, y0, x1, y1) region of a BGR frame only.
+        Returns the face's (468, 2) landmarks in frame coordinates, or None.
+        """
+        x0, y0, x1, y1 = box
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return None
+        if self._roi_face_mesh is None:
+            self.load_face_mesh()
+            self._roi_face_mesh = self.mp_face_mesh.FaceMesh(
+                static_image_mode=True,
+                max_num_faces=1,
+                min_detection_confidence=0.5
+            )
+        crop_rgb = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2RGB)
+        start = time.perf_counter()
+        results = self._roi_face_mesh.process(crop_rgb)
+        if self.timer is not None:
+            self.timer.add('face_mesh_inference', time.perf_counter() - start)
+        faces = landmarks_to_arrays(results.multi_face_landmarks, x1 - x0, y1 - y0)
+        if not faces:
+            return None
+        return faces[0] + (x0, y0)
+    
+    def _inference_buffer(self, name, size):
+        shape = (size[1], size[0], 3)
+        buffer = self._inference_buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            self._inference_buffers[name] = buffer
+        return buffer
+    
     def apply_face_mesh(self, frame):
         """
         Apply face mesh effect to the frame
         """
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(frame_rgb)
-        
-        if results.multi_face_landmarks:
-            height, width = frame.shape[:2]
-            for face_landmarks in results.multi_face_landmarks:
-                for landmark in face_landmarks.landmark:
-                    x = int(landmark.x * width)
-                    y = int(landmark.y * height)
-                    cv2.circle(frame, (x, y), 1, (0, 255, 0), -1)
+        # Overlay connections come with the face mesh
+        self.load_face_mesh()
+        faces = self.face_tracker.update(frame)
+        if faces:
+            # Every face is drawn by the same few calls, whatever the face count
+            faces = np.stack(faces)
+            for connections, color in self.face_mesh_overlays:
+                draw_connections(frame, faces, connections, color)
+            draw_points(frame, faces, (0, 255, 0))
         
         return frame
     
+    def compile_effect(self, effect='original', brightness=0, contrast=1):
+        """
+        Return the single-pass EffectChain for these settings.
+        effect: one effect name, a comma-separated chain such as 'blur,edge', or a list of names
+        Chains are cached so their buffers are reused across frames.
+        """
+        names = parse_effect_chain(effect)
+        key = (names, brightness, contrast)
+        chain = self._chains.get(key)
+        if chain is None:
+            if len(self._chains) >= 8:
+                self._chains.clear()
+            chain = EffectChain([self.effects[name] for name in names], brightness, contrast)
+            self._chains[key] = chain
+        return chain
+    
+    def process_frame(self, frame, effect='original', brightness=0, contrast=1, out=None):
+        """
+        Apply adjustments and the selected effect chain to a single BGR frame.
+        Always returns a 3-channel BGR frame suitable for a VideoWriter.
+        out: optional buffer for the result; may be frame itself to work in place
+        """
+        return self.compile_effect(effect, brightness, contrast)(frame, out=out, timer=self.timer)
+    
     def process_image(self, input_path, effect='original', brightness=0, contrast=1):
         """
         Process the input image for deepfake generation with effects
         """
         try:
+            start = time.perf_counter()
             img = cv2.imread(input_path)
+            if self.timer is not None:
+                self.timer.add('decode', time.perf_counter() - start)
             if img is None:
                 raise ValueError("Could not read the image")
             
-            # Apply adjustments
-            img = self.adjust_image(img, brightness, contrast)
-            
-            # Apply selected effect
-            if effect in self.effects:
-                img = self.effects[effect](img)
-            
-            return img
+            # Apply adjustments and the selected effect
+            return self.process_frame(img, effect, brightness, contrast, out=img)
         except Exception as e:
             self.logger.error(f"Error processing image {input_path}: {str(e)}")
             raise
     
-    def generate_deepfake(self, input_path, output_path, effect='original', brightness=0, contrast=1):
+    def generate_deepfake(self, input_path, output_path, effect='original', brightness=0, contrast=1, workers=1,
+                          progress_callback=None, still_duration=3.0, still_fps=30.0, show_progress=True):
         """
         Generate a deepfake video from the input file with effects
+        workers: number of effect worker processes for video input (1 = serial)
+        progress_callback: optional callable(frames_done, total_frames) invoked per frame
+        still_duration, still_fps: length in seconds and frame rate of the clip made from an image input
+        show_progress: draw a progress bar on the console for video input
+        For an image input, an output_path ending in .png/.jpg/.jpeg writes the processed image instead of a clip.
+        Returns the job summary of metrics.StageTimer.summary(): frames, seconds, fps and the per-frame
+        time of each stage (decode, adjust, each effect, face_mesh_inference, encode), plus the face
+        tracker's summary under 'face_mesh' when the face_mesh effect ran.
+        With face mesh tracking (face_mesh_stride > 1, a motion threshold or drift measurement), a
+        face_mesh chain is processed serially whatever workers says, as tracking follows consecutive frames.
         """
+        timer = self.timer = StageTimer()
+        frame_count = 0
         try:
             # Log the start of processing
             self.logger.info(f"Starting deepfake generation for input file: {input_path}")
             self.logger.info(f"Output will be saved to: {output_path}")
             self.logger.info(f"Applied effect: {effect}")
             
+            # Landmark tracking state must not leak from a previous clip
+            self.face_tracker.reset()
+            
             # Process the input file
-            if input_path.lower().endswith(('.png', '.jpg', '.jpeg')):
+            if input_path.lower().endswith(IMAGE_EXTENSIONS):
                 # Process image input
                 img = self.process_image(input_path, effect, brightness, contrast)
                 
-                # Create a video from the image
-                height, width = img.shape[:2]
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                out = cv2.VideoWriter(output_path, fourcc, 30.0, (width, height))
-                
-                # Write the image multiple times to create a video with progress bar
-                for _ in tqdm(range(90), desc="Generating video from image"):  # 3 seconds at 30 fps
-                    out.write(img)
-                out.release()
+                start = time.perf_counter()
+                if output_path.lower().endswith(IMAGE_EXTENSIONS):
+                    if not cv2.imwrite(output_path, img):
+                        raise ValueError(f"Could not write the image to {output_path}")
+                    frame_count = 1
+                else:
+                    frame_count = max(1, round(still_duration * still_fps))
+                    if self.encoder == 'opencv':
+                        # Encode the image once and repeat it for the whole clip
+                        write_still_video(output_path, img, still_fps, frame_count)
+                    else:
+                        # x264 codes the repeated frames as skipped blocks
+                        height, width = img.shape[:2]
+                        with create_encoder(self.encoder, output_path, still_fps, (width, height),
+                                            self.encoder_options) as out:
+                            for _ in range(frame_count):
+                                out.write(img)
+                timer.add('encode', time.perf_counter() - start)
+                if progress_callback is not None:
+                    progress_callback(frame_count, frame_count)
                 
             elif input_path.lower().endswith(('.mp4', '.avi', '.mov')):
                 # Process video input
@@ -117,43 +327,86 @@ class DeepfakeGenerator:
                 fps = int(cap.get(cv2.CAP_PROP_FPS))
                 total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
                 
-                # Create video writer
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+                # Create the encoder
+                out = create_encoder(self.encoder, output_path, fps, (width, height), self.encoder_options)
                 
                 # Process each frame with progress bar
-                with tqdm(total=total_frames, desc="Processing video frames") as pbar:
-                    while cap.isOpened():
-                        ret, frame = cap.read()
-                        if not ret:
-                            break
+                try:
+                    with tqdm(total=total_frames, desc="Processing video frames", disable=not show_progress) as pbar:
+                        frames_done = 0
                         
-                        # Apply adjustments
-                        frame = self.adjust_image(frame, brightness, contrast)
+                        def advance(count=1):
+                            nonlocal frames_done
+                            frames_done += count
+                            pbar.update(count)
+                            if progress_callback is not None:
+                                progress_callback(frames_done, total_frames)
                         
-                        # Apply selected effect
-                        if effect in self.effects:
-                            processed_frame = self.effects[effect](frame)
-                            # Convert single channel to BGR if needed (e.g., for edge detection)
-                            if len(processed_frame.shape) == 2:
-                                processed_frame = cv2.cvtColor(processed_frame, cv2.COLOR_GRAY2BGR)
-                            out.write(processed_frame)
+                        if workers > 1 and 'face_mesh' in parse_effect_chain(effect) and (
+                                self.face_tracker.tracking_enabled or self.face_tracker.measure_drift):
+                            # Landmark tracking needs consecutive frames, which no frame worker sees
+                            self.logger.info("Face mesh tracking is on, processing frames serially "
+                                             f"instead of on {workers} workers")
+                            workers = 1
                         
-                        pbar.update(1)
-                
-                cap.release()
-                out.release()
+                        if workers > 1:
+                            self.logger.info(f"Using {workers} frame worker processes")
+                            pipeline = ParallelFramePipeline(workers, effect, brightness, contrast,
+                                                             generator_options=self.options)
+                            pipeline.run(cap, out, progress=advance, timer=timer)
+                            # Faces were counted by the workers' trackers
+                            for stats, face_counts in pipeline.tracker_stats:
+                                self.face_tracker.merge(stats, face_counts)
+                        elif self.frame_queue_depth > 0:
+                            chain = self.compile_effect(effect, brightness, contrast)
+                            pipeline = ThreadedFramePipeline(
+                                lambda frame: chain(frame, out=frame, timer=timer), self.frame_queue_depth
+                            )
+                            pipeline.run(cap, out, progress=advance, timer=timer)
+                        else:
+                            chain = self.compile_effect(effect, brightness, contrast)
+                            clock = time.perf_counter
+                            frame = None
+                            while cap.isOpened():
+                                # Decode into the previous frame's buffer and process it in place
+                                start = clock()
+                                ret, frame = cap.read(frame)
+                                if not ret:
+                                    break
+                                timer.add('decode', clock() - start)
+                                
+                                processed = chain(frame, out=frame, timer=timer)
+                                start = clock()
+                                out.write(processed)
+                                timer.add('encode', clock() - start)
+                                advance()
+                        frame_count = frames_done
+                finally:
+                    cap.release()
+                    start = time.perf_counter()
+                    out.release()
+                    timer.add('finalize', time.perf_counter() - start)
             
-            self.logger.info(f"Deepfake generation completed: {output_path}")
-            return True
+            summary = timer.summary(frame_count)
+            if self.face_tracker.stats['frames']:
+                summary['face_mesh'] = self.face_tracker.summary()
+                self.logger.info(f"Face mesh stats: {summary['face_mesh']}")
+            self.logger.info(f"Stage timings per frame: {format_stages(summary)}")
+            self.logger.info(f"Deepfake generation completed: {output_path} ({summary['fps']} fps)")
+            return summary
             
         except Exception as e:
             self.logger.error(f"Error generating deepfake for {input_path}: {str(e)}")
             raise
+        finally:
+            self.timer = None
     
     def cleanup(self):
         """
         Clean up any resources
         """
-        self.face_mesh.close()
+        if self._face_mesh is not None:
+            self._face_mesh.close()
+        if self._roi_face_mesh is not None:
+            self._roi_face_mesh.close()
         cv2.destroyAllWindows()
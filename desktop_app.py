@@ -1,21 +1,45 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import cv2
+import multiprocessing
 import os
-from deepfake import DeepfakeGenerator
+import webbrowser
+from PIL import Image, ImageTk
+from deepfake import IMAGE_EXTENSIONS, DeepfakeGenerator
 from datetime import datetime
-from desktop_app_config import UPLOAD_FOLDER, GENERATED_FOLDER, allowed_file
-import shutil
+from desktop_app_config import (GENERATED_FOLDER, DATABASE_PATH, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_MAX_AGE,
+                                MEDIA_SERVER_PORT, PREVIEW_SAMPLES, PREVIEW_MAX_SIDE, PREVIEW_DEBOUNCE_MS,
+                                PREVIEW_POLL_MS, STILL_DURATION, STILL_FPS, allowed_file)
+from effects import parse_effect_chain
+from history_store import HistoryStore
+from media import start_media_server
+from preview import PreviewRenderer
+from result_cache import ResultCache, hash_file, result_key
 
 class DeepfakeDesktopApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Deepfake Generator Desktop")
-        self.root.geometry("800x600")
+        self.root.geometry("800x900")
         
         # Initialize DeepfakeGenerator
         self.generator = DeepfakeGenerator()
         
+        # Earlier outputs by input content and settings
+        # Shares the web app's cache, so evictions must also clean up its history and streams
+        self.result_cache = ResultCache(DATABASE_PATH, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_MAX_AGE,
+                                        on_evict=HistoryStore(DATABASE_PATH).forget_output)
+        
+        # Local server for the output folder, started on first use
+        self.media_server = None
+        # Absolute paths of outputs being written, which the server must not mark cacheable
+        self.pending_outputs = set()
+        
+        # Live preview of the settings on a few downscaled frames, rendered off the Tk thread
+        self.preview = PreviewRenderer(DeepfakeGenerator, PREVIEW_SAMPLES, PREVIEW_MAX_SIDE)
+        self.preview_photo = None
+        self.preview_after_id = None
+        
         # Create main frame with padding
         self.main_frame = ttk.Frame(root, padding="20")
         self.main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -26,6 +50,7 @@ class DeepfakeDesktopApp:
         self.main_frame.columnconfigure(1, weight=1)
         
         self.create_widgets()
+        self.root.after(PREVIEW_POLL_MS, self.poll_preview)
         
     def create_widgets(self):
         # Title
@@ -68,13 +93,14 @@ class DeepfakeDesktopApp:
         effect_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
         
         # Effect selection
+        # Pick an effect, or type a comma-separated chain such as "blur,edge"
         ttk.Label(effect_frame, text="Effect:").grid(row=0, column=0, padx=5, pady=5)
         self.effect_var = tk.StringVar(value="original")
+        effect_names = list(self.generator.effects.keys())
         effect_combo = ttk.Combobox(
             effect_frame, 
             textvariable=self.effect_var,
-            values=list(self.generator.effects.keys()),
-            state="readonly"
+            values=effect_names + ["blur,edge", "grayscale,blur", "blur,face_mesh"]
         )
         effect_combo.grid(row=0, column=1, padx=5, pady=5, sticky=(tk.W, tk.E))
         
@@ -102,6 +128,24 @@ class DeepfakeDesktopApp:
         )
         contrast_scale.grid(row=2, column=1, padx=5, pady=5, sticky=(tk.W, tk.E))
         
+        # Preview pane
+        preview_frame = ttk.LabelFrame(
+            self.main_frame,
+            text="Preview",
+            padding="10"
+        )
+        preview_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
+        preview_frame.columnconfigure(0, weight=1)
+        self.preview_label = ttk.Label(preview_frame, text="Select a file to preview the effect settings")
+        self.preview_label.grid(row=0, column=0)
+        self.preview_status = ttk.Label(preview_frame, text="")
+        self.preview_status.grid(row=1, column=0, pady=(5, 0))
+        
+        # Re-render the preview when the file or a setting changes
+        self.file_path.trace_add('write', self.preview_source_changed)
+        for var in (self.effect_var, self.brightness_var, self.contrast_var):
+            var.trace_add('write', self.schedule_preview)
+        
         # Generate button
         self.generate_button = ttk.Button(
             self.main_frame,
@@ -109,7 +153,7 @@ class DeepfakeDesktopApp:
             command=self.generate_deepfake,
             style="Accent.TButton"
         )
-        self.generate_button.grid(row=3, column=0, columnspan=2, pady=20)
+        self.generate_button.grid(row=4, column=0, columnspan=2, pady=20)
         
         # Progress bar
         self.progress_var = tk.DoubleVar()
@@ -119,7 +163,7 @@ class DeepfakeDesktopApp:
             mode='determinate',
             variable=self.progress_var
         )
-        self.progress.grid(row=4, column=0, columnspan=2, pady=(0, 10), sticky=(tk.W, tk.E))
+        self.progress.grid(row=5, column=0, columnspan=2, pady=(0, 10), sticky=(tk.W, tk.E))
         
         # Status label
         self.status_var = tk.StringVar(value="Ready")
@@ -128,12 +172,58 @@ class DeepfakeDesktopApp:
             textvariable=self.status_var,
             wraplength=700
         )
-        self.status_label.grid(row=5, column=0, columnspan=2)
+        self.status_label.grid(row=6, column=0, columnspan=2)
         
         # Style configuration
         style = ttk.Style()
         style.configure("Accent.TButton", font=("Helvetica", 11, "bold"))
     
+    def preview_source_changed(self, *args):
+        path = self.file_path.get()
+        if os.path.isfile(path) and allowed_file(path):
+            self.preview.set_source(path)
+            self.schedule_preview()
+    
+    def schedule_preview(self, *args):
+        """Debounce setting changes: request a render once the controls pause for PREVIEW_DEBOUNCE_MS"""
+        if self.preview_after_id is not None:
+            self.root.after_cancel(self.preview_after_id)
+        self.preview_after_id = self.root.after(PREVIEW_DEBOUNCE_MS, self.request_preview)
+    
+    def request_preview(self):
+        self.preview_after_id = None
+        try:
+            effect = ','.join(parse_effect_chain(self.effect_var.get()))
+            brightness = self.brightness_var.get()
+            contrast = self.contrast_var.get()
+        except (ValueError, tk.TclError) as e:
+            # Partly typed effect chain or an empty entry; keep the last preview
+            self.preview_status.config(text=str(e))
+            return
+        self.preview.request(effect, brightness, contrast)
+    
+    def poll_preview(self):
+        """Show the newest preview rendered by the worker thread"""
+        result = self.preview.poll()
+        if result is not None:
+            image, (effect, brightness, contrast), seconds = result
+            if image is None:
+                self.preview_label.config(image='', text="Could not read the selected file")
+                self.preview_photo = None
+            else:
+                size = (image.shape[1], image.shape[0])
+                photo = self.preview_photo
+                if photo is None or (photo.width(), photo.height()) != size:
+                    # One Tk image is reused while the preview size stays the same
+                    self.preview_photo = ImageTk.PhotoImage('RGB', size)
+                    self.preview_label.config(image=self.preview_photo, text='')
+                self.preview_photo.paste(Image.fromarray(image))
+                self.preview_status.config(
+                    text=f"{effect}, brightness {brightness}, contrast {contrast:.2f}"
+                         f" - rendered in {seconds * 1000:.0f} ms"
+                )
+        self.root.after(PREVIEW_POLL_MS, self.poll_preview)
+    
     def browse_file(self):
         filetypes = (
             ('Image files', '*.png *.jpg *.jpeg'),
@@ -160,6 +250,12 @@ class DeepfakeDesktopApp:
             messagebox.showerror("Error", "Please select a valid file")
             return
         
+        try:
+            effect = ','.join(parse_effect_chain(self.effect_var.get()))
+        except ValueError as e:
+            messagebox.showerror("Invalid Effect", str(e))
+            return
+        
         try:
             # Update UI state
             self.generate_button.state(['disabled'])
@@ -173,21 +269,31 @@ class DeepfakeDesktopApp:
             name, _ = os.path.splitext(filename)
             output_filename = f"deepfake_{name}_{timestamp}.mp4"
             
-            # Copy input file to uploads folder
-            upload_path = os.path.join(UPLOAD_FOLDER, filename)
-            shutil.copy2(input_path, upload_path)
-            
             # Generate output path
             output_path = os.path.join(GENERATED_FOLDER, output_filename)
             
-            # Generate deepfake
-            self.generator.generate_deepfake(
-                upload_path,
-                output_path,
-                effect=self.effect_var.get(),
-                brightness=self.brightness_var.get(),
-                contrast=self.contrast_var.get()
-            )
+            # Reuse an earlier output of the same input and settings
+            params = {
+                'effect': effect,
+                'brightness': self.brightness_var.get(),
+                'contrast': self.contrast_var.get()
+            }
+            if input_path.lower().endswith(IMAGE_EXTENSIONS):
+                # Image inputs become clips of this length, which is part of the result
+                params.update(still_duration=STILL_DURATION, still_fps=STILL_FPS)
+            cache_key = result_key(hash_file(input_path), params, self.generator.options)
+            cached_path = self.result_cache.lookup(cache_key)
+            if cached_path is not None:
+                output_path = cached_path
+                output_filename = os.path.basename(cached_path)
+            else:
+                # The input is read in place; local files are not copied to the uploads folder
+                self.pending_outputs.add(os.path.abspath(output_path))
+                try:
+                    self.generator.generate_deepfake(input_path, output_path, **params)
+                finally:
+                    self.pending_outputs.discard(os.path.abspath(output_path))
+                self.result_cache.store(cache_key, output_path)
             
             # Update UI
             self.progress_var.set(100)
@@ -201,8 +307,13 @@ class DeepfakeDesktopApp:
             if messagebox.askyesno("Success", "Would you like to open the output folder?"):
                 if os.name == 'nt':  # Windows
                     os.startfile(GENERATED_FOLDER)
-                else:  # Linux/Mac
-                    os.system(f'python3 -m http.server 8000 -d {GENERATED_FOLDER}')
+                else:  # Linux/Mac; served in the background so the window stays responsive
+                    if self.media_server is None:
+                        self.media_server = start_media_server(
+                            GENERATED_FOLDER, MEDIA_SERVER_PORT,
+                            is_final=lambda path: os.path.abspath(path) not in self.pending_outputs
+                        )
+                    webbrowser.open(f'http://localhost:{MEDIA_SERVER_PORT}/')
             
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -223,6 +334,9 @@ def main():
     
     app = DeepfakeDesktopApp(root)
     root.mainloop()
+    app.preview.close()
 
 if __name__ == "__main__":
+    # In the PyInstaller build, spawned frame workers must run their entry point, not main()
+    multiprocessing.freeze_support()
     main()
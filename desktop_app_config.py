@@ -4,6 +4,28 @@ import os
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_FOLDER = os.path.join(APP_DIR, 'static', 'uploads')
 GENERATED_FOLDER = os.path.join(APP_DIR, 'static', 'generated')
+DATABASE_PATH = os.path.join(APP_DIR, 'deepfake.db')
+
+# Result cache configurations
+RESULT_CACHE_MAX_BYTES = 5 * 1024 * 1024 * 1024  # Cached outputs kept in GENERATED_FOLDER before LRU eviction
+RESULT_CACHE_MAX_AGE = 7 * 24 * 3600  # Seconds an unused cached output is kept
+
+# Still image configurations
+STILL_DURATION = 3.0  # Seconds of video generated from an image input
+STILL_FPS = 30.0  # Frame rate of video generated from an image input
+
+# Result viewer configurations
+VIEWER_CACHE_BYTES = 128 * 1024 * 1024  # Decoded display frames kept for scrubbing
+VIEWER_READ_AHEAD = 48  # Frames decoded ahead of the playhead in the background
+
+# Live preview configurations
+PREVIEW_SAMPLES = 4  # Frames sampled across a video for the preview
+PREVIEW_MAX_SIDE = 240  # Longest side of each preview frame (proxies are rendered at this size)
+PREVIEW_DEBOUNCE_MS = 50  # Pause in slider movement before a new preview is requested
+PREVIEW_POLL_MS = 30  # Interval at which finished previews are picked up by the UI
+
+# Local media server for generated files
+MEDIA_SERVER_PORT = 8000
 
 # File configurations
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'mp4', 'avi', 'mov'}
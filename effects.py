@@ -0,0 +1,218 @@
+import time
+
+import cv2
+import numpy as np
+
+# Channel formats an effect can consume or produce
+BGR = 'BGR'
+GRAY = 'GRAY'
+ANY = 'ANY'  # works on either format and keeps it
+
+# Registered effects by name, in registration order
+EFFECT_REGISTRY = {}
+
+
+def register_effect(cls):
+    """
+    Class decorator adding an Effect subclass to the registry under cls.name
+    """
+    if ',' in cls.name:
+        raise ValueError(f"Effect names cannot contain ',': {cls.name}")
+    EFFECT_REGISTRY[cls.name] = cls
+    return cls
+
+
+def parse_effect_chain(spec):
+    """
+    Normalize an effect spec ('blur,edge', ['blur', 'edge'] or 'blur') to a
+    tuple of registered effect names. Raises ValueError for unknown effects.
+    """
+    if isinstance(spec, str):
+        names = [name.strip() for name in spec.split(',')]
+    else:
+        names = [name.strip() for name in spec]
+    names = [name for name in names if name]
+    if not names:
+        raise ValueError("No effect selected")
+    unknown = [name for name in names if name not in EFFECT_REGISTRY]
+    if unknown:
+        raise ValueError(f"Unknown effect(s): {', '.join(unknown)}")
+    return tuple(names)
+
+
+def _convert(src, src_format, dst_format, dst=None):
+    if src_format == dst_format:
+        return src
+    code = cv2.COLOR_BGR2GRAY if dst_format == GRAY else cv2.COLOR_GRAY2BGR
+    return cv2.cvtColor(src, code, dst=dst)
+
+
+class Effect:
+    """
+    Base class for registered effects.
+
+    input_format / output_format declare the channel layout the effect
+    consumes and produces (BGR, GRAY or ANY). apply() writes into dst when
+    one is given and returns the result.
+    """
+    name = None
+    input_format = BGR
+    output_format = BGR
+    # Whether apply(src, dst) is safe with dst being src
+    in_place = True
+
+    def __init__(self, generator=None):
+        self.generator = generator
+
+    def apply(self, src, dst=None):
+        raise NotImplementedError
+
+    def __call__(self, frame):
+        """
+        Apply this effect alone to a BGR frame, returning its native output format
+        """
+        return self.apply(_convert(frame, BGR, self.input_format))
+
+
+@register_effect
+class OriginalEffect(Effect):
+    name = 'original'
+    input_format = ANY
+    output_format = ANY
+
+    def apply(self, src, dst=None):
+        return src
+
+
+@register_effect
+class GrayscaleEffect(Effect):
+    name = 'grayscale'
+    input_format = BGR
+    output_format = GRAY
+    in_place = False
+
+    def apply(self, src, dst=None):
+        return cv2.cvtColor(src, cv2.COLOR_BGR2GRAY, dst=dst)
+
+
+@register_effect
+class EdgeEffect(Effect):
+    name = 'edge'
+    input_format = GRAY
+    output_format = GRAY
+    in_place = False
+
+    def apply(self, src, dst=None):
+        return cv2.Canny(src, 100, 200, edges=dst)
+
+
+@register_effect
+class BlurEffect(Effect):
+    name = 'blur'
+    input_format = ANY
+    output_format = ANY
+
+    def apply(self, src, dst=None):
+        return cv2.GaussianBlur(src, (15, 15), 0, dst=dst)
+
+
+@register_effect
+class FaceMeshEffect(Effect):
+    name = 'face_mesh'
+    input_format = BGR
+    output_format = BGR
+
+    def apply(self, src, dst=None):
+        if dst is None:
+            dst = src
+        elif dst is not src:
+            np.copyto(dst, src)
+        # Landmarks are drawn in place
+        return self.generator.apply_face_mesh(dst)
+
+
+class EffectChain:
+    """
+    Brightness/contrast adjustment followed by one or more effects, applied in
+    a single pass over each frame.
+
+    Format conversions are inserted only between steps whose formats differ
+    (e.g. 'blur,edge' converts to GRAY once before edge), plus a final
+    GRAY -> BGR so the output always suits a VideoWriter. The adjust pass is
+    skipped when brightness=0 and contrast=1, and every OpenCV call writes
+    into a dst= buffer that is allocated on first use and reused for every
+    following frame.
+    """
+    def __init__(self, effects, brightness=0, contrast=1):
+        self.effects = list(effects)
+        self.names = tuple(effect.name for effect in self.effects)
+        self.brightness = brightness
+        self.contrast = contrast
+        # convertScaleAbs with alpha=1, beta=0 leaves uint8 pixels unchanged
+        self.adjust = not (brightness == 0 and contrast == 1)
+        self._buffers = {}
+
+    def _buffer(self, name, shape):
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            self._buffers[name] = buffer
+        return buffer
+
+    def __call__(self, frame, out=None, timer=None):
+        """
+        Process a BGR frame. When out is given (it may be frame itself) the
+        result is written there; otherwise a new array is returned, or frame
+        unchanged for a no-op chain.
+        timer: optional metrics.StageTimer receiving the time of the adjust pass
+        and of each effect (including the conversion to its input format)
+        """
+        if not self.adjust and all(isinstance(effect, OriginalEffect) for effect in self.effects):
+            if out is None or out is frame:
+                return frame
+            np.copyto(out, frame)
+            return out
+
+        if out is None:
+            out = np.empty_like(frame)
+        gray_shape = frame.shape[:2]
+
+        current, current_format = frame, BGR
+        clock = time.perf_counter
+        start = clock() if timer is not None else 0.0
+        if self.adjust:
+            current = cv2.convertScaleAbs(frame, dst=out, alpha=self.contrast, beta=self.brightness)
+            if timer is not None:
+                now = clock()
+                timer.add('adjust', now - start)
+                start = now
+
+        for index, effect in enumerate(self.effects):
+            wanted = current_format if effect.input_format == ANY else effect.input_format
+            if wanted != current_format:
+                dst = out if wanted == BGR else self._buffer(f'convert{index}', gray_shape)
+                current = _convert(current, current_format, wanted, dst)
+                current_format = wanted
+
+            produced = current_format if effect.output_format == ANY else effect.output_format
+            if produced == BGR:
+                if current is out and not effect.in_place:
+                    dst = self._buffer(f'bgr{index}', frame.shape)
+                else:
+                    dst = out
+            else:
+                dst = current if effect.in_place else self._buffer(f'gray{index}', gray_shape)
+            current = effect.apply(current, dst)
+            current_format = produced
+            if timer is not None:
+                now = clock()
+                timer.add(effect.name, now - start)
+                start = now
+
+        if current_format == GRAY:
+            out = cv2.cvtColor(current, cv2.COLOR_GRAY2BGR, dst=out)
+            if timer is not None:
+                timer.add('convert', clock() - start)
+        elif current is not out:
+            np.copyto(out, current)
+        return out
@@ -0,0 +1,167 @@
+import logging
+import os
+import shutil
+import subprocess
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Registered encoder backends by name
+ENCODER_REGISTRY = {}
+
+# Playlist written by the HLS encoder inside hls_directory(output_path)
+HLS_PLAYLIST = 'index.m3u8'
+
+
+def register_encoder(cls):
+    """
+    Class decorator adding a VideoEncoder subclass to the registry under cls.name
+    """
+    ENCODER_REGISTRY[cls.name] = cls
+    return cls
+
+
+def create_encoder(backend, path, fps, size, options=None):
+    """
+    Open an encoder for a BGR clip of the given (width, height) at fps.
+    options: backend-specific keyword arguments (e.g. preset, crf, threads for ffmpeg)
+    """
+    if backend not in ENCODER_REGISTRY:
+        raise ValueError(f"Unknown encoder: {backend}. Available: {', '.join(ENCODER_REGISTRY)}")
+    return ENCODER_REGISTRY[backend](path, fps, size, **(options or {}))
+
+
+def hls_directory(output_path):
+    """
+    Directory holding the live HLS stream written alongside output_path
+    """
+    return os.path.splitext(output_path)[0] + '_hls'
+
+
+class VideoEncoder:
+    """
+    Base class for encoder backends.
+
+    Mirrors the part of cv2.VideoWriter the pipeline uses: write() takes
+    one BGR uint8 frame of the size given at construction and release()
+    finishes the file. Raises from release() if the output is unusable.
+    """
+    name = None
+
+    def write(self, frame):
+        raise NotImplementedError
+
+    def release(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+@register_encoder
+class OpenCVEncoder(VideoEncoder):
+    """
+    cv2.VideoWriter with the mp4v (MPEG-4 Part 2) codec; needs no external tools
+    """
+    name = 'opencv'
+
+    def __init__(self, path, fps, size, fourcc='mp4v'):
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        if not self.writer.isOpened():
+            raise ValueError(f"Could not open a video writer for {path}")
+
+    def write(self, frame):
+        self.writer.write(frame)
+
+    def release(self):
+        self.writer.release()
+
+
+@register_encoder
+class FFmpegEncoder(VideoEncoder):
+    """
+    H.264 via an ffmpeg subprocess fed raw BGR frames over a pipe.
+
+    preset: x264 speed/size trade-off (ultrafast ... veryslow)
+    crf: constant rate factor, 0-51; lower is better quality and larger files
+    threads: encoder threads, 0 lets x264 decide
+    """
+    name = 'ffmpeg'
+
+    def __init__(self, path, fps, size, preset='veryfast', crf=23, threads=0, binary='ffmpeg'):
+        executable = shutil.which(binary)
+        if executable is None:
+            raise RuntimeError(f"ffmpeg executable not found: {binary}")
+        width, height = size
+        command = [
+            executable, '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+            '-an', '-c:v', 'libx264', '-preset', preset, '-crf', str(crf), '-threads', str(threads),
+            # yuv420p needs even dimensions; pad odd sizes by one pixel
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p',
+        ] + self._output_args(path, fps)
+        self.frame_bytes = width * height * 3
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def _output_args(self, path, fps):
+        return ['-movflags', '+faststart', path]
+
+    def write(self, frame):
+        if frame.nbytes != self.frame_bytes:
+            raise ValueError(f"Frame has {frame.nbytes} bytes, expected {self.frame_bytes}")
+        try:
+            # Frames from the decoder and the shared ring are contiguous, so this does not copy
+            self.process.stdin.write(memoryview(frame if frame.flags.c_contiguous else frame.copy()))
+        except BrokenPipeError:
+            self.release()
+            raise
+
+    def release(self):
+        if self.process.stdin.closed:
+            return
+        self.process.stdin.close()
+        stderr = self.process.stderr.read().decode(errors='replace').strip()
+        self.process.stderr.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {self.process.returncode}: {stderr}")
+
+
+@register_encoder
+class HLSEncoder(FFmpegEncoder):
+    """
+    H.264 through ffmpeg like FFmpegEncoder, additionally writing an HLS
+    stream of fragmented MP4 segments to hls_directory(path) while encoding.
+
+    The playlist is an EVENT playlist that grows as segments are finished,
+    so players can start on it seconds after encoding begins; it is closed
+    with EXT-X-ENDLIST once the clip is complete. Keyframes are forced on
+    segment boundaries so every segment is independently decodable.
+
+    segment_seconds: target segment duration
+    """
+    name = 'hls'
+
+    def __init__(self, path, fps, size, segment_seconds=2, **options):
+        self.segment_seconds = segment_seconds
+        self.directory = hls_directory(path)
+        os.makedirs(self.directory, exist_ok=True)
+        super().__init__(path, fps, size, **options)
+
+    def _output_args(self, path, fps):
+        gop = max(int(round(fps * self.segment_seconds)), 1)
+        hls = ':'.join([
+            'f=hls',
+            f'hls_time={self.segment_seconds}',
+            'hls_playlist_type=event',
+            'hls_segment_type=fmp4',
+            'hls_flags=independent_segments+temp_file',
+            f'hls_segment_filename={os.path.join(self.directory, "segment_%05d.m4s")}',
+        ])
+        return [
+            '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0', '-map', '0:v',
+            '-f', 'tee', f'[{hls}]{os.path.join(self.directory, HLS_PLAYLIST)}|[movflags=+faststart]{path}'
+        ]
@@ -0,0 +1,238 @@
+import cv2
+import numpy as np
+
+# Size of the thumbnail used by the cheap motion metric
+MOTION_THUMBNAIL_SIZE = (64, 36)
+
+# Longest side of the grayscale image optical flow runs on
+TRACKING_MAX_SIDE = 320
+
+# Track every Nth landmark and move all of them with the fitted similarity transform
+TRACKING_POINT_STEP = 8
+
+# A face whose tracked points are lost beyond this fraction is re-detected
+MAX_LOST_FRACTION = 0.3
+
+# Margin added on each side of a lost face's bounding box before re-detecting it, as a fraction of its size
+ROI_MARGIN = 0.5
+
+# Pixel offsets (dx, dy) cv2.circle fills for a radius-1 filled circle
+_POINT_STAMP = np.array([(0, -1), (-1, 0), (0, 0), (1, 0), (0, 1)], dtype=np.intp)
+
+_LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+)
+
+
+def landmarks_to_arrays(multi_face_landmarks, width, height):
+    """
+    Convert MediaPipe face landmarks to one (N, 2) float64 array of pixel
+    coordinates per face. All faces are converted in a single array and
+    returned as views into it.
+    """
+    if not multi_face_landmarks:
+        return []
+    coordinates = np.array(
+        [(landmark.x, landmark.y) for face in multi_face_landmarks for landmark in face.landmark],
+        dtype=np.float64
+    ).reshape(len(multi_face_landmarks), -1, 2)
+    coordinates *= (width, height)
+    return list(coordinates)
+
+
+def draw_points(frame, points, color):
+    """
+    Draw every point of an (..., 2) pixel array as a radius-1 dot in one
+    vectorized write, pixel-identical to cv2.circle(frame, p, 1, color, -1)
+    per point
+    """
+    height, width = frame.shape[:2]
+    pixels = (points.reshape(-1, 2).astype(np.intp)[:, None, :] + _POINT_STAMP).reshape(-1, 2)
+    inside = (pixels[:, 0] >= 0) & (pixels[:, 0] < width) & (pixels[:, 1] >= 0) & (pixels[:, 1] < height)
+    pixels = pixels[inside]
+    frame[pixels[:, 1], pixels[:, 0]] = color
+    return frame
+
+
+def draw_connections(frame, points, connections, color):
+    """
+    Draw the (E, 2) landmark index pairs in connections as line segments
+    with a single cv2.polylines call. points is one face's (N, 2) array or
+    an (F, N, 2) stack of faces.
+    """
+    segments = points[..., connections, :].reshape(-1, 2, 2).astype(np.int32)
+    cv2.polylines(frame, segments, False, color, 1)
+    return frame
+
+
+class LandmarkTracker:
+    """
+    Decides per frame whether to run full face mesh inference or to track the
+    previous landmarks with pyramidal Lucas-Kanade optical flow.
+
+    Inference runs every `stride` frames, when the mean absolute difference of
+    a small grayscale thumbnail against the last inference frame exceeds
+    `motion_threshold` (0-255), or when tracking loses too many points.
+    Tracking follows a sparse subset of landmarks of every face in one
+    optical flow call on a downscaled image and moves every landmark of a
+    face with the similarity transform fitted to them, which keeps it far
+    cheaper than inference. When `redetect(frame, box)` is given, a face
+    that loses track is re-detected inside its own region instead of
+    re-running inference over the whole frame; it returns the face's
+    landmarks or None when the face is gone. With
+    stride=1 and no motion threshold every frame is inferred, exactly as
+    before. With measure_drift=True inference also runs on tracked frames and
+    the distance between tracked and inferred landmarks is recorded in stats.
+    """
+    def __init__(self, detect, stride=1, motion_threshold=None, measure_drift=False, redetect=None):
+        self.detect = detect
+        self.redetect = redetect
+        self.stride = max(1, int(stride))
+        self.motion_threshold = motion_threshold
+        self.measure_drift = measure_drift
+        self.reset()
+
+    @property
+    def tracking_enabled(self):
+        return self.stride > 1 or self.motion_threshold is not None
+
+    def reset(self):
+        """
+        Forget tracking state and statistics (call at the start of each clip)
+        """
+        self._faces = []
+        self._prev_gray = None
+        self._scale = 1.0
+        self._key_thumbnail = None
+        self._since_inference = 0
+        self._lost = False
+        self._drift = []
+        self.stats = {'frames': 0, 'inference_frames': 0, 'tracked_frames': 0, 'roi_redetections': 0}
+        # Number of frames with each face count
+        self.face_counts = {}
+
+    def update(self, frame):
+        """
+        Return the landmarks for this BGR frame as a list of (N, 2) pixel arrays
+        """
+        self.stats['frames'] += 1
+        if not self.tracking_enabled:
+            self.stats['inference_frames'] += 1
+            return self._count(self.detect(frame))
+
+        height, width = frame.shape[:2]
+        scale = min(1.0, TRACKING_MAX_SIDE / max(height, width))
+        # INTER_LINEAR is an order of magnitude cheaper than INTER_AREA and good enough for optical flow
+        small = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_LINEAR)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        thumbnail = cv2.resize(gray, MOTION_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        self._scale = scale
+
+        if self._needs_inference(thumbnail):
+            faces = self.detect(frame)
+            self._key_thumbnail = thumbnail
+            self._since_inference = 0
+            self.stats['inference_frames'] += 1
+        else:
+            faces = self._track(frame, gray)
+            self._since_inference += 1
+            self.stats['tracked_frames'] += 1
+            if self.measure_drift:
+                self._record_drift(faces, self.detect(frame))
+
+        self._faces = faces
+        self._prev_gray = gray
+        return self._count(faces)
+
+    def merge(self, stats, face_counts):
+        """
+        Add the frame and face counts of another tracker, e.g. a frame worker's, to this clip's statistics
+        """
+        for name, value in stats.items():
+            self.stats[name] = self.stats.get(name, 0) + value
+        for faces, count in face_counts.items():
+            self.face_counts[faces] = self.face_counts.get(faces, 0) + count
+
+    def _count(self, faces):
+        self.face_counts[len(faces)] = self.face_counts.get(len(faces), 0) + 1
+        return faces
+
+    def _needs_inference(self, thumbnail):
+        if self._prev_gray is None or self._lost:
+            return True
+        if self._since_inference + 1 >= self.stride:
+            return True
+        if self.motion_threshold is not None:
+            motion = cv2.absdiff(thumbnail, self._key_thumbnail).mean()
+            if motion > self.motion_threshold:
+                return True
+        return False
+
+    def _track(self, frame, gray):
+        self._lost = False
+        if not self._faces:
+            return []
+        # Sparse points of every face in one optical flow call, in tracking-image coordinates
+        sparse = [points[::TRACKING_POINT_STEP] for points in self._faces]
+        counts = [len(points) for points in sparse]
+        previous = (np.concatenate(sparse) * self._scale).astype(np.float32).reshape(-1, 1, 2)
+        tracked, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, previous, None, **_LK_PARAMS)
+        status = status.reshape(-1).astype(bool)
+
+        faces = []
+        offsets = np.cumsum([0] + counts)
+        for points, start, end in zip(self._faces, offsets[:-1], offsets[1:]):
+            ok = status[start:end]
+            transform = None
+            if 1.0 - ok.mean() <= MAX_LOST_FRACTION and ok.sum() >= 3:
+                src = previous[start:end].reshape(-1, 2)[ok] / self._scale
+                dst = tracked[start:end].reshape(-1, 2)[ok] / self._scale
+                transform, _ = cv2.estimateAffinePartial2D(src, dst)
+            if transform is not None:
+                faces.append(points @ transform[:, :2].T + transform[:, 2])
+            elif self.redetect is not None:
+                self.stats['roi_redetections'] += 1
+                found = self.redetect(frame, self._roi(points, frame.shape))
+                if found is not None:
+                    faces.append(found)
+            else:
+                self._lost = True
+                faces.append(points)
+        return faces
+
+    @staticmethod
+    def _roi(points, shape):
+        """
+        Bounding box (x0, y0, x1, y1) of a face grown by ROI_MARGIN and clipped to the frame
+        """
+        (x0, y0), (x1, y1) = points.min(axis=0), points.max(axis=0)
+        margin_x, margin_y = (x1 - x0) * ROI_MARGIN, (y1 - y0) * ROI_MARGIN
+        height, width = shape[:2]
+        return (
+            max(0, int(x0 - margin_x)), max(0, int(y0 - margin_y)),
+            min(width, int(np.ceil(x1 + margin_x))), min(height, int(np.ceil(y1 + margin_y)))
+        )
+
+    def _record_drift(self, tracked, inferred):
+        if len(tracked) != len(inferred):
+            return
+        for tracked_points, inferred_points in zip(tracked, inferred):
+            self._drift.append(np.linalg.norm(tracked_points - inferred_points, axis=1).mean())
+
+    def summary(self):
+        """
+        Statistics for the current clip, including drift when measured
+        """
+        summary = dict(self.stats)
+        summary['face_counts'] = dict(sorted(self.face_counts.items()))
+        if self.stats['frames']:
+            summary['inference_ratio'] = round(self.stats['inference_frames'] / self.stats['frames'], 3)
+        if self._drift:
+            drift = np.array(self._drift)
+            summary['drift_samples'] = len(drift)
+            summary['drift_mean_px'] = round(float(drift.mean()), 3)
+            summary['drift_p95_px'] = round(float(np.percentile(drift, 95)), 3)
+            summary['drift_max_px'] = round(float(drift.max()), 3)
+        return summary
@@ -0,0 +1,78 @@
+import logging
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SharedFrameRing:
+    """
+    Fixed-size ring of preallocated frame slots in one shared memory block.
+
+    Every slot is allocated once when the ring is created; processes hand
+    frames to each other by slot index instead of pickling the pixels.
+    """
+    def __init__(self, slots, shape, dtype=np.uint8, name=None):
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slot_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._owner = name is None
+
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * slots)
+        else:
+            # Workers are started from the owning process and share its resource
+            # tracker, so attaching does not transfer ownership of the block
+            self._shm = shared_memory.SharedMemory(name=name)
+
+        self._views = [
+            np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf, offset=i * self.slot_bytes)
+            for i in range(slots)
+        ]
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def descriptor(self):
+        """
+        Picklable description used to attach to the ring from another process
+        """
+        return (self.name, self.slots, self.shape, self.dtype.str)
+
+    @classmethod
+    def attach(cls, descriptor):
+        """
+        Attach to a ring created by another process
+        """
+        name, slots, shape, dtype = descriptor
+        return cls(slots, shape, dtype=dtype, name=name)
+
+    def slot(self, index):
+        """
+        Return the numpy view of a slot (no copy)
+        """
+        return self._views[index]
+
+    def store(self, index, frame):
+        """
+        Place frame into a slot, copying only if it is not already there.
+        Returns True when a copy was needed.
+        """
+        view = self._views[index]
+        if frame is view or (frame.shape == view.shape and
+                             frame.__array_interface__['data'][0] == view.__array_interface__['data'][0]):
+            return False
+        np.copyto(view, frame)
+        return True
+
+    def close(self):
+        """
+        Release this process's mapping and unlink the block if we created it
+        """
+        self._views = []
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,236 @@
+import bisect
+import logging
+import struct
+import threading
+from collections import OrderedDict
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+def keyframe_index(path):
+    """
+    Sorted 0-based numbers of the sync (key) frames of the video track of an
+    MP4/MOV file, from its stss box. Returns None when every frame is a key
+    frame (no stss) or the file cannot be parsed.
+    """
+    try:
+        with open(path, 'rb') as f:
+            moov = _read_top_level_box(f, b'moov')
+    except (OSError, ValueError, struct.error) as e:
+        logger.debug(f"No keyframe index for {path}: {e}")
+        return None
+    if moov is None:
+        return None
+    try:
+        for trak in _boxes(moov, b'trak'):
+            mdia = _first(trak, b'mdia')
+            hdlr = _first(mdia, b'hdlr')
+            if hdlr is None or hdlr[8:12] != b'vide':
+                continue
+            stbl = _first(_first(mdia, b'minf'), b'stbl')
+            stss = _first(stbl, b'stss')
+            if stss is None:
+                return None
+            count = struct.unpack('>I', stss[4:8])[0]
+            samples = struct.unpack(f'>{count}I', stss[8:8 + 4 * count])
+            return sorted(sample - 1 for sample in samples)
+    except (TypeError, ValueError, struct.error) as e:
+        logger.debug(f"No keyframe index for {path}: {e}")
+    return None
+
+
+def _read_top_level_box(f, wanted):
+    """
+    Payload of the first top-level box of type wanted, seeking over the others (mdat is never read)
+    """
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            if box_type != wanted:
+                return None
+            return f.read()
+        if size < header_size:
+            raise ValueError(f"invalid size for box {box_type!r}")
+        if box_type == wanted:
+            return f.read(size - header_size)
+        f.seek(size - header_size, 1)
+
+
+def _boxes(payload, wanted):
+    offset = 0
+    while offset + 8 <= len(payload):
+        size, box_type = struct.unpack('>I4s', payload[offset:offset + 8])
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', payload[offset + 8:offset + 16])[0]
+            header_size = 16
+        elif size == 0:
+            size = len(payload) - offset
+        if size < header_size:
+            raise ValueError(f"invalid size for box {box_type!r}")
+        if box_type == wanted:
+            yield payload[offset + header_size:offset + size]
+        offset += size
+
+
+def _first(payload, wanted):
+    if payload is None:
+        return None
+    return next(_boxes(payload, wanted), None)
+
+
+class FrameCache:
+    """
+    Thread-safe LRU cache of decoded frames by frame number, bounded by total bytes
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, frame_number):
+        with self._lock:
+            frame = self._frames.get(frame_number)
+            if frame is not None:
+                self._frames.move_to_end(frame_number)
+            return frame
+
+    def __contains__(self, frame_number):
+        with self._lock:
+            return frame_number in self._frames
+
+    def put(self, frame_number, frame):
+        with self._lock:
+            previous = self._frames.pop(frame_number, None)
+            if previous is not None:
+                self.bytes -= previous.nbytes
+            self._frames[frame_number] = frame
+            self.bytes += frame.nbytes
+            while self.bytes > self.max_bytes and len(self._frames) > 1:
+                _, evicted = self._frames.popitem(last=False)
+                self.bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self.bytes = 0
+
+
+class FramePrefetcher:
+    """
+    Random access to the frames of a video for a player, as display-ready
+    images produced by convert(frame).
+
+    Converted frames are kept in a FrameCache. A background thread decodes
+    sequentially ahead of the last requested frame, so playback never seeks.
+    A frame that is not cached is read forward from the decoder's position
+    when both are in the same group of pictures (from keyframe_index), so
+    scrubbing forward never seeks; otherwise the decoder seeks to it.
+    """
+    def __init__(self, path, convert, cache_bytes=128 * 1024 * 1024, read_ahead=48):
+        self.cap = cv2.VideoCapture(path)
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.keyframes = keyframe_index(path)
+        self.convert = convert
+        self.cache = FrameCache(cache_bytes)
+        self.read_ahead = read_ahead
+        self._decode_lock = threading.Lock()
+        # Number of the frame the next cap.read() returns
+        self._position = 0
+        self._playhead = 0
+        # Requests blocked on the decoder, which the prefetch thread yields to
+        self._waiting = 0
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._prefetch_loop, name="frame-prefetch", daemon=True)
+        self._thread.start()
+
+    def get(self, frame_number):
+        """
+        Converted frame frame_number, or None past the end of the video; prefetches the frames after it
+        """
+        frame = self.cache.get(frame_number)
+        if frame is None:
+            self._waiting += 1
+            try:
+                with self._decode_lock:
+                    frame = self.cache.get(frame_number)
+                    if frame is None:
+                        frame = self._decode_to(frame_number)
+            finally:
+                self._waiting -= 1
+        self._playhead = frame_number
+        self._wakeup.set()
+        return frame
+
+    def keyframe_before(self, frame_number):
+        """
+        Closest key frame at or before frame_number
+        """
+        if not self.keyframes:
+            return frame_number
+        index = bisect.bisect_right(self.keyframes, frame_number)
+        return self.keyframes[index - 1] if index else 0
+
+    def _decode_to(self, frame_number):
+        """
+        Decode up to frame_number and cache it; called with the decode lock held.
+        Frames skipped on the way are only decoded, not converted.
+        """
+        if self._closed:
+            return None
+        if not self.keyframe_before(frame_number) <= self._position <= frame_number:
+            # Outside the decoder's group of pictures: OpenCV seeks to the key frame before
+            # the target and decodes forward to it (seeking onto a key frame itself would
+            # make it start from the previous one)
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            self._position = frame_number
+        while self._position < frame_number:
+            if not self.cap.grab():
+                return self._past_end()
+            self._position += 1
+        ret, decoded = self.cap.read()
+        if not ret:
+            return self._past_end()
+        frame = self.convert(decoded)
+        self.cache.put(frame_number, frame)
+        self._position += 1
+        return frame
+
+    def _past_end(self):
+        # Frame counts in metadata are estimates; seek before reading again
+        self._position = self.total_frames
+        return None
+
+    def _prefetch_loop(self):
+        while not self._closed:
+            self._wakeup.wait(timeout=0.5)
+            self._wakeup.clear()
+            playhead = self._playhead
+            end = min(playhead + self.read_ahead, self.total_frames)
+            for frame_number in range(playhead + 1, end):
+                # Give way as soon as the player asks for a frame that is not cached
+                if self._closed or self._waiting or self._playhead != playhead:
+                    break
+                if frame_number in self.cache:
+                    continue
+                with self._decode_lock:
+                    if self._decode_to(frame_number) is None:
+                        break
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=2)
+        with self._decode_lock:
+            self.cap.release()
+        self.cache.clear()
@@ -0,0 +1,363 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+
+from frame_buffer import SharedFrameRing
+
+logger = logging.getLogger(__name__)
+
+# Sentinel telling a worker process to exit
+_STOP = None
+
+
+def _worker_main(ring_descriptor, task_queue, result_queue, effect, brightness, contrast, generator_options,
+                 stats_queue):
+    """
+    Worker process loop: adjust and apply the effect to frames in place in the ring.
+    On a clean stop, reports its face tracker's counts on stats_queue.
+    """
+    # Imported here so the module can be imported from deepfake.py without a cycle
+    from deepfake import DeepfakeGenerator
+
+    ring = SharedFrameRing.attach(ring_descriptor)
+    generator = DeepfakeGenerator(**generator_options)
+    try:
+        while True:
+            task = task_queue.get()
+            if task is _STOP:
+                tracker = generator.face_tracker
+                stats_queue.put((tracker.stats, tracker.face_counts))
+                break
+            index, slot = task
+            try:
+                frame = ring.slot(slot)
+                processed = generator.process_frame(frame, effect, brightness, contrast, out=frame)
+                copied = ring.store(slot, processed)
+            except Exception:
+                result_queue.put((index, slot, None, traceback.format_exc()))
+                break
+            result_queue.put((index, slot, copied, None))
+    finally:
+        generator.cleanup()
+        ring.close()
+
+
+class ParallelFramePipeline:
+    """
+    Decode -> pool of effect worker processes -> reorder buffer -> single VideoWriter.
+
+    Frames live in a SharedFrameRing: the reader decodes straight into a free
+    slot, workers process the slot in place and the writer encodes from it
+    before returning the slot to the free list. Only slot indices cross
+    process boundaries. When every slot is in use the reader blocks, which
+    applies backpressure when the encoder falls behind. Frames are written
+    strictly in input order, so the output matches the serial loop.
+    """
+    def __init__(self, workers, effect='original', brightness=0, contrast=1, slots=None, generator_options=None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.effect = effect
+        self.brightness = brightness
+        self.contrast = contrast
+        # Bounds both the number of frames in flight and the reorder buffer
+        self.slots = slots or workers * 4
+        # Constructor options for the per-worker generators
+        self.generator_options = generator_options or {}
+        self.stats = {}
+        # (stats, face_counts) of each worker's face tracker after a run
+        self.tracker_stats = []
+
+    def run(self, cap, out, progress=None, timer=None):
+        """
+        Process every frame of cap and write it to out in order.
+        Returns the number of frames written.
+        timer: optional metrics.StageTimer receiving decode and encode times, and
+        the time the writer waits for the workers' results (stage 'workers')
+        """
+        ret, first_frame = cap.read()
+        if not ret:
+            return 0
+
+        ring = SharedFrameRing(self.slots, first_frame.shape, first_frame.dtype)
+        self.stats = {
+            'frames': 0,
+            'slots': self.slots,
+            'slot_bytes': ring.slot_bytes,
+            'decode_copies': 0,
+            'worker_copies': 0,
+            'backpressure_waits': 0,
+        }
+        free_slots = queue.Queue()
+        for slot in range(self.slots):
+            free_slots.put(slot)
+
+        ctx = multiprocessing.get_context('spawn')
+        task_queue = ctx.Queue()
+        result_queue = ctx.Queue()
+        stats_queue = ctx.Queue()
+        self.tracker_stats = []
+        processes = [
+            ctx.Process(
+                target=_worker_main,
+                args=(ring.descriptor(), task_queue, result_queue,
+                      self.effect, self.brightness, self.contrast, self.generator_options, stats_queue),
+                daemon=True
+            )
+            for _ in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        stop = threading.Event()
+        reader_state = {'decoded': 0, 'done': False, 'error': None}
+
+        def acquire_slot():
+            try:
+                return free_slots.get_nowait()
+            except queue.Empty:
+                self.stats['backpressure_waits'] += 1
+            while not stop.is_set():
+                try:
+                    return free_slots.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return None
+
+        def reader():
+            try:
+                slot = acquire_slot()
+                ring.store(slot, first_frame)
+                task_queue.put((0, slot))
+                index = 1
+                reader_state['decoded'] = index
+                while not stop.is_set():
+                    slot = acquire_slot()
+                    if slot is None:
+                        return
+                    view = ring.slot(slot)
+                    start = time.perf_counter()
+                    ret, frame = cap.read(view)
+                    if not ret:
+                        free_slots.put(slot)
+                        break
+                    if timer is not None:
+                        timer.add('decode', time.perf_counter() - start)
+                    # Backends that cannot decode into the caller's buffer return a new array
+                    if ring.store(slot, frame):
+                        self.stats['decode_copies'] += 1
+                    task_queue.put((index, slot))
+                    index += 1
+                    reader_state['decoded'] = index
+            except Exception as e:
+                reader_state['error'] = e
+            finally:
+                reader_state['done'] = True
+                for _ in processes:
+                    task_queue.put(_STOP)
+
+        reader_thread = threading.Thread(target=reader, name="frame-reader", daemon=True)
+        reader_thread.start()
+
+        def check_workers():
+            # A worker may only exit after the reader sent the stop sentinels, and only cleanly;
+            # otherwise the frame it held never arrives and the reorder loop would wait forever
+            for process in processes:
+                if process.exitcode is not None and (process.exitcode != 0 or not reader_state['done']):
+                    # A worker that failed posts its traceback before exiting; report that instead
+                    while True:
+                        try:
+                            index, _, _, error = result_queue.get(timeout=0.1)
+                        except queue.Empty:
+                            break
+                        if error is not None:
+                            raise RuntimeError(f"Frame worker failed on frame {index}:\n{error}")
+                    raise RuntimeError(f"Frame worker {process.pid} exited unexpectedly "
+                                       f"(exit code {process.exitcode})")
+
+        pending = {}
+        next_index = 0
+        last_check = time.monotonic()
+        failed = True
+        try:
+            while True:
+                if reader_state['done'] and next_index >= reader_state['decoded']:
+                    break
+                start = time.perf_counter()
+                try:
+                    index, slot, copied, error = result_queue.get(timeout=0.5)
+                except queue.Empty:
+                    check_workers()
+                    continue
+                finally:
+                    if timer is not None:
+                        timer.add('workers', time.perf_counter() - start)
+                if error is not None:
+                    raise RuntimeError(f"Frame worker failed on frame {index}:\n{error}")
+                # The surviving workers keep results coming, so also check while the queue is busy
+                if time.monotonic() - last_check >= 0.5:
+                    last_check = time.monotonic()
+                    check_workers()
+                if copied:
+                    self.stats['worker_copies'] += 1
+                pending[index] = slot
+                while next_index in pending:
+                    slot = pending.pop(next_index)
+                    start = time.perf_counter()
+                    out.write(ring.slot(slot))
+                    if timer is not None:
+                        timer.add('encode', time.perf_counter() - start)
+                    free_slots.put(slot)
+                    next_index += 1
+                    if progress is not None:
+                        progress(1)
+            if reader_state['error'] is not None:
+                raise reader_state['error']
+            self.stats['frames'] = next_index
+            for _ in processes:
+                try:
+                    self.tracker_stats.append(stats_queue.get(timeout=5))
+                except queue.Empty:
+                    logger.warning("A frame worker did not report its face tracker stats")
+                    break
+            failed = False
+            return next_index
+        finally:
+            stop.set()
+            if failed:
+                # Frames still in flight will never be written; do not wait for the pool to drain them
+                for process in processes:
+                    if process.is_alive():
+                        process.terminate()
+            reader_thread.join()
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            ring.close()
+
+
+class ThreadedFramePipeline:
+    """
+    Reader thread -> processing in the calling thread -> writer thread, joined by bounded queues.
+
+    OpenCV releases the GIL while demuxing, decoding and encoding, so the next
+    frames are decoded and the previous ones encoded while the effects run,
+    instead of the three costs adding up. Each queue holds at most depth
+    frames and decoded buffers are reused once written, so no more than
+    2 * depth + 3 frames are alive at a time. Frames are written in input
+    order, so the output matches the unthreaded loop.
+    """
+    def __init__(self, process, depth=4):
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        # Callable(frame) -> processed frame; may work in place on frame
+        self.process = process
+        self.depth = depth
+        self.stats = {}
+
+    def run(self, cap, out, progress=None, timer=None):
+        """
+        Process every frame of cap and write it to out in order.
+        Returns the number of frames written.
+        timer: optional metrics.StageTimer receiving decode and encode times (on
+        their threads), and the time processing waits for a decoded frame (stage
+        'decode_wait') and for room in the writer's queue (stage 'encode_wait')
+        """
+        self.stats = {'frames': 0, 'depth': self.depth, 'buffers': 0}
+        decoded = queue.Queue(maxsize=self.depth)
+        processed_frames = queue.Queue(maxsize=self.depth)
+        free_buffers = queue.Queue()
+        stop = threading.Event()
+        errors = []
+        clock = time.perf_counter
+
+        def put(target, item):
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(source):
+            while not stop.is_set():
+                try:
+                    return source.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _STOP
+
+        def reader():
+            try:
+                while not stop.is_set():
+                    try:
+                        buffer = free_buffers.get_nowait()
+                    except queue.Empty:
+                        # Until written frames come back, let the capture allocate
+                        buffer = None
+                        self.stats['buffers'] += 1
+                    start = clock()
+                    ret, frame = cap.read(buffer)
+                    if not ret:
+                        break
+                    if timer is not None:
+                        timer.add('decode', clock() - start)
+                    if not put(decoded, frame):
+                        return
+            except Exception as e:
+                errors.append(e)
+            finally:
+                put(decoded, _STOP)
+
+        def writer():
+            try:
+                while True:
+                    item = get(processed_frames)
+                    if item is _STOP:
+                        return
+                    buffer, processed = item
+                    start = clock()
+                    out.write(processed)
+                    if timer is not None:
+                        timer.add('encode', clock() - start)
+                    self.stats['frames'] += 1
+                    free_buffers.put(buffer)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+        reader_thread = threading.Thread(target=reader, name="frame-reader", daemon=True)
+        writer_thread = threading.Thread(target=writer, name="frame-writer", daemon=True)
+        reader_thread.start()
+        writer_thread.start()
+        try:
+            while True:
+                start = clock()
+                frame = get(decoded)
+                if timer is not None:
+                    timer.add('decode_wait', clock() - start)
+                if frame is _STOP:
+                    break
+                processed = self.process(frame)
+                start = clock()
+                if not put(processed_frames, (frame, processed)):
+                    break
+                if timer is not None:
+                    timer.add('encode_wait', clock() - start)
+                if progress is not None:
+                    progress(1)
+            # Let the writer drain its queue before stopping the threads
+            put(processed_frames, _STOP)
+            writer_thread.join()
+        finally:
+            stop.set()
+            reader_thread.join()
+            writer_thread.join()
+        if errors:
+            raise errors[0]
+        return self.stats['frames']
@@ -0,0 +1,167 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no generator becomes available within the checkout timeout"""
+
+
+class GeneratorPool:
+    """
+    Pool of DeepfakeGenerator instances checked out one per job.
+
+    MediaPipe's FaceMesh keeps tracking state and is not thread-safe, so each
+    concurrent job gets a generator to itself instead of sharing one.
+    Instances are created on demand up to size, or all at once by prewarm().
+    With warm_up, prewarm() also calls each generator's warm_up(), which loads
+    MediaPipe's face mesh that generators otherwise build on first use.
+    """
+    def __init__(self, size=None, factory=None, warm_up=False):
+        if factory is None:
+            from deepfake import DeepfakeGenerator
+            factory = DeepfakeGenerator
+        self.size = size or os.cpu_count() or 1
+        self.factory = factory
+        self.warm_up = warm_up
+        self._idle = []
+        self._created = 0
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # Statistics
+        self._started = time.monotonic()
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._busy_total = 0.0
+
+    def prewarm(self):
+        """
+        Create every generator up front so no job pays the start-up cost.
+        Does nothing once the pool is closed. A generator that fails to build or
+        warm up gives its slot back (so checkouts can still create one) and the
+        error is raised.
+        """
+        created = 0
+        while True:
+            with self._cond:
+                if self._closed or self._created >= self.size:
+                    break
+                self._created += 1
+            try:
+                generator = self.factory()
+                if self.warm_up:
+                    generator.warm_up()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                if self._closed:
+                    self._created -= 1
+                    generator.cleanup()
+                    break
+                self._idle.append(generator)
+                self._cond.notify()
+            created += 1
+        if created:
+            logger.info(f"Generator pool warmed up with {created} new instance(s)")
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """
+        Borrow a generator for the duration of the with block
+        """
+        generator = self._acquire(timeout)
+        start = time.monotonic()
+        try:
+            yield generator
+        finally:
+            self._release(generator, time.monotonic() - start)
+
+    def _acquire(self, timeout):
+        requested = time.monotonic()
+        create = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Generator pool is closed")
+                if self._idle:
+                    generator = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                    break
+                remaining = None if timeout is None else timeout - (time.monotonic() - requested)
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeoutError(f"No generator available after {timeout}s")
+                self._cond.wait(remaining)
+            self._in_use += 1
+
+        if create:
+            try:
+                generator = self.factory()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+
+        waited = time.monotonic() - requested
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            if waited > 0.001 and not create:
+                self._waits += 1
+        return generator
+
+    def _release(self, generator, busy):
+        with self._cond:
+            self._in_use -= 1
+            self._busy_total += busy
+            if self._closed:
+                generator.cleanup()
+                return
+            self._idle.append(generator)
+            self._cond.notify()
+
+    def stats(self):
+        """
+        Pool utilisation and checkout wait time
+        """
+        with self._cond:
+            elapsed = time.monotonic() - self._started
+            return {
+                'size': self.size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'utilisation': round(self._in_use / self.size, 3),
+                'average_utilisation': round(self._busy_total / (self.size * elapsed), 3) if elapsed > 0 else 0.0,
+                'checkouts': self._checkouts,
+                'waited_checkouts': self._waits,
+                'average_wait_seconds': round(self._wait_total / self._checkouts, 4) if self._checkouts else 0.0,
+                'max_wait_seconds': round(self._wait_max, 4),
+            }
+
+    def close(self):
+        """
+        Clean up idle generators; checked-out ones are cleaned up on release
+        """
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for generator in idle:
+            generator.cleanup()
@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+import cv2
+
+from encoders import hls_directory
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    filename TEXT PRIMARY KEY,
+    output_path TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    source_hash TEXT,
+    effect TEXT,
+    params TEXT NOT NULL DEFAULT '{}',
+    duration REAL,
+    size INTEGER NOT NULL,
+    processing_seconds REAL,
+    job_id TEXT
+);
+CREATE INDEX IF NOT EXISTS history_created ON history (created_at);
+CREATE INDEX IF NOT EXISTS history_effect ON history (effect, created_at);
+CREATE INDEX IF NOT EXISTS history_size ON history (size);
+"""
+
+# Sort orders offered by page(), each served by an index
+SORT_ORDERS = {
+    'newest': 'created_at DESC',
+    'oldest': 'created_at ASC',
+    'largest': 'size DESC',
+    'smallest': 'size ASC',
+}
+
+
+def media_duration(path):
+    """
+    Length of a video in seconds from its container metadata, or None (e.g. for images)
+    """
+    cap = cv2.VideoCapture(path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    finally:
+        cap.release()
+    if fps > 0 and frames > 0:
+        return round(frames / fps, 3)
+    return None
+
+
+class HistoryStore:
+    """
+    SQLite index of generated outputs, written as jobs complete, so the
+    history page never scans the generated folder
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def record(self, output_path, source_hash=None, params=None, processing_seconds=None, created_at=None,
+               job_id=None):
+        """
+        Index a finished output; size and duration are read from the file
+        """
+        params = params or {}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO history (filename, output_path, created_at, source_hash, effect, params, "
+                "duration, size, processing_seconds, job_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (os.path.basename(output_path), output_path, created_at or time.time(), source_hash,
+                 params.get('effect'), json.dumps(params), media_duration(output_path),
+                 os.path.getsize(output_path), processing_seconds, job_id)
+            )
+
+    def remove(self, output_path):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM history WHERE filename = ?", (os.path.basename(output_path),))
+
+    def forget_output(self, output_path):
+        """
+        Drop a deleted output's entry and its live HLS stream; the ResultCache on_evict
+        callback of every front end sharing the database, so eviction leaves nothing behind
+        """
+        self.remove(output_path)
+        shutil.rmtree(hls_directory(output_path), ignore_errors=True)
+
+    def contains(self, filename):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM history WHERE filename = ?", (filename,)).fetchone() is not None
+
+    def page(self, page=1, per_page=25, effect=None, search=None, sort='newest'):
+        """
+        One page of entries and the total number matching the filters.
+        effect: exact effect chain; search: substring of the filename
+        """
+        where, args = [], []
+        if effect:
+            where.append("effect = ?")
+            args.append(effect)
+        if search:
+            where.append("filename LIKE ? ESCAPE '\\'")
+            args.append('%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        order = SORT_ORDERS.get(sort, SORT_ORDERS['newest'])
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM history {clause}", args).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM history {clause} ORDER BY {order} LIMIT ? OFFSET ?",
+                args + [per_page, (max(1, page) - 1) * per_page]
+            ).fetchall()
+        entries = []
+        for row in rows:
+            entry = dict(row)
+            entry['params'] = json.loads(entry['params'])
+            entries.append(entry)
+        return entries, total
+
+    def effects(self):
+        """
+        Distinct effect chains present in the history, for filtering
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT effect FROM history WHERE effect IS NOT NULL ORDER BY effect"
+            ).fetchall()
+        return [row[0] for row in rows]
@@ -0,0 +1,527 @@
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Minimum interval between progress writes from a worker
+PROGRESS_INTERVAL = 0.5
+
+# Interval at which a queue refreshes the heartbeat of the jobs it runs, and looks for abandoned jobs
+HEARTBEAT_INTERVAL = 5.0
+
+# Seconds without a heartbeat after which a running job is considered abandoned and requeued
+HEARTBEAT_TIMEOUT = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    output_filename TEXT NOT NULL,
+    params TEXT NOT NULL,
+    cache_key TEXT,
+    source_hash TEXT,
+    frames_done INTEGER NOT NULL DEFAULT 0,
+    total_frames INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at);
+CREATE INDEX IF NOT EXISTS jobs_output ON jobs (output_filename);
+"""
+
+# Columns added after the first release, created on existing databases by JobStore
+_MIGRATIONS = {
+    'cache_key': "ALTER TABLE jobs ADD COLUMN cache_key TEXT",
+    'source_hash': "ALTER TABLE jobs ADD COLUMN source_hash TEXT",
+    'owner': "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    'heartbeat_at': "ALTER TABLE jobs ADD COLUMN heartbeat_at REAL",
+}
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit"""
+
+
+class JobStore:
+    """
+    SQLite persistence for jobs, safe to use from the web process and workers
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in _MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_cache_key ON jobs (cache_key, state)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, input_path, output_path, output_filename, params, cache_key=None, source_hash=None,
+               max_depth=None):
+        """
+        Insert a queued job and return its id.
+        With max_depth, raises QueueFullError when queued plus running jobs already
+        reach it; the check and the insert share one write transaction, so
+        concurrent submitters (threads or processes) cannot overshoot the limit.
+        """
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if max_depth is not None:
+                    depth = conn.execute(
+                        "SELECT COUNT(*) FROM jobs WHERE state IN (?, ?)", (QUEUED, RUNNING)
+                    ).fetchone()[0]
+                    if depth >= max_depth:
+                        raise QueueFullError(f"Job queue is full ({max_depth} jobs)")
+                conn.execute(
+                    "INSERT INTO jobs (id, state, input_path, output_path, output_filename, params, cache_key, "
+                    "source_hash, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, QUEUED, input_path, output_path, output_filename, json.dumps(params), cache_key,
+                     source_hash, time.time())
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def get_by_output(self, output_filename):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE output_filename = ? ORDER BY created_at DESC LIMIT 1",
+                (output_filename,)
+            ).fetchone()
+        return self._to_dict(row)
+
+    def get_active_by_cache_key(self, cache_key):
+        """
+        The queued or running job producing the result for cache_key, if any
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE cache_key = ? AND state IN (?, ?) ORDER BY created_at LIMIT 1",
+                (cache_key, QUEUED, RUNNING)
+            ).fetchone()
+        return self._to_dict(row)
+
+    def count(self, *states):
+        placeholders = ', '.join('?' for _ in states)
+        with self._connect() as conn:
+            return conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE state IN ({placeholders})", states
+            ).fetchone()[0]
+
+    def by_state(self, state):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE state = ? ORDER BY created_at", (state,)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def next_queued(self):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE state = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+        return self._to_dict(row)
+
+    def claim(self, job_id, owner):
+        """
+        Mark a queued job running on behalf of owner. Returns False when another
+        dispatcher claimed it first (the state check and update are one statement).
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = ?, owner = ?, heartbeat_at = ?, started_at = ?, frames_done = 0 "
+                "WHERE id = ? AND state = ?",
+                (RUNNING, owner, now, now, job_id, QUEUED)
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, owner):
+        """
+        Record that owner is still alive and working on its running jobs
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND state = ?",
+                (time.time(), owner, RUNNING)
+            )
+
+    def update_progress(self, job_id, frames_done, total_frames):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET frames_done = ?, total_frames = ? WHERE id = ?",
+                (frames_done, total_frames, job_id)
+            )
+
+    def mark_finished(self, job_id, error=None, owner=None):
+        """
+        Record the outcome of a running job. With owner, only while the job is
+        still claimed by it; returns whether the job was updated.
+        """
+        query = "UPDATE jobs SET state = ?, error = ?, finished_at = ? WHERE id = ?"
+        args = (FAILED if error else DONE, error, time.time(), job_id)
+        if owner is not None:
+            query += " AND owner = ? AND state = ?"
+            args += (owner, RUNNING)
+        with self._connect() as conn:
+            return conn.execute(query, args).rowcount == 1
+
+    def requeue_interrupted(self, timeout=HEARTBEAT_TIMEOUT):
+        """
+        Put running jobs whose owner stopped sending heartbeats for timeout
+        seconds (it crashed or was stopped) back in the queue. Jobs of live
+        owners, e.g. other server processes, are left alone.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = ?, owner = NULL, heartbeat_at = NULL, started_at = NULL, frames_done = 0 "
+                "WHERE state = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                (QUEUED, RUNNING, time.time() - timeout)
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+
+        # Derived status fields reported to clients
+        if job['state'] == DONE:
+            job['progress'] = 100.0
+        elif job['total_frames']:
+            job['progress'] = round(100.0 * job['frames_done'] / job['total_frames'], 1)
+        else:
+            job['progress'] = 0.0
+        end = job['finished_at'] or time.time()
+        elapsed = end - job['started_at'] if job['started_at'] else 0
+        job['fps'] = round(job['frames_done'] / elapsed, 2) if elapsed > 0 else 0.0
+        return job
+
+
+def _execute(generator, db_path, job_id, input_path, output_path, params):
+    """
+    Run one job on the given generator, reporting progress to the store.
+    Returns the generator's job summary (frames, fps and stage timings).
+    """
+    store = JobStore(db_path)
+    last_update = 0.0
+
+    def report(frames_done, total_frames):
+        nonlocal last_update
+        now = time.monotonic()
+        if now - last_update >= PROGRESS_INTERVAL or frames_done == total_frames:
+            last_update = now
+            store.update_progress(job_id, frames_done, total_frames)
+
+    return generator.generate_deepfake(input_path, output_path, progress_callback=report, **params)
+
+
+# Generator owned by each worker process, created on its first job
+_worker_generator = None
+
+
+def _run_job(db_path, job_id, input_path, output_path, params, generator_options):
+    """
+    Executed in a worker process: run one job on the process's own generator
+    """
+    global _worker_generator
+    from deepfake import DeepfakeGenerator
+
+    if _worker_generator is None:
+        _worker_generator = DeepfakeGenerator(**generator_options)
+    return _execute(_worker_generator, db_path, job_id, input_path, output_path, params)
+
+
+def _warm_up_worker(generator_options):
+    """
+    Executed in a worker process at start-up: create the process's generator and load its face mesh
+    """
+    global _worker_generator
+    from deepfake import DeepfakeGenerator
+
+    if _worker_generator is None:
+        _worker_generator = DeepfakeGenerator(**generator_options)
+    _worker_generator.warm_up()
+
+
+class JobQueue:
+    """
+    Runs queued jobs on a bounded pool of local worker processes.
+
+    When a GeneratorPool is given, jobs run on threads of this process instead,
+    each checking a generator out of the pool for its duration.
+
+    Job state lives in SQLite, so jobs that were queued or running when the
+    server stopped are picked up again by the next start(). Several processes
+    (e.g. WSGI workers) may run a queue on the same database: each job is
+    claimed atomically by one of them, and running jobs carry their owner
+    and a heartbeat, so only jobs of an owner that stopped sending heartbeats
+    for HEARTBEAT_TIMEOUT seconds are requeued. Outputs of
+    successful jobs submitted with a cache key are recorded in result_cache,
+    every successful output is indexed in history_store, and every finished
+    job is added to metrics (a PipelineMetrics).
+
+    With warm_up, start() launches the worker processes right away and has
+    each load MediaPipe's face mesh, instead of the first jobs paying for it
+    (a GeneratorPool is warmed up by its own warm_up option).
+    """
+    def __init__(self, db_path, concurrency=2, max_depth=16, generator_pool=None, generator_options=None,
+                 result_cache=None, history_store=None, metrics=None, warm_up=False):
+        self.store = JobStore(db_path)
+        self.concurrency = concurrency
+        self.max_depth = max_depth
+        self.generator_pool = generator_pool
+        # DeepfakeGenerator constructor options for worker processes
+        self.generator_options = generator_options or {}
+        self.result_cache = result_cache
+        self.history_store = history_store
+        self.metrics = metrics
+        self.warm_up = warm_up
+        self._executor = None
+        self._dispatcher = None
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._running = set()
+        self._stopping = False
+        # Identifies this queue's claims on jobs in the shared database
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def start(self):
+        """
+        Start the worker pool and dispatcher (idempotent)
+        """
+        with self._lock:
+            if self._dispatcher is not None:
+                return
+            requeued = self.store.requeue_interrupted()
+            if requeued:
+                logger.info(f"Requeued {requeued} interrupted job(s)")
+            self._executor = self._create_executor()
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+            self._dispatcher.start()
+            self._wakeup.set()
+            if self.generator_pool is not None:
+                threading.Thread(target=self.generator_pool.prewarm, name="pool-prewarm", daemon=True).start()
+            elif self.warm_up:
+                # Each submission without an idle worker starts a new process, up to concurrency
+                for _ in range(self.concurrency):
+                    self._executor.submit(_warm_up_worker, self.generator_options)
+
+    def _create_executor(self):
+        if self.generator_pool is not None:
+            return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job-worker")
+        return ProcessPoolExecutor(
+            max_workers=self.concurrency,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def submit(self, input_path, output_path, output_filename, params, cache_key=None, source_hash=None):
+        """
+        Queue a job and return its id.
+        Raises QueueFullError when queued plus running jobs reach max_depth.
+        """
+        self.start()
+        job_id = self.store.create(input_path, output_path, output_filename, params, cache_key, source_hash,
+                                   max_depth=self.max_depth)
+        self._wakeup.set()
+        return job_id
+
+    def depth(self):
+        """
+        Number of jobs waiting or running
+        """
+        return self.store.count(QUEUED, RUNNING)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def get_by_output(self, output_filename):
+        return self.store.get_by_output(output_filename)
+
+    def get_active_by_cache_key(self, cache_key):
+        return self.store.get_active_by_cache_key(cache_key)
+
+    def _dispatch_loop(self):
+        last_heartbeat = time.monotonic()
+        while not self._stopping:
+            self._wakeup.wait(timeout=1.0)
+            self._wakeup.clear()
+            if time.monotonic() - last_heartbeat >= HEARTBEAT_INTERVAL:
+                last_heartbeat = time.monotonic()
+                self._heartbeat()
+            while not self._stopping and len(self._running) < self.concurrency:
+                job = self.store.next_queued()
+                if job is None:
+                    break
+                # Another dispatcher may have claimed it since it was read
+                if self.store.claim(job['id'], self.owner):
+                    self._launch(job)
+
+    def _heartbeat(self):
+        try:
+            self.store.heartbeat(self.owner)
+            requeued = self.store.requeue_interrupted()
+        except sqlite3.Error as e:
+            logger.warning(f"Job heartbeat failed: {e}")
+            return
+        if requeued:
+            logger.info(f"Requeued {requeued} abandoned job(s)")
+
+    def _launch(self, job):
+        job_id = job['id']
+        with self._lock:
+            self._running.add(job_id)
+        logger.info(f"Starting job {job_id} for {job['input_path']}")
+        args = (self.store.db_path, job_id, job['input_path'], job['output_path'], job['params'])
+        if self.generator_pool is None:
+            target = _run_job
+            args += (self.generator_options,)
+        else:
+            target = self._run_pooled
+        executor = self._executor
+        try:
+            try:
+                future = executor.submit(target, *args)
+            except BrokenProcessPool:
+                executor = self._replace_executor(executor)
+                future = executor.submit(target, *args)
+        except Exception as e:
+            # Without a future nothing would ever release the job's concurrency slot
+            error = f"Could not start the job: {str(e) or e.__class__.__name__}"
+            logger.error(f"Job {job_id} failed: {error}")
+            self.store.mark_finished(job_id, error, owner=self.owner)
+            if self.metrics is not None:
+                self._record_metrics(job_id, None, error)
+            with self._lock:
+                self._running.discard(job_id)
+            return
+        future.add_done_callback(lambda f: self._finished(job_id, f, executor))
+
+    def _replace_executor(self, broken):
+        """
+        Replace a broken worker pool and return the pool to submit to. Every job
+        in flight on the broken pool fails with it; only the first to report
+        replaces it, so later reports do not discard a pool already running new jobs.
+        """
+        with self._lock:
+            if self._executor is broken and not self._stopping:
+                self._executor = self._create_executor()
+                broken.shutdown(wait=False, cancel_futures=True)
+            return self._executor
+
+    def _run_pooled(self, *args):
+        with self.generator_pool.checkout() as generator:
+            return _execute(generator, *args)
+
+    def _finished(self, job_id, future, executor):
+        error = None
+        summary = None
+        try:
+            summary = future.result()
+        except BrokenProcessPool:
+            error = "Worker process terminated unexpectedly"
+            logger.error(f"Job {job_id} failed: {error}")
+            # A dead worker breaks the whole pool; replace it for the next jobs
+            self._replace_executor(executor)
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            logger.error(f"Job {job_id} failed: {error}")
+        if not self._stopping:
+            if self.store.mark_finished(job_id, error, owner=self.owner):
+                if error is None and self.result_cache is not None:
+                    self._cache_result(job_id)
+                if error is None and self.history_store is not None:
+                    self._record_history(job_id)
+                if self.metrics is not None:
+                    self._record_metrics(job_id, summary, error)
+            else:
+                logger.warning(f"Job {job_id} was requeued while running here, its outcome is discarded")
+        with self._lock:
+            self._running.discard(job_id)
+        self._wakeup.set()
+
+    def _cache_result(self, job_id):
+        job = self.store.get(job_id)
+        if job['cache_key']:
+            try:
+                self.result_cache.store(job['cache_key'], job['output_path'])
+            except OSError as e:
+                logger.warning(f"Could not cache the result of job {job_id}: {e}")
+
+    def _record_history(self, job_id):
+        job = self.store.get(job_id)
+        try:
+            self.history_store.record(
+                job['output_path'],
+                source_hash=job['source_hash'],
+                params=job['params'],
+                processing_seconds=job['finished_at'] - job['started_at'],
+                created_at=job['finished_at'],
+                job_id=job_id
+            )
+        except OSError as e:
+            logger.warning(f"Could not record job {job_id} in the history: {e}")
+
+    def _record_metrics(self, job_id, summary, error):
+        job = self.store.get(job_id)
+        self.metrics.record_job(
+            summary,
+            latency=job['finished_at'] - job['created_at'],
+            processing_seconds=job['finished_at'] - job['started_at'],
+            failed=error is not None
+        )
+
+    def running(self):
+        """
+        Jobs being processed, with their progress and frames per second
+        """
+        return self.store.by_state(RUNNING)
+
+    def shutdown(self):
+        """
+        Stop dispatching; running jobs are requeued once their heartbeat times out
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
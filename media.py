@@ -0,0 +1,212 @@
+import logging
+import mimetypes
+import os
+import re
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Generated outputs never change once written (every job gets a new filename)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)$')
+
+
+def file_etag(stat):
+    """
+    Strong validator for a file from its modification time and size
+    """
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single-range `Range: bytes=...` header.
+    Returns None when the header is absent or not a single byte range (the
+    whole file is sent), and raises ValueError when the range is unsatisfiable.
+    """
+    match = _RANGE_PATTERN.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        if not last:
+            return None
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def send_media(folder, filename, as_attachment=False, max_age=IMMUTABLE_MAX_AGE, offload=None,
+               accel_prefix='/protected/'):
+    """
+    Flask response for a generated file with byte-range and conditional GET
+    support (ETag and Last-Modified) and long-lived immutable caching.
+    max_age=None marks a file that may still change (e.g. still being
+    written) as no-cache instead, so it is revalidated on every use.
+
+    offload: None to stream from the app; 'x-sendfile' (Apache, lighttpd) or
+    'x-accel' (nginx, files under accel_prefix) to let the front server send the
+    body, which then also answers range requests.
+    """
+    from flask import abort, make_response, send_from_directory
+    from werkzeug.security import safe_join
+
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    if offload in ('x-sendfile', 'x-accel'):
+        # Headers only; the front server reads the file and answers ranges itself
+        stat = os.stat(path)
+        response = make_response('')
+        if offload == 'x-accel':
+            response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + filename
+        else:
+            response.headers['X-Sendfile'] = os.path.abspath(path)
+        response.headers['Content-Type'] = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response.headers['ETag'] = file_etag(stat)
+        response.headers['Last-Modified'] = formatdate(stat.st_mtime, usegmt=True)
+        if as_attachment:
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    elif offload is None:
+        response = send_from_directory(folder, filename, as_attachment=as_attachment, max_age=max_age or 0,
+                                       conditional=True)
+    else:
+        raise ValueError(f"Unknown media offload: {offload}")
+    if max_age is None:
+        response.cache_control.max_age = None
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.cache_control.immutable = True
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+
+class MediaRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Static file handler that answers single byte-range requests, conditional
+    GETs and sets immutable cache headers, sending bodies with sendfile().
+    Directories are listed as by SimpleHTTPRequestHandler.
+
+    is_final: optional callable(path) telling whether a file is complete; files
+    it rejects (e.g. still being written) are sent as no-cache instead.
+    """
+    max_age = IMMUTABLE_MAX_AGE
+
+    def __init__(self, *args, is_final=None, **kwargs):
+        # Set before the base class handles the request in its constructor
+        self.is_final = is_final
+        super().__init__(*args, **kwargs)
+
+    def send_head(self):
+        self._body_range = None
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            return super().send_head()
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        try:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            etag = file_etag(stat)
+            if self._not_modified(etag, stat.st_mtime):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self._send_validators(path, etag, stat.st_mtime)
+                self.end_headers()
+                f.close()
+                return None
+
+            byte_range = None
+            if_range = self.headers.get('If-Range')
+            if if_range is None or if_range == etag:
+                try:
+                    byte_range = parse_range(self.headers.get('Range'), size)
+                except ValueError:
+                    self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header('Content-Range', f'bytes */{size}')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    f.close()
+                    return None
+
+            if byte_range is None:
+                start, end = 0, size - 1
+                self.send_response(HTTPStatus.OK)
+            else:
+                start, end = byte_range
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.send_header('Content-Type', self.guess_type(path))
+            self.send_header('Content-Length', str(end - start + 1))
+            self.send_header('Accept-Ranges', 'bytes')
+            self._send_validators(path, etag, stat.st_mtime)
+            self.end_headers()
+            self._body_range = (start, end - start + 1)
+            return f
+        except Exception:
+            f.close()
+            raise
+
+    def _not_modified(self, etag, mtime):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since is not None:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send_validators(self, path, etag, mtime):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', formatdate(mtime, usegmt=True))
+        if self.is_final is None or self.is_final(path):
+            self.send_header('Cache-Control', f'public, max-age={self.max_age}, immutable')
+        else:
+            self.send_header('Cache-Control', 'no-cache')
+
+    def copyfile(self, source, outputfile):
+        if self._body_range is None:
+            return super().copyfile(source, outputfile)
+        offset, count = self._body_range
+        if count > 0:
+            self.connection.sendfile(source, offset, count)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def create_media_server(folder, port=8000, host='', is_final=None):
+    """
+    Threaded HTTP server for the files in folder (not started).
+    is_final: see MediaRequestHandler
+    """
+    handler = partial(MediaRequestHandler, directory=folder, is_final=is_final)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_media_server(folder, port=8000, host='', is_final=None):
+    """
+    Serve folder from a daemon thread and return the server (call shutdown() to stop)
+    """
+    server = create_media_server(folder, port, host, is_final)
+    threading.Thread(target=server.serve_forever, name="media-server", daemon=True).start()
+    return server
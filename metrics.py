@@ -0,0 +1,212 @@
+import bisect
+import threading
+import time
+from collections import deque
+
+# Upper bounds (seconds) of the per-frame stage time histogram buckets
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Upper bounds of the frames per job histogram buckets
+FRAME_COUNT_BUCKETS = (1, 30, 100, 300, 1000, 3000, 10000, 30000, 100000)
+
+# Upper bounds (seconds) of the job processing time histogram buckets
+JOB_SECONDS_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# Job latency quantiles reported by /metrics
+LATENCY_QUANTILES = (0.5, 0.95, 0.99)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """
+    Counts of observations in fixed buckets, plus their sum.
+
+    Histograms with the same bounds merge by adding counts, so per-job
+    histograms built in worker processes can be combined in the web process.
+    """
+    def __init__(self, bounds, counts=None, total=0.0):
+        self.bounds = tuple(bounds)
+        # One count per bound plus the +Inf bucket, not cumulative
+        self.counts = list(counts) if counts is not None else [0] * (len(self.bounds) + 1)
+        self.sum = total
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def merge(self, other):
+        if other.bounds != self.bounds:
+            raise ValueError("Cannot merge histograms with different buckets")
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.sum += other.sum
+
+    def quantile(self, q):
+        """
+        Estimate of the q-quantile, interpolated linearly inside its bucket (as
+        Prometheus' histogram_quantile does); None without observations
+        """
+        total = self.count
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                return lower + (self.bounds[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+
+class StageTimer:
+    """
+    Per-frame wall time of each stage of one job (decode, adjust, effects,
+    face mesh inference, encode), kept as histograms. 'finalize' (flushing
+    the encoder) is observed once per job; with frame workers, 'workers' is
+    the time the writer waits for processed frames. With the threaded serial
+    pipeline, decode and encode overlap the effects, and 'decode_wait' and
+    'encode_wait' are the time the effects spend waiting on them.
+
+    Meant to stay on in production: recording a stage is one perf_counter()
+    pair and a bucket increment, a few microseconds per frame.
+    """
+    def __init__(self):
+        self.stages = {}
+        self.started = time.perf_counter()
+
+    def add(self, stage, seconds):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = Histogram(STAGE_BUCKETS)
+        histogram.observe(seconds)
+
+    def summary(self, frames):
+        """
+        Job summary: frame count, wall time, throughput and, per stage, total
+        seconds, observations, mean and p95 milliseconds and histogram counts
+        """
+        elapsed = time.perf_counter() - self.started
+        stages = {}
+        for name, histogram in self.stages.items():
+            count = histogram.count
+            p95 = histogram.quantile(0.95)
+            stages[name] = {
+                'seconds': round(histogram.sum, 6),
+                'count': count,
+                'mean_ms': round(histogram.sum * 1000 / count, 3) if count else 0.0,
+                'p95_ms': round(p95 * 1000, 3) if p95 is not None else None,
+                'buckets': histogram.counts,
+            }
+        return {
+            'frames': frames,
+            'seconds': round(elapsed, 3),
+            'fps': round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+            'stages': stages,
+        }
+
+
+def format_stages(summary):
+    """
+    One-line rendering of a job summary's stages, e.g. 'decode 1.20 ms, blur 3.41 ms' (mean per frame)
+    """
+    return ', '.join(f"{name} {stage['mean_ms']:.2f} ms" for name, stage in summary['stages'].items())
+
+
+class PipelineMetrics:
+    """
+    Aggregate of finished jobs for the /metrics endpoint: per-stage frame time
+    histograms merged from job summaries, frames and processing time per job,
+    and end-to-end job latency (queued to finished) over the last window jobs
+    for quantiles. Thread-safe.
+    """
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.job_frames = Histogram(FRAME_COUNT_BUCKETS)
+        self.job_seconds = Histogram(JOB_SECONDS_BUCKETS)
+        self.latencies = deque(maxlen=window)
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self.jobs = {'done': 0, 'failed': 0}
+        self.frames = 0
+
+    def record_job(self, summary=None, latency=None, processing_seconds=None, failed=False):
+        """
+        Add a finished job: its generate_deepfake() summary (None for a failed
+        job), seconds from queueing to finishing and seconds spent processing
+        """
+        with self._lock:
+            self.jobs['failed' if failed else 'done'] += 1
+            if summary is not None:
+                self.frames += summary['frames']
+                self.job_frames.observe(summary['frames'])
+                for name, stage in summary['stages'].items():
+                    histogram = self.stages.get(name)
+                    if histogram is None:
+                        histogram = self.stages[name] = Histogram(STAGE_BUCKETS)
+                    histogram.merge(Histogram(STAGE_BUCKETS, stage['buckets'], stage['seconds']))
+            if processing_seconds is not None and not failed:
+                self.job_seconds.observe(processing_seconds)
+            if latency is not None and not failed:
+                self.latencies.append(latency)
+                self.latency_sum += latency
+                self.latency_count += 1
+
+    def render(self, gauges=None):
+        """
+        The metrics in the Prometheus text exposition format.
+        gauges: extra {name: (help, value)} sampled by the caller, e.g. queue depth
+        """
+        lines = []
+        for name, (help_text, value) in (gauges or {}).items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+
+        with self._lock:
+            lines += ["# HELP deepfake_jobs_total Finished jobs by outcome", "# TYPE deepfake_jobs_total counter"]
+            lines += [f'deepfake_jobs_total{{outcome="{outcome}"}} {count}' for outcome, count in self.jobs.items()]
+            lines += ["# HELP deepfake_frames_total Frames processed by finished jobs",
+                      "# TYPE deepfake_frames_total counter", f"deepfake_frames_total {self.frames}"]
+
+            latencies = sorted(self.latencies)
+            lines += ["# HELP deepfake_job_latency_seconds Seconds from queueing to finishing, "
+                      f"quantiles over the last {self.latencies.maxlen} jobs",
+                      "# TYPE deepfake_job_latency_seconds summary"]
+            for q in LATENCY_QUANTILES:
+                value = latencies[min(int(q * len(latencies)), len(latencies) - 1)] if latencies else float('nan')
+                lines.append(f'deepfake_job_latency_seconds{{quantile="{q}"}} {_number(value)}')
+            lines += [f"deepfake_job_latency_seconds_sum {_number(self.latency_sum)}",
+                      f"deepfake_job_latency_seconds_count {self.latency_count}"]
+
+            lines += _histogram_lines('deepfake_job_processing_seconds', 'Seconds spent processing a job',
+                                      {'': self.job_seconds})
+            lines += _histogram_lines('deepfake_job_frames', 'Frames per job', {'': self.job_frames})
+            lines += _histogram_lines('deepfake_stage_seconds', 'Per-frame wall time of each pipeline stage',
+                                      {f'stage="{name}"': histogram for name, histogram in self.stages.items()})
+        return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(name, help_text, histograms):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in histograms.items():
+        prefix = f'{labels},' if labels else ''
+        cumulative = 0
+        for bound, count in zip(histogram.bounds + ('+Inf',), histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines += [f"{name}_sum{suffix} {_number(histogram.sum)}", f"{name}_count{suffix} {cumulative}"]
+    return lines
+
+
+def _number(value):
+    if value != value:
+        return 'NaN'
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from deepfake import IMAGE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+
+def sample_proxy_frames(path, count=4, max_side=240):
+    """
+    Up to count frames spread evenly over a video (or the image itself),
+    downscaled so their longest side is at most max_side
+    """
+    if path.lower().endswith(IMAGE_EXTENSIONS):
+        image = cv2.imread(path)
+        frames = [] if image is None else [image]
+    else:
+        cap = cv2.VideoCapture(path)
+        try:
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            positions = [0] if total <= 1 else sorted({round(i * (total - 1) / max(count - 1, 1))
+                                                       for i in range(count)})
+            frames = []
+            for position in positions:
+                if position:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+                ret, frame = cap.read()
+                if ret:
+                    frames.append(frame)
+        finally:
+            cap.release()
+    return [_downscale(frame, max_side) for frame in frames]
+
+
+def _downscale(frame, max_side):
+    height, width = frame.shape[:2]
+    if max(height, width) <= max_side:
+        return frame
+    scale = max_side / max(height, width)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+
+def tile_frames(frames, columns=2):
+    """
+    Arrange equally sized frames in a grid, row by row; missing cells are black
+    """
+    height, width = frames[0].shape[:2]
+    rows = -(-len(frames) // columns)
+    columns = min(columns, len(frames))
+    grid = np.zeros((rows * height, columns * width, 3), dtype=np.uint8)
+    for index, frame in enumerate(frames):
+        row, column = divmod(index, columns)
+        grid[row * height:(row + 1) * height, column * width:(column + 1) * width] = frame
+    return grid
+
+
+class PreviewRenderer:
+    """
+    Renders effect settings on downscaled proxies of a few frames of the
+    source, on a background thread with its own generator (MediaPipe's face
+    mesh cannot be shared with the thread doing full generation).
+
+    request() only records the latest settings; a render in progress is
+    finished and intermediate requests are dropped, so a burst of slider
+    moves costs one render per frame the worker can produce. Results are
+    picked up with poll(), from the UI thread.
+    """
+    def __init__(self, generator_factory, sample_count=4, max_side=240, columns=2):
+        self.generator_factory = generator_factory
+        self.sample_count = sample_count
+        self.max_side = max_side
+        self.columns = columns
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending_source = None
+        self._pending_settings = None
+        self._result = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="preview-renderer", daemon=True)
+        self._thread.start()
+
+    def set_source(self, path):
+        with self._lock:
+            self._pending_source = path
+        self._wakeup.set()
+
+    def request(self, effect='original', brightness=0, contrast=1):
+        with self._lock:
+            self._pending_settings = (effect, brightness, contrast)
+        self._wakeup.set()
+
+    def poll(self):
+        """
+        The newest finished preview as (RGB image, settings, render seconds), or None if
+        nothing new was rendered since the last call. The image is None when the source
+        could not be read.
+        """
+        with self._lock:
+            result, self._result = self._result, None
+        return result
+
+    def _run(self):
+        generator = None
+        frames = []
+        settings = None
+        try:
+            while not self._closed:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                with self._lock:
+                    source, self._pending_source = self._pending_source, None
+                    settings = self._pending_settings or settings
+                    self._pending_settings = None
+                if self._closed:
+                    break
+                if source is not None:
+                    frames = sample_proxy_frames(source, self.sample_count, self.max_side)
+                    if not frames:
+                        with self._lock:
+                            self._result = (None, settings, 0.0)
+                        continue
+                if settings is None or not frames:
+                    continue
+                if generator is None:
+                    generator = self.generator_factory()
+
+                start = time.perf_counter()
+                try:
+                    rendered = [generator.process_frame(frame, *settings) for frame in frames]
+                except Exception as e:
+                    logger.warning(f"Preview failed: {e}")
+                    continue
+                image = cv2.cvtColor(tile_frames(rendered, self.columns), cv2.COLOR_BGR2RGB)
+                with self._lock:
+                    self._result = (image, settings, time.perf_counter() - start)
+        finally:
+            if generator is not None:
+                generator.cleanup()
+
+    def close(self):
+        """
+        Stop the worker; waits for a render in progress so the generator is released
+        """
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from effects import parse_effect_chain
+
+logger = logging.getLogger(__name__)
+
+# Bytes read per hashing step
+HASH_BUFFER_SIZE = 1024 * 1024
+
+# Job params that do not change the output (frame workers produce identical files)
+_IGNORED_PARAMS = {'workers'}
+
+# Generator options that do not change the output
+_IGNORED_GENERATOR_OPTIONS = {'frame_queue_depth'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    output_path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used_at);
+CREATE TABLE IF NOT EXISTS result_cache_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def hash_file(path):
+    """
+    SHA-256 of a file's content, read in chunks
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(HASH_BUFFER_SIZE)
+            if not data:
+                break
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def result_key(content_hash, params, generator_options=None, output_format='.mp4'):
+    """
+    Cache key for an input's content hash and the settings that shape the output.
+    Params are normalized so equivalent requests ('blur, edge' vs ['blur', 'edge'],
+    contrast 1 vs 1.0) share a key.
+    """
+    normalized = {}
+    for name, value in params.items():
+        if name in _IGNORED_PARAMS:
+            continue
+        if name == 'effect':
+            value = ','.join(parse_effect_chain(value))
+        elif name in ('contrast', 'still_duration', 'still_fps'):
+            value = float(value)
+        elif name == 'brightness':
+            value = int(value)
+        normalized[name] = value
+    key = {
+        'input': content_hash,
+        'params': normalized,
+        'generator': {name: value for name, value in (generator_options or {}).items()
+                      if name not in _IGNORED_GENERATOR_OPTIONS},
+        'format': output_format.lower(),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=list).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Index of generated outputs by result_key(), stored in SQLite next to the jobs.
+
+    Entries are evicted least recently used first once the cached outputs
+    exceed max_bytes, and when unused for longer than max_age seconds;
+    evicting an entry deletes its output file and passes its path to
+    on_evict. Only outputs stored through the cache are ever deleted.
+    """
+    def __init__(self, db_path, max_bytes=5 * 1024 ** 3, max_age=7 * 24 * 3600, on_evict=None):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.on_evict = on_evict
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _count(self, conn, name):
+        conn.execute(
+            "INSERT INTO result_cache_stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def lookup(self, key):
+        """
+        Return the output path cached under key, or None on a miss.
+        An expired entry, or one whose file was removed behind the cache's
+        back, is dropped like an evicted one.
+        """
+        stale = None
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None and time.time() - row['last_used_at'] <= self.max_age \
+                    and os.path.exists(row['output_path']):
+                conn.execute("UPDATE results SET last_used_at = ? WHERE key = ?", (time.time(), key))
+                self._count(conn, 'hits')
+                return row['output_path']
+            if row is not None:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._count(conn, 'evictions')
+                stale = row['output_path']
+            self._count(conn, 'misses')
+        if stale is not None:
+            self._discard(stale)
+        return None
+
+    def store(self, key, output_path):
+        """
+        Record output_path as the result for key, then evict down to the limits
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, output_path, size, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, output_path, os.path.getsize(output_path), now, now)
+            )
+        self.evict()
+
+    def evict(self):
+        """
+        Delete expired entries, then least recently used ones until the total fits max_bytes
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT key, output_path, size, last_used_at FROM results "
+                                "ORDER BY last_used_at").fetchall()
+            total = sum(row['size'] for row in rows)
+            cutoff = time.time() - self.max_age
+            evicted = []
+            for row in rows:
+                if row['last_used_at'] >= cutoff and total <= self.max_bytes:
+                    break
+                evicted.append(row)
+                total -= row['size']
+            for row in evicted:
+                conn.execute("DELETE FROM results WHERE key = ?", (row['key'],))
+                self._count(conn, 'evictions')
+        for row in evicted:
+            self._discard(row['output_path'])
+        return len(evicted)
+
+    def _discard(self, output_path):
+        try:
+            os.remove(output_path)
+        except FileNotFoundError:
+            pass
+        if self.on_evict is not None:
+            self.on_evict(output_path)
+        logger.info(f"Evicted cached result {output_path}")
+
+    def stats(self):
+        """
+        Hit/miss counters and the size of the cache
+        """
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM result_cache_stats").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+        return {
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'max_age_seconds': self.max_age,
+            'hits': hits,
+            'misses': misses,
+            'evictions': counters.get('evictions', 0),
+            'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        }
@@ -2,8 +2,15 @@ import tkinter as tk
 from tkinter import ttk
 import cv2
 from PIL import Image, ImageTk
+import math
 import os
-from desktop_app_config import GENERATED_FOLDER
+import time
+from collections import deque
+from desktop_app_config import GENERATED_FOLDER, VIEWER_CACHE_BYTES, VIEWER_READ_AHEAD
+from frame_cache import FramePrefetcher
+
+# Playback rate for files whose frame rate metadata is missing or zero
+FALLBACK_FPS = 30.0
 
 class ResultViewer:
     def __init__(self, video_path):
@@ -12,17 +19,39 @@ class ResultViewer:
         self.window.geometry("800x600")
         
         self.video_path = video_path
-        self.cap = cv2.VideoCapture(video_path)
+        cap = cv2.VideoCapture(video_path)
         
         # Get video properties
-        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        self.fps = int(self.cap.get(cv2.CAP_PROP_FPS))
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.total_frames = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 1)
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        if not self.fps > 0 or math.isinf(self.fps):
+            self.fps = FALLBACK_FPS
+        cap.release()
+        
+        # Size frames are displayed at, fitted into the canvas
+        self.display_width = min(self.width, 800)
+        self.display_height = min(self.height, 450)
+        aspect_ratio = self.width / self.height
+        if aspect_ratio > self.display_width / self.display_height:
+            self.frame_size = (self.display_width, int(self.display_width / aspect_ratio))
+        else:
+            self.frame_size = (int(self.display_height * aspect_ratio), self.display_height)
+        
+        # Decoded, resized frames; decoded ahead of the playhead in the background
+        self.frames = FramePrefetcher(video_path, self.prepare_frame, VIEWER_CACHE_BYTES, VIEWER_READ_AHEAD)
         
         self.current_frame = 0
         self.playing = False
         
+        # Playback clock: frame shown at time t is clock_frame + (t - clock_start) * fps
+        self.clock_start = 0.0
+        self.clock_frame = 0
+        self.dropped_frames = 0
+        self.shown_times = deque()
+        self.after_id = None
+        
         self.create_widgets()
         
     def create_widgets(self):
@@ -33,11 +62,20 @@ class ResultViewer:
         # Video display
         self.canvas = tk.Canvas(
             main_frame, 
-            width=min(self.width, 800),
-            height=min(self.height, 450)
+            width=self.display_width,
+            height=self.display_height
         )
         self.canvas.grid(row=0, column=0, columnspan=3, pady=10)
         
+        # One Tk image and canvas item, updated in place for every frame
+        self.photo = ImageTk.PhotoImage('RGB', self.frame_size)
+        self.canvas.create_image(
+            self.display_width//2,
+            self.display_height//2,
+            image=self.photo,
+            anchor=tk.CENTER
+        )
+        
         # Controls frame
         controls_frame = ttk.Frame(main_frame)
         controls_frame.grid(row=1, column=0, columnspan=3, pady=10)
@@ -70,6 +108,10 @@ class ResultViewer:
         )
         self.frame_label.grid(row=0, column=2, padx=5)
         
+        # Achieved versus target playback rate
+        self.fps_label = ttk.Label(controls_frame, text=f"Playback: -/{self.fps:.1f} fps")
+        self.fps_label.grid(row=1, column=0, columnspan=3, pady=5)
+        
         # Configure grid weights
         self.window.columnconfigure(0, weight=1)
         self.window.rowconfigure(0, weight=1)
@@ -78,35 +120,15 @@ class ResultViewer:
         # Show first frame
         self.show_frame(0)
         
+    def prepare_frame(self, frame):
+        """Convert a decoded BGR frame to RGB at display size"""
+        frame = cv2.resize(frame, self.frame_size)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    
     def show_frame(self, frame_number):
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-        ret, frame = self.cap.read()
-        if ret:
-            # Convert frame from BGR to RGB
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Resize frame if needed
-            display_width = min(self.width, 800)
-            display_height = min(self.height, 450)
-            aspect_ratio = self.width / self.height
-            
-            if aspect_ratio > display_width / display_height:
-                new_width = display_width
-                new_height = int(display_width / aspect_ratio)
-            else:
-                new_height = display_height
-                new_width = int(display_height * aspect_ratio)
-            
-            frame = cv2.resize(frame, (new_width, new_height))
-            
-            # Convert to PhotoImage
-            self.photo = ImageTk.PhotoImage(image=Image.fromarray(frame))
-            self.canvas.create_image(
-                display_width//2,
-                display_height//2,
-                image=self.photo,
-                anchor=tk.CENTER
-            )
+        frame = self.frames.get(frame_number)
+        if frame is not None:
+            self.photo.paste(Image.fromarray(frame))
             
             # Update frame counter
             self.frame_label.config(text=f"Frame: {frame_number}/{self.total_frames-1}")
@@ -115,29 +137,69 @@ class ResultViewer:
         frame_number = int(float(value))
         self.show_frame(frame_number)
         self.current_frame = frame_number
+        if self.playing:
+            self.reset_clock()
     
     def toggle_play(self):
         self.playing = not self.playing
         self.play_button.config(text="Pause" if self.playing else "Play")
         if self.playing:
+            self.dropped_frames = 0
+            self.shown_times.clear()
+            self.reset_clock()
             self.play_video()
+        elif self.after_id is not None:
+            self.window.after_cancel(self.after_id)
+            self.after_id = None
+    
+    def reset_clock(self):
+        self.clock_start = time.monotonic()
+        self.clock_frame = self.current_frame
     
     def play_video(self):
-        if self.playing:
-            self.current_frame += 1
-            if self.current_frame >= self.total_frames:
-                self.current_frame = 0
-            
-            self.frame_var.set(self.current_frame)
-            self.show_frame(self.current_frame)
-            
-            # Schedule next frame update
-            self.window.after(int(1000/self.fps), self.play_video)
+        """
+        Show the frame due now on the playback clock and schedule the next one.
+        Frames that are already late are skipped, so playback keeps real time
+        even when decoding or display is slower than the frame rate.
+        """
+        self.after_id = None
+        if not self.playing:
+            return
+        now = time.monotonic()
+        due = self.clock_frame + int((now - self.clock_start) * self.fps)
+        if due >= self.total_frames:
+            # Loop from the start
+            due = 0
+            self.clock_start = now
+            self.clock_frame = 0
+        elif due > self.current_frame + 1:
+            self.dropped_frames += due - self.current_frame - 1
+        
+        if due != self.current_frame:
+            self.current_frame = due
+            self.frame_var.set(due)
+            self.show_frame(due)
+            self.shown_times.append(now)
+            self.update_fps_label(now)
+        
+        # Wake up when the next frame is due
+        next_time = self.clock_start + (self.current_frame + 1 - self.clock_frame) / self.fps
+        delay = max(math.ceil((next_time - time.monotonic()) * 1000), 1)
+        self.after_id = self.window.after(delay, self.play_video)
+    
+    def update_fps_label(self, now):
+        # Frames shown during the last second
+        while self.shown_times and self.shown_times[0] < now - 1.0:
+            self.shown_times.popleft()
+        self.fps_label.config(
+            text=f"Playback: {len(self.shown_times)}/{self.fps:.1f} fps (dropped {self.dropped_frames})"
+        )
     
     def cleanup(self):
         self.playing = False
-        if self.cap is not None:
-            self.cap.release()
+        if self.after_id is not None:
+            self.window.after_cancel(self.after_id)
+        self.frames.close()
         self.window.destroy()
 
 def show_result(video_path):
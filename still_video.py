@@ -0,0 +1,180 @@
+import logging
+import struct
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# MP4 boxes that only contain other boxes, down to the sample tables
+_CONTAINERS = {b'moov', b'trak', b'edts', b'mdia', b'minf', b'stbl'}
+
+
+def write_still_video(path, frame, fps=30.0, frame_count=90):
+    """
+    Write an MP4 showing frame for frame_count frames at fps.
+
+    The frame is encoded once; the sample tables of the file are then
+    rewritten so every frame of the track refers to that single encoded
+    sample. Falls back to encoding every frame when the file written by
+    OpenCV does not have the expected layout.
+    """
+    height, width = frame.shape[:2]
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    if not out.isOpened():
+        raise ValueError(f"Could not open a video writer for {path}")
+    out.write(frame)
+    out.release()
+    if frame_count <= 1:
+        return
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        data = repeat_single_sample(data, frame_count)
+    except ValueError as e:
+        logger.warning(f"Could not repeat the encoded frame ({e}); encoding {frame_count} frames instead")
+        out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+        for _ in range(frame_count):
+            out.write(frame)
+        out.release()
+        return
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def repeat_single_sample(data, frame_count):
+    """
+    Rewrite a single-track, single-sample MP4 (moov after mdat) so the
+    sample is played frame_count times. Raises ValueError for anything else.
+    """
+    boxes = _parse(data, 0, len(data))
+    types = [box_type for box_type, _ in boxes]
+    if b'moov' not in types or b'mdat' not in types or types.index(b'moov') < types.index(b'mdat'):
+        # Offsets into mdat only stay valid when moov follows it
+        raise ValueError("expected moov after mdat")
+    moov = boxes[types.index(b'moov')][1]
+    traks = [children for box_type, children in moov if box_type == b'trak']
+    if len(traks) != 1:
+        raise ValueError(f"expected one track, found {len(traks)}")
+
+    trak = traks[0]
+    mdia = _child(trak, b'mdia')
+    stbl = _child(_child(mdia, b'minf'), b'stbl')
+
+    entries, delta = _read_stts(_child(stbl, b'stts'))
+    sample_size, sample_count = struct.unpack('>II', _child(stbl, b'stsz')[4:12])
+    if entries != 1 or sample_count not in (0, 1) or sample_size == 0:
+        raise ValueError("expected exactly one sample")
+    # 32-bit chunk offsets, or 64-bit ones in large files
+    offsets_type = b'co64' if any(box_type == b'co64' for box_type, _ in stbl) else b'stco'
+    chunk_offsets = _child(stbl, offsets_type)
+    if struct.unpack('>I', chunk_offsets[4:8])[0] != 1:
+        raise ValueError("expected exactly one chunk")
+    offset = chunk_offsets[8:16 if offsets_type == b'co64' else 12]
+
+    # One sample per chunk (stsc is unchanged) and every chunk pointing at the same bytes
+    _replace(stbl, b'stts', struct.pack('>III', 0, 1, frame_count) + struct.pack('>I', delta))
+    _replace(stbl, b'stsz', struct.pack('>III', 0, sample_size, frame_count))
+    _replace(stbl, offsets_type, struct.pack('>II', 0, frame_count) + offset * frame_count)
+    # Without stss every sample is a sync sample, which holds for a repeated key frame
+    stbl[:] = [(box_type, payload) for box_type, payload in stbl if box_type != b'stss']
+
+    media_timescale, _ = _read_duration(_child(mdia, b'mdhd'))
+    media_duration = delta * frame_count
+    _write_duration(mdia, b'mdhd', media_duration)
+
+    movie_timescale, _ = _read_duration(_child(moov, b'mvhd'))
+    movie_duration = round(media_duration * movie_timescale / media_timescale)
+    _write_duration(moov, b'mvhd', movie_duration)
+    _write_duration(trak, b'tkhd', movie_duration)
+    edts = [children for box_type, children in trak if box_type == b'edts']
+    if edts:
+        _write_edit_duration(edts[0], movie_duration)
+
+    return b''.join(_serialize(box_type, payload) for box_type, payload in boxes)
+
+
+def _parse(data, start, end):
+    boxes = []
+    offset = start
+    while offset < end:
+        if end - offset < 8:
+            raise ValueError("truncated box header")
+        size, box_type = struct.unpack('>I4s', data[offset:offset + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', data[offset + 8:offset + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            raise ValueError(f"invalid size for box {box_type!r}")
+        if box_type in _CONTAINERS:
+            payload = _parse(data, offset + header, offset + size)
+        else:
+            payload = data[offset + header:offset + size]
+        boxes.append((box_type, payload))
+        offset += size
+    return boxes
+
+
+def _serialize(box_type, payload):
+    if isinstance(payload, list):
+        payload = b''.join(_serialize(child_type, child) for child_type, child in payload)
+    size = len(payload) + 8
+    if size > 0xFFFFFFFF:
+        return struct.pack('>I4sQ', 1, box_type, size + 8) + payload
+    return struct.pack('>I4s', size, box_type) + payload
+
+
+def _child(children, box_type):
+    for child_type, payload in children:
+        if child_type == box_type:
+            return payload
+    raise ValueError(f"missing {box_type.decode()} box")
+
+
+def _replace(children, box_type, payload):
+    for index, (child_type, _) in enumerate(children):
+        if child_type == box_type:
+            children[index] = (box_type, payload)
+            return
+    raise ValueError(f"missing {box_type.decode()} box")
+
+
+def _read_stts(payload):
+    entry_count = struct.unpack('>I', payload[4:8])[0]
+    if entry_count != 1:
+        raise ValueError("expected one time-to-sample entry")
+    return struct.unpack('>II', payload[8:16])
+
+
+# Offsets of the timescale and duration fields in full boxes, by box type and version
+_DURATION_LAYOUT = {
+    b'mvhd': {0: (12, 16, '>I'), 1: (20, 24, '>Q')},
+    b'mdhd': {0: (12, 16, '>I'), 1: (20, 24, '>Q')},
+    b'tkhd': {0: (None, 20, '>I'), 1: (None, 28, '>Q')},
+}
+
+
+def _read_duration(payload):
+    timescale_offset, duration_offset, duration_format = _DURATION_LAYOUT[b'mvhd'][payload[0]]
+    timescale = struct.unpack('>I', payload[timescale_offset:timescale_offset + 4])[0]
+    duration = struct.unpack_from(duration_format, payload, duration_offset)[0]
+    return timescale, duration
+
+
+def _write_duration(children, box_type, duration):
+    payload = bytearray(_child(children, box_type))
+    _, duration_offset, duration_format = _DURATION_LAYOUT[box_type][payload[0]]
+    struct.pack_into(duration_format, payload, duration_offset, duration)
+    _replace(children, box_type, bytes(payload))
+
+
+def _write_edit_duration(edts, duration):
+    payload = bytearray(_child(edts, b'elst'))
+    version = payload[0]
+    if struct.unpack('>I', payload[4:8])[0] != 1:
+        raise ValueError("expected one edit list entry")
+    struct.pack_into('>Q' if version == 1 else '>I', payload, 8, duration)
+    _replace(edts, b'elst', bytes(payload))
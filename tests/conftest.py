@@ -0,0 +1,28 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# Make the application modules and the benchmark helpers importable from the tests
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (APP_DIR, os.path.join(APP_DIR, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture(scope='session')
+def web_app(tmp_path_factory):
+    """The Flask app module, imported in a scratch directory"""
+    # config.py creates its folders and database relative to the working directory
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('app'))
+    try:
+        yield importlib.import_module('app')
+    finally:
+        os.chdir(previous)
+
+
+@pytest.fixture
+def client(web_app):
+    return web_app.app.test_client()
@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+import pytest
+
+from _common import make_face_frame
+from deepfake import DeepfakeGenerator
+from effects import ANY, BGR, GRAY, EffectChain, parse_effect_chain
+
+SIZES = [(320, 240), (160, 120), (320, 240), (200, 150)]
+
+
+@pytest.fixture
+def generators():
+    # Face mesh tracks landmarks across frames, so the chain and the reference each get their own generator
+    chained, reference = DeepfakeGenerator(), DeepfakeGenerator()
+    yield chained, reference
+    chained.cleanup()
+    reference.cleanup()
+
+
+def one_by_one(generator, names, frame, brightness, contrast):
+    """Apply each effect on its own to a fresh array, converting formats between steps"""
+    current = cv2.convertScaleAbs(frame, alpha=contrast, beta=brightness)
+    current_format = BGR
+    for name in names:
+        effect = generator.effects[name]
+        wanted = current_format if effect.input_format == ANY else effect.input_format
+        if wanted != current_format:
+            code = cv2.COLOR_BGR2GRAY if wanted == GRAY else cv2.COLOR_GRAY2BGR
+            current = cv2.cvtColor(current, code)
+            current_format = wanted
+        current = effect.apply(current.copy())
+        current_format = current_format if effect.output_format == ANY else effect.output_format
+    if current_format == GRAY:
+        current = cv2.cvtColor(current, cv2.COLOR_GRAY2BGR)
+    return current
+
+
+@pytest.mark.parametrize('effect', [
+    'grayscale,blur,edge',
+    'edge,face_mesh',
+    'blur,edge,blur',
+    'face_mesh,grayscale',
+    'grayscale,original,blur',
+])
+@pytest.mark.parametrize('in_place', [False, True])
+def test_chain_matches_effects_applied_one_by_one(generators, effect, in_place):
+    chained, reference = generators
+    names = parse_effect_chain(effect)
+    chain = EffectChain([chained.effects[name] for name in names], brightness=10, contrast=1.2)
+    # Frame sizes change between calls, so the chain's conversion buffers must be reallocated
+    for index, (width, height) in enumerate(SIZES):
+        frame = make_face_frame(width, height, index)
+        expected = one_by_one(reference, names, frame, 10, 1.2)
+        result = chain(frame, out=frame) if in_place else chain(frame.copy())
+        assert result.shape == (height, width, 3)
+        assert np.array_equal(result, expected), f"frame {index} ({width}x{height})"
+        if in_place:
+            assert result is frame
+
+
+def test_buffers_are_reused_for_frames_of_the_same_size(generators):
+    chained, _ = generators
+    chain = chained.compile_effect('grayscale,blur,edge')
+    frame = make_face_frame(160, 120, 0)
+    out = np.empty_like(frame)
+    chain(frame, out=out)
+    buffers = {name: buffer for name, buffer in chain._buffers.items()}
+    assert buffers
+
+    assert chain(make_face_frame(160, 120, 1), out=out) is out
+    assert all(chain._buffers[name] is buffer for name, buffer in buffers.items())
+
+    chain(make_face_frame(320, 240, 2))
+    assert all(buffer.shape == (240, 320) for buffer in chain._buffers.values())
@@ -0,0 +1,39 @@
+import pytest
+
+from _common import make_face_video
+from deepfake import DeepfakeGenerator
+
+FRAMES = 24
+
+
+@pytest.fixture(scope='module')
+def face_clip(tmp_path_factory):
+    return make_face_video(str(tmp_path_factory.mktemp('clips') / 'face.mp4'), 320, 240, FRAMES)
+
+
+def generate(clip, output, workers, **options):
+    generator = DeepfakeGenerator(**options)
+    try:
+        return generator.generate_deepfake(clip, str(output), effect='face_mesh', workers=workers,
+                                           show_progress=False)
+    finally:
+        generator.cleanup()
+
+
+def test_face_mesh_tracking_with_workers_matches_serial(face_clip, tmp_path):
+    serial = generate(face_clip, tmp_path / 'serial.mp4', workers=1, face_mesh_stride=4)
+    parallel = generate(face_clip, tmp_path / 'parallel.mp4', workers=2, face_mesh_stride=4)
+
+    assert (tmp_path / 'parallel.mp4').read_bytes() == (tmp_path / 'serial.mp4').read_bytes()
+    assert parallel['face_mesh']['frames'] == FRAMES
+    assert parallel['face_mesh']['tracked_frames'] > 0
+    assert parallel['face_mesh'] == serial['face_mesh']
+
+
+def test_face_counts_of_frame_workers_are_merged(face_clip, tmp_path):
+    serial = generate(face_clip, tmp_path / 'serial.mp4', workers=1)
+    parallel = generate(face_clip, tmp_path / 'parallel.mp4', workers=2)
+
+    assert parallel['face_mesh']['frames'] == FRAMES
+    assert sum(parallel['face_mesh']['face_counts'].values()) == FRAMES
+    assert parallel['face_mesh']['face_counts'] == serial['face_mesh']['face_counts']
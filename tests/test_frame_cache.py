@@ -0,0 +1,94 @@
+import threading
+
+import numpy as np
+import pytest
+
+from _common import make_test_video
+from frame_cache import FrameCache, FramePrefetcher, keyframe_index
+
+
+def frame_of(nbytes):
+    return np.zeros(nbytes, np.uint8)
+
+
+def test_cache_evicts_least_recently_used_frames():
+    cache = FrameCache(max_bytes=300)
+    for frame_number in range(3):
+        cache.put(frame_number, frame_of(100))
+    # Touch frame 0 so frame 1 becomes the oldest
+    assert cache.get(0) is not None
+    cache.put(3, frame_of(100))
+
+    assert 1 not in cache
+    assert all(frame_number in cache for frame_number in (0, 2, 3))
+    assert cache.bytes == 300
+
+
+def test_cache_replaces_a_frame_and_keeps_one_oversized_frame():
+    cache = FrameCache(max_bytes=300)
+    cache.put(0, frame_of(100))
+    cache.put(0, frame_of(200))
+    assert cache.bytes == 200
+
+    cache.put(1, frame_of(500))
+    assert 0 not in cache and 1 in cache
+    assert cache.bytes == 500
+
+
+@pytest.fixture(scope='module')
+def clip(tmp_path_factory):
+    # OpenCV's mp4v encoder writes a key frame every 12 frames
+    return make_test_video(str(tmp_path_factory.mktemp('clip') / 'clip.mp4'), 160, 120, 60)
+
+
+def test_keyframe_index_reads_sync_samples(clip):
+    assert keyframe_index(clip) == [0, 12, 24, 36, 48]
+
+
+def test_keyframe_index_of_unparsable_file(tmp_path):
+    path = tmp_path / 'not_a_video.mp4'
+    path.write_bytes(b'\0\0\0\x10junkjunkjunk')
+    assert keyframe_index(str(path)) is None
+
+
+@pytest.mark.parametrize('frame_number, expected', [(0, 0), (11, 0), (12, 12), (30, 24), (59, 48)])
+def test_keyframe_before_is_nearest_at_or_before(clip, frame_number, expected):
+    prefetcher = FramePrefetcher(clip, lambda frame: frame)
+    try:
+        assert prefetcher.keyframe_before(frame_number) == expected
+    finally:
+        prefetcher.close()
+
+
+def test_prefetcher_decodes_requested_frames(clip):
+    prefetcher = FramePrefetcher(clip, lambda frame: frame.copy(), read_ahead=8)
+    try:
+        frame = prefetcher.get(30)
+        assert frame.shape == (120, 160, 3)
+        assert prefetcher.get(30) is frame
+        assert prefetcher.get(1000) is None
+    finally:
+        prefetcher.close()
+
+
+def test_prefetcher_stops_when_closed(clip):
+    converting = threading.Event()
+    release = threading.Event()
+
+    def slow_convert(frame):
+        # Only frames read ahead block, not the requested one
+        if threading.current_thread().name == 'frame-prefetch':
+            converting.set()
+            release.wait(timeout=5)
+        return frame
+
+    prefetcher = FramePrefetcher(clip, slow_convert, read_ahead=48)
+    assert prefetcher.get(0) is not None
+    # The prefetch thread is now converting frames ahead of the playhead
+    assert converting.wait(timeout=5)
+    release.set()
+    prefetcher.close()
+
+    assert not prefetcher._thread.is_alive()
+    assert prefetcher.cache.bytes == 0
+    assert prefetcher.get(5) is None
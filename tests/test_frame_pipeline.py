@@ -0,0 +1,99 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from _common import make_test_video
+from deepfake import DeepfakeGenerator
+from frame_pipeline import ParallelFramePipeline, ThreadedFramePipeline
+
+
+class CountingWriter:
+    def __init__(self):
+        self.frames = 0
+
+    def write(self, frame):
+        self.frames += 1
+
+
+@pytest.fixture(scope='module')
+def clip(tmp_path_factory):
+    return make_test_video(str(tmp_path_factory.mktemp('clips') / 'clip.mp4'), 160, 120, frames=20)
+
+
+def test_parallel_worker_error_reports_its_traceback(clip):
+    cap = cv2.VideoCapture(clip)
+    try:
+        with pytest.raises(RuntimeError, match='(?s)Frame worker failed on frame .*Unknown effect'):
+            ParallelFramePipeline(2, 'no_such_effect').run(cap, CountingWriter())
+    finally:
+        cap.release()
+
+
+def pipeline_threads():
+    return [thread for thread in threading.enumerate()
+            if thread.name in ('frame-reader', 'frame-writer') and thread.is_alive()]
+
+
+def read_frames(path):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def test_threaded_effect_error_is_raised_and_threads_stop(clip):
+    def failing_effect(frame):
+        if failing_effect.calls == 5:
+            raise ValueError("effect failed")
+        failing_effect.calls += 1
+        return frame
+    failing_effect.calls = 0
+
+    cap = cv2.VideoCapture(clip)
+    try:
+        with pytest.raises(ValueError, match='effect failed'):
+            ThreadedFramePipeline(failing_effect, depth=2).run(cap, CountingWriter())
+    finally:
+        cap.release()
+    assert pipeline_threads() == []
+
+
+def test_threaded_writer_error_is_raised_and_threads_stop(clip):
+    class FailingWriter(CountingWriter):
+        def write(self, frame):
+            if self.frames == 3:
+                raise OSError("disk full")
+            super().write(frame)
+
+    cap = cv2.VideoCapture(clip)
+    try:
+        with pytest.raises(OSError, match='disk full'):
+            ThreadedFramePipeline(lambda frame: frame, depth=2).run(cap, FailingWriter())
+    finally:
+        cap.release()
+    assert pipeline_threads() == []
+
+
+@pytest.mark.parametrize('effect', ['blur,edge', 'grayscale,blur'])
+def test_threaded_output_matches_unthreaded(clip, tmp_path, effect):
+    outputs = []
+    for depth in (0, 3):
+        generator = DeepfakeGenerator(frame_queue_depth=depth)
+        output_path = str(tmp_path / f'depth{depth}.mp4')
+        try:
+            generator.generate_deepfake(clip, output_path, effect=effect, brightness=10, contrast=1.2,
+                                        show_progress=False)
+        finally:
+            generator.cleanup()
+        outputs.append(read_frames(output_path))
+
+    unthreaded, threaded = outputs
+    assert len(threaded) == len(unthreaded) == 20
+    assert all(np.array_equal(a, b) for a, b in zip(unthreaded, threaded))
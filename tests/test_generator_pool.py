@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from generator_pool import GeneratorPool
+
+
+class FakeGenerator:
+    def __init__(self, fail_warm_up=False):
+        self.fail_warm_up = fail_warm_up
+        self.cleaned_up = False
+
+    def warm_up(self):
+        if self.fail_warm_up:
+            raise RuntimeError("MediaPipe failed to load")
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+
+def test_failed_prewarm_gives_its_slots_back():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        # Only the prewarm's instance fails; checkouts get working ones
+        return FakeGenerator(fail_warm_up=len(attempts) == 1)
+
+    pool = GeneratorPool(size=2, factory=factory, warm_up=True)
+    with pytest.raises(RuntimeError):
+        pool.prewarm()
+
+    assert pool.stats()['created'] == 0
+    checked_out = []
+
+    def checkout():
+        with pool.checkout(timeout=5) as generator:
+            checked_out.append(generator)
+
+    thread = threading.Thread(target=checkout)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert len(checked_out) == 1
+
+
+def test_prewarm_after_close_creates_nothing():
+    pool = GeneratorPool(size=2, factory=FakeGenerator)
+    pool.close()
+    pool.prewarm()
+
+    stats = pool.stats()
+    assert stats['created'] == 0
+    assert stats['idle'] == 0
+
+
+def test_prewarm_fills_the_pool():
+    pool = GeneratorPool(size=3, factory=FakeGenerator, warm_up=True)
+    pool.prewarm()
+    assert pool.stats()['idle'] == 3
+    pool.close()
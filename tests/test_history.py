@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from history_store import SORT_ORDERS, HistoryStore
+
+# name: (size, mtime), oldest first; outputs of jobs are dated by the job, which finishes after every mtime
+OUTPUTS = {
+    'deepfake_a.mp4': (100, 1_000),
+    'deepfake_b.mp4': (700, 2_000),
+    'deepfake_c.mp4': (300, 3_000),
+    'deepfake_100%_done.mp4': (500, 4_000),
+    'deepfake_1_0.mp4': (200, 5_000),
+    'deepfake_1x0.mp4': (600, 6_000),
+    'deepfake_1000_done.mp4': (400, 7_000),
+}
+
+
+@pytest.fixture
+def backfilled(web_app, tmp_path, monkeypatch):
+    folder = tmp_path / 'generated'
+    folder.mkdir()
+    for name, (size, mtime) in OUTPUTS.items():
+        path = folder / name
+        path.write_bytes(b'\0' * size)
+        os.utime(path, (mtime, mtime))
+    (folder / 'upload.mp4').write_bytes(b'\0')
+    monkeypatch.setitem(web_app.app.config, 'GENERATED_FOLDER', str(folder))
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    monkeypatch.setattr(web_app, 'history_store', store)
+
+    # Outputs of finished jobs are indexed with the job's params
+    jobs = web_app.job_queue.store
+    for name, effect in (('deepfake_1_0.mp4', 'blur'), ('deepfake_1x0.mp4', 'blur'),
+                         ('deepfake_1000_done.mp4', 'edge')):
+        job_id = jobs.create('input.mp4', str(folder / name), name, {'effect': effect})
+        jobs.claim(job_id, 'test')
+        jobs.mark_finished(job_id)
+
+    result = web_app.app.test_cli_runner().invoke(args=['backfill-history'])
+    assert result.exit_code == 0, result.output
+    assert 'Indexed 7 generated file(s)' in result.output
+    return store
+
+
+def filenames(entries):
+    return [entry['filename'] for entry in entries]
+
+
+def test_backfill_is_idempotent(web_app, backfilled):
+    result = web_app.app.test_cli_runner().invoke(args=['backfill-history'])
+    assert 'Indexed 0 generated file(s)' in result.output
+    assert not backfilled.contains('upload.mp4')
+
+
+def test_pages(backfilled):
+    pages = [backfilled.page(page, per_page=3, sort='oldest') for page in (1, 2, 3, 4)]
+    assert [total for _, total in pages] == [7] * 4
+    assert [len(entries) for entries, _ in pages] == [3, 3, 1, 0]
+    assert sum((filenames(entries) for entries, _ in pages), []) == list(OUTPUTS)
+
+
+def test_effect_filter(backfilled):
+    entries, total = backfilled.page(effect='blur')
+    assert total == 2
+    assert filenames(entries) == ['deepfake_1x0.mp4', 'deepfake_1_0.mp4']
+    assert entries[0]['params'] == {'effect': 'blur'}
+    assert backfilled.effects() == ['blur', 'edge']
+
+
+@pytest.mark.parametrize('search, expected', [
+    ('100%', ['deepfake_100%_done.mp4']),
+    ('1_0', ['deepfake_1_0.mp4']),
+    ('%', ['deepfake_100%_done.mp4']),
+])
+def test_search_matches_wildcards_literally(backfilled, search, expected):
+    entries, total = backfilled.page(search=search)
+    assert filenames(entries) == expected
+    assert total == len(expected)
+
+
+@pytest.mark.parametrize('sort', SORT_ORDERS)
+def test_sort_orders(backfilled, sort):
+    entries, _ = backfilled.page(sort=sort)
+    by_size = sorted(OUTPUTS, key=lambda name: OUTPUTS[name][0])
+    expected = {
+        'newest': list(reversed(OUTPUTS)),
+        'oldest': list(OUTPUTS),
+        'largest': list(reversed(by_size)),
+        'smallest': by_size,
+    }
+    assert filenames(entries) == expected[sort]
@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+from jobs import FAILED, JobQueue
+
+
+class FakeExecutor:
+    def __init__(self):
+        self.shutdowns = 0
+
+    def submit(self, fn, *args):
+        raise BrokenProcessPool("A process in the process pool was terminated abruptly")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdowns += 1
+
+
+def make_queue(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path / 'jobs.db'))
+    created = []
+
+    def create_executor():
+        executor = FakeExecutor()
+        created.append(executor)
+        return executor
+
+    monkeypatch.setattr(queue, '_create_executor', create_executor)
+    return queue, created
+
+
+def test_broken_pool_is_replaced_once(tmp_path, monkeypatch):
+    queue, created = make_queue(tmp_path, monkeypatch)
+    broken = queue._executor = FakeExecutor()
+
+    # Every job in flight on the broken pool reports it
+    threads = [threading.Thread(target=queue._replace_executor, args=(broken,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert queue._executor is created[0]
+    assert broken.shutdowns == 1
+
+
+def test_failed_submit_releases_the_concurrency_slot(tmp_path, monkeypatch):
+    queue, created = make_queue(tmp_path, monkeypatch)
+    queue._executor = FakeExecutor()
+    job_id = queue.store.create('input.mp4', 'output.mp4', 'output.mp4', {})
+    assert queue.store.claim(job_id, queue.owner)
+
+    queue._launch(queue.store.get(job_id))
+
+    assert queue._running == set()
+    job = queue.store.get(job_id)
+    assert job['state'] == FAILED
+    assert 'Could not start the job' in job['error']
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def generated_folder(web_app, tmp_path, monkeypatch):
+    monkeypatch.setitem(web_app.app.config, 'GENERATED_FOLDER', str(tmp_path))
+
+
+def write_output(web_app, filename):
+    path = os.path.join(web_app.app.config['GENERATED_FOLDER'], filename)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * 1024)
+    return path
+
+
+def test_output_of_running_job_is_not_cached(web_app, client):
+    path = write_output(web_app, 'deepfake_running.mp4')
+    job_id = web_app.job_queue.store.create('input.mp4', path, 'deepfake_running.mp4', {})
+    assert web_app.job_queue.store.claim(job_id, 'test')
+
+    response = client.get('/video/deepfake_running.mp4')
+    assert response.status_code == 200
+    assert response.cache_control.no_cache
+    assert not response.cache_control.immutable
+
+
+def test_output_of_finished_job_is_immutable(web_app, client):
+    path = write_output(web_app, 'deepfake_done.mp4')
+    job_id = web_app.job_queue.store.create('input.mp4', path, 'deepfake_done.mp4', {})
+    web_app.job_queue.store.mark_finished(job_id)
+
+    response = client.get('/download/deepfake_done.mp4')
+    assert response.status_code == 200
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == web_app.config.MEDIA_MAX_AGE
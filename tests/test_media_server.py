@@ -0,0 +1,90 @@
+import http.client
+import os
+
+import pytest
+
+from media import parse_range, start_media_server
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('bytes=0-99', (0, 99)),
+    ('bytes=100-', (100, 1023)),
+    ('bytes=1000-5000', (1000, 1023)),
+    ('bytes=-24', (1000, 1023)),
+    ('bytes=-5000', (0, 1023)),
+    ('bytes=0-1,5-9', None),
+    ('items=0-9', None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1024) == expected
+
+
+@pytest.mark.parametrize('header', ['bytes=1024-', 'bytes=10-5', 'bytes=-0'])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1024)
+
+
+@pytest.fixture
+def media_folder(tmp_path):
+    with open(tmp_path / 'done.mp4', 'wb') as f:
+        f.write(bytes(range(256)) * 4)
+    with open(tmp_path / 'writing.mp4', 'wb') as f:
+        f.write(b'\0' * 64)
+    return tmp_path
+
+
+@pytest.fixture
+def server(media_folder):
+    writing = os.path.abspath(media_folder / 'writing.mp4')
+    server = start_media_server(str(media_folder), 0, '127.0.0.1',
+                                is_final=lambda path: os.path.abspath(path) != writing)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path, headers=None):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+    try:
+        connection.request('GET', path, headers=headers or {})
+        response = connection.getresponse()
+        return response, response.read()
+    finally:
+        connection.close()
+
+
+def test_range_request_gets_partial_content(server):
+    response, body = get(server, '/done.mp4', {'Range': 'bytes=10-19'})
+    assert response.status == 206
+    assert response.getheader('Content-Range') == 'bytes 10-19/1024'
+    assert body == bytes(range(10, 20))
+    assert 'immutable' in response.getheader('Cache-Control')
+
+
+def test_unsatisfiable_range_gets_416(server):
+    response, _ = get(server, '/done.mp4', {'Range': 'bytes=2048-'})
+    assert response.status == 416
+    assert response.getheader('Content-Range') == 'bytes */1024'
+
+
+def test_matching_etag_gets_304(server):
+    response, _ = get(server, '/done.mp4')
+    etag = response.getheader('ETag')
+    response, body = get(server, '/done.mp4', {'If-None-Match': etag})
+    assert response.status == 304
+    assert body == b''
+
+
+def test_if_range_mismatch_sends_whole_file(server):
+    response, body = get(server, '/done.mp4', {'Range': 'bytes=10-19', 'If-Range': '"stale"'})
+    assert response.status == 200
+    assert len(body) == 1024
+
+
+def test_file_being_written_is_not_cached(server):
+    response, body = get(server, '/writing.mp4')
+    assert response.status == 200
+    assert response.getheader('Cache-Control') == 'no-cache'
+    assert len(body) == 64
@@ -0,0 +1,111 @@
+import os
+import types
+
+import pytest
+
+import result_cache
+from history_store import HistoryStore
+from result_cache import ResultCache, result_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1_000_000.0)
+    clock.time = lambda: clock.now
+    monkeypatch.setattr(result_cache, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def history(tmp_path):
+    return HistoryStore(str(tmp_path / 'jobs.db'))
+
+
+def make_cache(tmp_path, history, **limits):
+    return ResultCache(str(tmp_path / 'jobs.db'), on_evict=history.forget_output, **limits)
+
+
+def make_output(tmp_path, history, name, size=1000):
+    path = str(tmp_path / name)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    history.record(path, params={'effect': 'blur'})
+    return path
+
+
+def test_oldest_entry_is_evicted_past_max_bytes(tmp_path, history, clock):
+    cache = make_cache(tmp_path, history, max_bytes=2500)
+    paths = {}
+    for key in ('a', 'b', 'c'):
+        paths[key] = make_output(tmp_path, history, f'{key}.mp4')
+        cache.store(key, paths[key])
+        clock.now += 1
+
+    assert not os.path.exists(paths['a'])
+    assert not history.contains('a.mp4')
+    assert cache.lookup('a') is None
+    assert cache.lookup('b') == paths['b']
+    assert cache.lookup('c') == paths['c']
+    assert history.contains('b.mp4') and history.contains('c.mp4')
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] == 2000
+
+
+def test_lookup_refreshes_recency(tmp_path, history, clock):
+    cache = make_cache(tmp_path, history, max_bytes=2500)
+    first = make_output(tmp_path, history, 'first.mp4')
+    cache.store('first', first)
+    clock.now += 1
+    second = make_output(tmp_path, history, 'second.mp4')
+    cache.store('second', second)
+    clock.now += 1
+    assert cache.lookup('first') == first
+    clock.now += 1
+
+    cache.store('third', make_output(tmp_path, history, 'third.mp4'))
+    assert os.path.exists(first)
+    assert not os.path.exists(second)
+
+
+def test_entry_expires_by_age(tmp_path, history, clock):
+    cache = make_cache(tmp_path, history, max_age=60)
+    old = make_output(tmp_path, history, 'old.mp4')
+    cache.store('old', old)
+    clock.now += 61
+
+    assert cache.lookup('old') is None
+    assert not os.path.exists(old)
+    assert not history.contains('old.mp4')
+
+
+def test_store_evicts_expired_entries(tmp_path, history, clock):
+    cache = make_cache(tmp_path, history, max_age=60)
+    old = make_output(tmp_path, history, 'old.mp4')
+    cache.store('old', old)
+    clock.now += 61
+
+    fresh = make_output(tmp_path, history, 'fresh.mp4')
+    cache.store('fresh', fresh)
+    assert not os.path.exists(old)
+    assert not history.contains('old.mp4')
+    assert cache.lookup('fresh') == fresh
+
+
+def test_lookup_drops_entry_whose_file_was_deleted(tmp_path, history, clock):
+    cache = make_cache(tmp_path, history)
+    path = make_output(tmp_path, history, 'gone.mp4')
+    cache.store('gone', path)
+    os.remove(path)
+
+    assert cache.lookup('gone') is None
+    assert not history.contains('gone.mp4')
+    stats = cache.stats()
+    assert stats['entries'] == 0
+    assert stats['misses'] == 1
+
+
+def test_result_key_normalizes_equivalent_params():
+    key = result_key('hash', {'effect': 'blur, edge', 'contrast': 1, 'brightness': '10', 'workers': 4})
+    assert key == result_key('hash', {'effect': ['blur', 'edge'], 'contrast': 1.0, 'brightness': 10})
+    assert key != result_key('hash', {'effect': 'edge,blur', 'contrast': 1, 'brightness': 10})
+    assert key != result_key('other', {'effect': 'blur,edge', 'contrast': 1, 'brightness': 10})
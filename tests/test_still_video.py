@@ -0,0 +1,105 @@
+import logging
+import struct
+
+import cv2
+import numpy as np
+import pytest
+
+import still_video
+from still_video import repeat_single_sample, write_still_video
+
+WIDTH, HEIGHT = 160, 120
+
+
+@pytest.fixture
+def frame():
+    frame = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    cv2.rectangle(frame, (40, 30), (120, 90), (0, 200, 255), -1)
+    return frame
+
+
+def read_frames(path):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return frames, fps
+
+
+def stbl_of(boxes):
+    moov = still_video._child(boxes, b'moov')
+    trak = still_video._child(moov, b'trak')
+    return still_video._child(still_video._child(still_video._child(trak, b'mdia'), b'minf'), b'stbl')
+
+
+def test_still_frame_is_repeated_for_the_duration(tmp_path, frame, caplog):
+    path = str(tmp_path / 'still.mp4')
+    duration, fps = 3, 10
+    with caplog.at_level(logging.WARNING, logger='still_video'):
+        write_still_video(path, frame, fps, duration * fps)
+    # The fast path was taken
+    assert not caplog.records
+
+    frames, read_fps = read_frames(path)
+    assert len(frames) == duration * fps
+    assert read_fps == fps
+    assert all(f.shape == (HEIGHT, WIDTH, 3) for f in frames)
+    assert all(np.array_equal(f, frames[0]) for f in frames)
+
+
+def test_64_bit_chunk_offsets_are_rewritten(tmp_path, frame):
+    path = str(tmp_path / 'one.mp4')
+    write_still_video(path, frame, 10, 1)
+    with open(path, 'rb') as f:
+        data = f.read()
+    boxes = still_video._parse(data, 0, len(data))
+    # Swap stco for an equivalent co64; moov follows mdat, so the offsets stay valid
+    stbl = stbl_of(boxes)
+    stco = still_video._child(stbl, b'stco')
+    offset = struct.unpack('>I', stco[8:12])[0]
+    stbl[:] = [(b'co64', struct.pack('>IIQ', 0, 1, offset)) if box_type == b'stco' else (box_type, payload)
+               for box_type, payload in stbl]
+    data = b''.join(still_video._serialize(box_type, payload) for box_type, payload in boxes)
+
+    data = repeat_single_sample(data, 25)
+    stbl = stbl_of(still_video._parse(data, 0, len(data)))
+    assert struct.unpack('>IIQ', still_video._child(stbl, b'co64')[:16]) == (0, 25, offset)
+    assert not any(box_type == b'stco' for box_type, _ in stbl)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    frames, _ = read_frames(path)
+    assert len(frames) == 25
+    assert frames[0].shape == (HEIGHT, WIDTH, 3)
+
+
+def test_unsupported_layout_is_rejected(tmp_path, frame):
+    path = str(tmp_path / 'two.mp4')
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 10, (WIDTH, HEIGHT))
+    out.write(frame)
+    out.write(frame)
+    out.release()
+    with open(path, 'rb') as f:
+        data = f.read()
+    with pytest.raises(ValueError):
+        repeat_single_sample(data, 30)
+
+
+def test_falls_back_to_encoding_every_frame(tmp_path, frame, monkeypatch, caplog):
+    def unsupported(data, frame_count):
+        raise ValueError("expected moov after mdat")
+
+    monkeypatch.setattr(still_video, 'repeat_single_sample', unsupported)
+    path = str(tmp_path / 'fallback.mp4')
+    with caplog.at_level(logging.WARNING, logger='still_video'):
+        write_still_video(path, frame, 10, 20)
+    assert 'encoding 20 frames instead' in caplog.text
+
+    frames, _ = read_frames(path)
+    assert len(frames) == 20
+    assert frames[0].shape == (HEIGHT, WIDTH, 3)
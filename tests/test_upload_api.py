@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from _common import make_test_video
+from jobs import DONE, FAILED
+
+
+def test_cancel_upload_with_malformed_id_is_not_found(client):
+    response = client.delete('/uploads/not-an-upload!')
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Unknown upload'}
+
+
+def test_cancel_started_upload(client):
+    created = client.post('/uploads', json={'filename': 'clip.mp4', 'size': 10})
+    assert created.status_code == 201
+    assert client.delete(f"/uploads/{created.get_json()['id']}").status_code == 204
+
+
+@pytest.fixture(scope='module')
+def video_bytes(tmp_path_factory):
+    path = make_test_video(str(tmp_path_factory.mktemp('upload') / 'clip.mp4'), 64, 48, 5)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def put_chunk(client, upload_id, offset, data):
+    return client.put(f'/uploads/{upload_id}', data=data, headers={'Upload-Offset': str(offset)})
+
+
+def test_chunked_upload_resumes_and_completes_into_a_job(web_app, client, video_bytes):
+    created = client.post('/uploads', json={'filename': 'clip.mp4', 'size': len(video_bytes)})
+    upload_id = created.get_json()['id']
+    half = len(video_bytes) // 2
+
+    response = put_chunk(client, upload_id, 0, video_bytes[:half])
+    assert response.status_code == 200
+    assert response.get_json()['offset'] == half
+    assert not response.get_json()['complete']
+
+    # A retried chunk at a stale offset is refused and told where to resume
+    response = put_chunk(client, upload_id, 0, video_bytes[:half])
+    assert response.status_code == 409
+    assert response.get_json()['offset'] == half
+
+    offset = client.get(f'/uploads/{upload_id}').get_json()['offset']
+    assert offset == half
+    response = put_chunk(client, upload_id, offset, video_bytes[offset:])
+    assert response.status_code == 200
+    assert response.get_json()['complete']
+
+    response = client.post(f'/uploads/{upload_id}/complete', data={'effect': 'blur'},
+                           headers={'Accept': 'application/json'})
+    assert response.status_code == 202
+    job = web_app.job_queue.get(response.get_json()['id'])
+    assert job['params']['effect'] == 'blur'
+    with open(job['input_path'], 'rb') as f:
+        assert f.read() == video_bytes
+    assert client.get(f'/uploads/{upload_id}').status_code == 404
+
+    # Let the job finish while the app's scratch directory still exists
+    deadline = time.monotonic() + 120
+    while job['state'] not in (DONE, FAILED) and time.monotonic() < deadline:
+        time.sleep(0.2)
+        job = web_app.job_queue.get(job['id'])
+    assert job['state'] == DONE
+
+
+def test_incomplete_upload_cannot_be_completed(client, video_bytes):
+    created = client.post('/uploads', json={'filename': 'clip.mp4', 'size': len(video_bytes)})
+    upload_id = created.get_json()['id']
+    put_chunk(client, upload_id, 0, video_bytes[:10])
+
+    response = client.post(f'/uploads/{upload_id}/complete', headers={'Accept': 'application/json'})
+    assert response.status_code == 409
+    assert response.get_json()['offset'] == 10
+    client.delete(f'/uploads/{upload_id}')
+
+
+def test_chunk_past_declared_size_is_rejected(client):
+    created = client.post('/uploads', json={'filename': 'clip.mp4', 'size': 4})
+    upload_id = created.get_json()['id']
+    assert put_chunk(client, upload_id, 0, b'too long').status_code == 413
+    client.delete(f'/uploads/{upload_id}')
@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Bytes copied from the request stream to disk per write
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class UploadNotFoundError(Exception):
+    """Raised for an unknown, completed or expired upload id"""
+
+
+class UploadOffsetError(Exception):
+    """Raised when a chunk does not start where the upload currently ends"""
+    def __init__(self, offset):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload would exceed its declared or the maximum size"""
+
+
+class ChunkedUploadStore:
+    """
+    Resumable uploads written chunk by chunk into a partial file.
+
+    Each upload is a `<id>.part` file plus its `<id>.json` metadata in a
+    hidden directory inside the upload folder. The current offset is the
+    size of the partial file, so an interrupted client asks for it and
+    continues from there. Completing an upload renames the partial file
+    into place, so the data is written to disk exactly once.
+    """
+    def __init__(self, folder, max_size, expiry=24 * 3600):
+        self.folder = os.path.join(folder, '.partial')
+        self.max_size = max_size
+        self.expiry = expiry
+        os.makedirs(self.folder, exist_ok=True)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _paths(self, upload_id):
+        if not upload_id.isalnum():
+            raise UploadNotFoundError(upload_id)
+        base = os.path.join(self.folder, upload_id)
+        return base + '.part', base + '.json'
+
+    def _lock(self, upload_id):
+        with self._locks_guard:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def create(self, filename, size):
+        """
+        Start an upload of size bytes and return its status
+        """
+        if size < 0 or size > self.max_size:
+            raise UploadTooLargeError(f"Uploads are limited to {self.max_size} bytes")
+        self.purge_expired()
+        upload_id = uuid.uuid4().hex
+        part_path, meta_path = self._paths(upload_id)
+        open(part_path, 'wb').close()
+        with open(meta_path, 'w') as f:
+            json.dump({'filename': filename, 'size': size, 'created_at': time.time()}, f)
+        return self.status(upload_id)
+
+    def status(self, upload_id):
+        part_path, meta_path = self._paths(upload_id)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            offset = os.path.getsize(part_path)
+        except FileNotFoundError:
+            raise UploadNotFoundError(upload_id)
+        return {
+            'id': upload_id,
+            'filename': meta['filename'],
+            'size': meta['size'],
+            'offset': offset,
+            'complete': offset == meta['size'],
+        }
+
+    def append(self, upload_id, offset, stream):
+        """
+        Write the bytes read from stream at offset and return the new offset.
+        A chunk that would run past the declared size is rejected whole.
+        """
+        with self._lock(upload_id):
+            status = self.status(upload_id)
+            if offset != status['offset']:
+                raise UploadOffsetError(status['offset'])
+            part_path, _ = self._paths(upload_id)
+            with open(part_path, 'ab') as f:
+                written = 0
+                while True:
+                    data = stream.read(COPY_BUFFER_SIZE)
+                    if not data:
+                        break
+                    written += len(data)
+                    if offset + written > status['size']:
+                        f.truncate(offset)
+                        raise UploadTooLargeError(f"Chunk runs past the declared size of {status['size']} bytes")
+                    f.write(data)
+            return offset + written
+
+    def complete(self, upload_id, destination):
+        """
+        Move a fully received upload to destination
+        """
+        with self._lock(upload_id):
+            status = self.status(upload_id)
+            if not status['complete']:
+                raise UploadOffsetError(status['offset'])
+            part_path, meta_path = self._paths(upload_id)
+            os.replace(part_path, destination)
+            os.remove(meta_path)
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+        return destination
+
+    def discard(self, upload_id):
+        part_path, meta_path = self._paths(upload_id)
+        with self._lock(upload_id):
+            for path in (part_path, meta_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+
+    def purge_expired(self):
+        """
+        Remove uploads that have not received data for longer than expiry
+        """
+        cutoff = time.time() - self.expiry
+        for name in os.listdir(self.folder):
+            upload_id, extension = os.path.splitext(name)
+            if extension != '.json':
+                continue
+            part_path, _ = self._paths(upload_id)
+            try:
+                last_write = os.path.getmtime(part_path)
+            except FileNotFoundError:
+                last_write = 0
+            if last_write < cutoff:
+                logger.info(f"Removing expired upload {upload_id}")
+                self.discard(upload_id)